@@ -9,14 +9,18 @@ with DAG(
     catchup=False,
 ) as dag:
 
+    # Щодня дописується лише нове вікно дат (партиція + _manifest.json), а не вся історія
     generate = BashOperator(
         task_id="generate_data",
-        bash_command="python src/generate_dataset_ext.py --output data/processed/churn_dataset.csv"
+        bash_command=(
+            "python src/generate_dataset_ext.py --format parquet "
+            "--output data/processed/churn_dataset.parquet --incremental --until {{ ds }}"
+        ),
     )
 
     train = BashOperator(
         task_id="train_model",
-        bash_command="python pipelines/train.py"
+        bash_command="DATA_PATH=data/processed/churn_dataset.parquet python pipelines/train.py"
     )
 
     register = BashOperator(
@@ -0,0 +1,43 @@
+"""Latency of request preprocessing: pandas + ColumnTransformer vs CompiledEncoder.
+
+Usage:
+  python benchmarks/bench_encoder.py [--sizes 1,100,10000]
+"""
+
+import argparse
+
+from common import API_FEATURES, load_or_train_pipeline, make_customers, time_call
+
+from src.api.encoder import CompiledEncoder
+from src.api.predict import preprocess_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,100,10000", help="Розміри батчів через кому")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    pipeline = load_or_train_pipeline()
+    preprocessor = pipeline.named_steps["preprocessor"]
+    encoder = CompiledEncoder.from_pipeline(pipeline)
+    records = make_customers(max(sizes))[API_FEATURES].to_dict(orient="records")
+
+    print(f"{'batch':>8} {'stage':>10} {'pipeline, ms':>14} {'compiled, ms':>14} {'speedup':>8}")
+    for n in sizes:
+        batch = records[:n]
+        number = max(1, 1000 // n)
+        cases = {
+            "transform": (lambda: preprocessor.transform(preprocess_batch(batch)),
+                          lambda: encoder.transform(batch)),
+            "end2end": (lambda: pipeline.predict_proba(preprocess_batch(batch)),
+                        lambda: encoder.predict_proba(batch)),
+        }
+        for stage, (slow, fast) in cases.items():
+            t_slow = time_call(slow, number=number) * 1000
+            t_fast = time_call(fast, number=number) * 1000
+            print(f"{n:>8} {stage:>10} {t_slow:>14.3f} {t_fast:>14.3f} {t_slow / t_fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
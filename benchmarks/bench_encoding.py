@@ -0,0 +1,81 @@
+"""Training matrix size, fit time and peak RSS per categorical encoding.
+
+Every encoding of ``build_pipeline`` (``dense-onehot``, ``sparse-onehot``,
+``ordinal``) is measured in a fresh spawned process, so peak RSS covers only
+that run: data generation, ``fit_transform`` and the forest fit. ``--hgb`` also
+fits ``HistGradientBoostingClassifier`` on the ordinal codes as native
+categorical features. The "data" column is the RSS after the table is generated.
+The difference between "data" and "peak" is what preprocessing and training add.
+
+Usage:
+  python benchmarks/bench_encoding.py [--samples 200000] [--trees 50] [--hgb]
+"""
+
+import argparse
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from common import make_customers
+
+ENCODINGS = ("dense-onehot", "sparse-onehot", "ordinal")
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(encoding: str, samples: int, trees: int, hgb: bool) -> dict:
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    from pipelines.train import build_pipeline, matrix_nbytes
+
+    df = make_customers(samples).drop(columns="customerID")
+    X, y = df.drop(columns="Churn"), df["Churn"].map({"Yes": 1, "No": 0})
+    del df
+    data_rss = _rss_mb()
+
+    classifier = HistGradientBoostingClassifier(random_state=42) if hgb else None
+    pipeline = build_pipeline(X, encoding=encoding, classifier=classifier)
+    if not hgb:
+        pipeline.set_params(classifier__n_estimators=trees)
+    preprocessor, model = pipeline.named_steps["preprocessor"], pipeline.named_steps["classifier"]
+
+    start = time.perf_counter()
+    X_t = preprocessor.fit_transform(X)
+    preprocess_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    model.fit(X_t, y)
+    fit_seconds = time.perf_counter() - start
+    return {
+        "encoding": encoding + (" + hgb" if hgb else ""),
+        "columns": X_t.shape[1],
+        "matrix_mb": matrix_nbytes(X_t) / 2**20,
+        "preprocess_seconds": preprocess_seconds,
+        "fit_seconds": fit_seconds,
+        "data_rss_mb": data_rss,
+        "peak_rss_mb": _rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--trees", type=int, default=50)
+    parser.add_argument("--hgb", action="store_true", help="Also fit HistGradientBoosting on ordinal codes")
+    args = parser.parse_args()
+
+    runs = [(encoding, False) for encoding in ENCODINGS] + ([("ordinal", True)] if args.hgb else [])
+    print(f"{args.samples:,} rows, {args.trees} trees")
+    print(f"{'encoding':>16} {'columns':>8} {'matrix MiB':>11} {'preprocess s':>13} {'fit s':>8} "
+          f"{'data MiB':>9} {'peak MiB':>9}")
+    for encoding, hgb in runs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            r = pool.submit(_measure, encoding, args.samples, args.trees, hgb).result()
+        print(f"{r['encoding']:>16} {r['columns']:>8} {r['matrix_mb']:>11.1f} {r['preprocess_seconds']:>13.2f} "
+              f"{r['fit_seconds']:>8.2f} {r['data_rss_mb']:>9.0f} {r['peak_rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
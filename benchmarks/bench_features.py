@@ -0,0 +1,66 @@
+"""Feature matrix before/after: one-hot RecordDate vs numeric date features.
+
+"before" one-hot encodes every string column, as ``build_pipeline`` used to,
+so ``RecordDate`` becomes one column per calendar day. "after" is the current
+``build_pipeline``: numeric year/month date features and capped categorical
+cardinality. Reports the training matrix width and size, the forest fit time
+and the single-record transform latency of the fitted preprocessor.
+
+Usage:
+  python benchmarks/bench_features.py [--samples 50000] [--trees 100]
+"""
+
+import argparse
+import time
+
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from common import API_FEATURES, make_customers, time_call
+
+
+def _legacy_pipeline(X, trees: int) -> Pipeline:
+    categorical = X.select_dtypes(include=["object", "category"]).columns.tolist()
+    numerical = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
+    preprocessor = ColumnTransformer([
+        ("num", "passthrough", numerical),
+        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical),
+    ])
+    return Pipeline([("preprocessor", preprocessor),
+                     ("classifier", RandomForestClassifier(n_estimators=trees, random_state=42))])
+
+
+def measure(name: str, pipeline: Pipeline, X, y, record: dict) -> None:
+    from src.api.predict import preprocess_batch
+
+    preprocessor, classifier = pipeline.named_steps["preprocessor"], pipeline.named_steps["classifier"]
+    X_t = preprocessor.fit_transform(X)
+    start = time.perf_counter()
+    classifier.fit(X_t, y)
+    fit_seconds = time.perf_counter() - start
+    transform_ms = time_call(lambda: preprocessor.transform(preprocess_batch([record])), repeat=20) * 1000
+    print(f"{name:>8} {X_t.shape[1]:>8} {X_t.nbytes / 2**20:>10.1f} {fit_seconds:>10.2f} {transform_ms:>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=50_000)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+
+    from pipelines.train import build_pipeline
+
+    df = make_customers(args.samples).drop(columns="customerID")
+    X, y = df.drop(columns="Churn"), df["Churn"].map({"Yes": 1, "No": 0})
+    record = {**df[API_FEATURES].iloc[0].to_dict(), "RecordDate": str(df["RecordDate"].iloc[-1])}
+
+    print(f"{args.samples:,} rows, {args.trees} trees")
+    print(f"{'':>8} {'columns':>8} {'MiB':>10} {'fit, s':>10} {'transform, ms':>14}")
+    measure("before", _legacy_pipeline(X, args.trees), X, y, record)
+    measure("after", build_pipeline(X).set_params(classifier__n_estimators=args.trees), X, y, record)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Latency of tree evaluation: RandomForestClassifier.predict_proba vs FlatForest.
+
+Usage:
+  python benchmarks/bench_forest.py [--sizes 1,100,10000]
+"""
+
+import argparse
+
+import numpy as np
+
+from common import API_FEATURES, load_or_train_pipeline, make_customers, time_call
+
+from src.api.encoder import CompiledEncoder
+from src.api.forest import FlatForest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,100,10000", help="Розміри батчів через кому")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    pipeline = load_or_train_pipeline()
+    forest = pipeline.named_steps["classifier"]
+    flat = FlatForest.from_sklearn(forest)
+    flat32 = FlatForest.from_sklearn(forest, leaf_dtype=np.float32)
+    print(f"Forest: {flat.n_trees} trees, {flat.n_nodes:,} nodes, max depth {flat.max_depth}, "
+          f"{flat.nbytes / 2**20:.1f} MiB (float32 leaves: {flat32.nbytes / 2**20:.1f} MiB)")
+
+    encoder = CompiledEncoder.from_pipeline(pipeline)
+    X_all = encoder.transform(make_customers(max(sizes))[API_FEATURES].to_dict(orient="records"))
+
+    print(f"{'batch':>8} {'sklearn, ms':>12} {'numpy, ms':>10} {'speedup':>8} {'identical':>10}")
+    for n in sizes:
+        X = X_all[:n]
+        number = max(1, 1000 // n)
+        t_sklearn = time_call(lambda: forest.predict_proba(X), number=number) * 1000
+        t_numpy = time_call(lambda: flat.predict_proba(X), number=number) * 1000
+        identical = np.array_equal(flat.predict_proba(X), forest.predict_proba(X))
+        print(f"{n:>8} {t_sklearn:>12.3f} {t_numpy:>10.3f} {t_sklearn / t_numpy:>7.1f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
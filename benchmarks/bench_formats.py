@@ -0,0 +1,41 @@
+"""File size and training-load time of the generated dataset: CSV vs Parquet.
+
+Usage:
+  python benchmarks/bench_formats.py [--samples 1000000] [--chunk-size 200000]
+"""
+
+import argparse
+import os
+import tempfile
+
+from common import time_call
+
+from pipelines.train import load_data
+from src.generate_dataset_ext import write_customers
+
+
+def _size_mb(path: str) -> float:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+    return os.path.getsize(path) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Кількість клієнтів")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Розмір чанка генерації")
+    args = parser.parse_args()
+    config = {"generation": {"samples": args.samples}}
+
+    print(f"{'format':>8} {'size, MiB':>10} {'load, s':>8} {'frame, MiB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("csv", "parquet"):
+            path = os.path.join(tmp, f"customers.{fmt}")
+            write_customers(config, path, fmt=fmt, chunk_size=args.chunk_size)
+            seconds = time_call(lambda: load_data(path), repeat=3)
+            frame_mb = load_data(path).memory_usage(deep=True).sum() / 2**20
+            print(f"{fmt:>8} {_size_mb(path):>10.1f} {seconds:>8.2f} {frame_mb:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
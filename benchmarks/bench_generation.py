@@ -0,0 +1,60 @@
+"""Throughput and peak memory of the synthetic customer generator.
+
+Usage:
+  python benchmarks/bench_generation.py [--sizes 10000,100000,1000000] [--workers 1,4,8]
+  python benchmarks/bench_generation.py --stream --chunk-size 200000 --sizes 1000000,5000000
+
+With ``--stream`` every size is written to a temporary CSV by the streaming
+writer in a fresh process, and the peak RSS of that process is reported.
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import common  # noqa: F401  (додає корінь репозиторію в sys.path)
+
+from src.generate_dataset_ext import generate_tabular_data, write_customers
+
+
+def _stream_once(n: int, chunk_size: int) -> tuple:
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_customers({"generation": {"samples": n}}, os.path.join(tmp, "customers.csv"),
+                        chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Кількість клієнтів через кому")
+    parser.add_argument("--workers", default="1", help="Кількість процесів через кому (shards = workers)")
+    parser.add_argument("--stream", action="store_true", help="Потоковий запис у CSV з виміром пікового RSS")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Розмір чанка для --stream")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    if args.stream:
+        print(f"{'rows':>12} {'seconds':>10} {'rows/s':>12} {'peak RSS, MiB':>14}")
+        for n in sizes:
+            # Новий процес на кожен розмір, щоб ru_maxrss не успадковував попередній пік
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, peak_mb = pool.submit(_stream_once, n, args.chunk_size).result()
+            print(f"{n:>12,} {elapsed:>10.2f} {n / elapsed:>12,.0f} {peak_mb:>14.0f}")
+        return
+
+    print(f"{'rows':>10} {'workers':>8} {'seconds':>10} {'rows/s':>12}")
+    for n in sizes:
+        for workers in (int(w) for w in args.workers.split(",")):
+            start = time.perf_counter()
+            generate_tabular_data({"generation": {"samples": n}}, workers=workers, shards=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{n:>10,} {workers:>8} {elapsed:>10.2f} {n / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Model backends: fit time, inference latency per row, model size and accuracy.
+
+Compares the backends of ``pipelines/backends.py`` on the same split and
+encoder: the default ``random_forest`` (100 fully grown trees) and the
+boosted models configured in ``conf/train.yaml`` (``hist_gradient_boosting``
+and, when installed, ``xgboost``), with the config's early stopping. Latency
+is ``predict_proba`` of the classifier on already encoded rows, for one row
+and per row of a ``--batch``-row batch. Size is the pickled pipeline.
+
+Usage:
+  python benchmarks/bench_models.py [--samples 100000] [--batch 1000] [--config conf/train.yaml]
+"""
+
+import argparse
+import io
+import time
+
+import joblib
+from sklearn.model_selection import train_test_split
+
+from common import make_customers, time_call
+
+
+def _measure(backend, X_train, X_test, y_train, y_test, batch: int) -> dict:
+    from pipelines.train import build_pipeline, train_and_evaluate
+    from src.profiling import PhaseTimer
+
+    model = build_pipeline(X_train, encoding=backend.encoding, classifier=backend.classifier)
+    timer = PhaseTimer()
+    acc, model = train_and_evaluate(model, X_train, X_test, y_train, y_test, show_progress=False, timer=timer,
+                                    validation_fraction=backend.validation_fraction)
+    classifier = model.named_steps["classifier"]
+    X_t = model.named_steps["preprocessor"].transform(X_test.iloc[:batch])
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return {
+        "model": backend.name,
+        "fit_seconds": timer.phases["fit"]["seconds"],
+        "single_ms": time_call(lambda: classifier.predict_proba(X_t[:1]), repeat=20) * 1000,
+        "batch_us_per_row": time_call(lambda: classifier.predict_proba(X_t), repeat=5) / len(X_t) * 1e6,
+        "size_mb": buffer.tell() / 2**20,
+        "accuracy": acc,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--config", default=None, help="Training config (default TRAIN_CONFIG)")
+    args = parser.parse_args()
+
+    from pipelines.backends import DEFAULT_MODEL, XGBOOST_AVAILABLE, load_train_config, make_backend
+
+    model_config = load_train_config(args.config).get("model") or {}
+    configs = [DEFAULT_MODEL, {**model_config, "type": "hist_gradient_boosting"}]
+    if XGBOOST_AVAILABLE:
+        configs.append({**model_config, "type": "xgboost"})
+
+    df = make_customers(args.samples).drop(columns="customerID")
+    X, y = df.drop(columns="Churn"), df["Churn"].map({"Yes": 1, "No": 0})
+    split = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    results = []
+    for config in configs:
+        start = time.perf_counter()
+        results.append(_measure(make_backend(config), *split, args.batch))
+        print(f"{config['type']} done in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{args.samples:,} rows, batch {args.batch}")
+    print(f"{'model':>24} {'fit, s':>8} {'1 row, ms':>10} {'batch, µs/row':>14} {'size, MiB':>10} {'accuracy':>9}")
+    for r in results:
+        print(f"{r['model']:>24} {r['fit_seconds']:>8.2f} {r['single_ms']:>10.3f} {r['batch_us_per_row']:>14.2f} "
+              f"{r['size_mb']:>10.2f} {r['accuracy']:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
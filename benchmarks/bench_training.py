@@ -0,0 +1,58 @@
+"""Forest training: chunked warm-start refits vs one parallel fit.
+
+For every size, trains the same ``build_pipeline`` forest with
+``train_and_evaluate(mode="chunked")`` (10 warm-start refits, one core) and
+``mode="parallel"`` (one fit, ``--n-jobs`` threads, per-tree progress), and
+reports fit seconds, trees/s and the speedup. Both modes grow identical trees,
+so the accuracies must match.
+
+Usage:
+  python benchmarks/bench_training.py [--sizes 50000,5000000] [--n-jobs -1] [--trees 100]
+"""
+
+import argparse
+import os
+
+from sklearn.model_selection import train_test_split
+
+from common import make_customers
+
+
+def _fit_seconds(mode: str, X_train, X_test, y_train, y_test, trees: int, n_jobs: int):
+    from pipelines.train import build_pipeline, train_and_evaluate
+    from src.profiling import PhaseTimer
+
+    model = build_pipeline(X_train)
+    model.set_params(classifier__n_estimators=trees)
+    timer = PhaseTimer()
+    acc, _ = train_and_evaluate(model, X_train, X_test, y_train, y_test, show_progress=False, timer=timer,
+                                mode=mode, n_jobs=n_jobs)
+    return timer.phases["fit"]["seconds"], acc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="50000,5000000", help="Кількість рядків через кому")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(s) for s in args.sizes.split(",") if s]:
+        df = make_customers(n).drop(columns=["customerID", "RecordDate"])
+        X, y = df.drop(columns="Churn"), df["Churn"].map({"Yes": 1, "No": 0})
+        split = train_test_split(X, y, test_size=0.2, random_state=42)
+        chunked, acc_chunked = _fit_seconds("chunked", *split, args.trees, args.n_jobs)
+        parallel, acc_parallel = _fit_seconds("parallel", *split, args.trees, args.n_jobs)
+        assert acc_chunked == acc_parallel, "режими мають будувати однакові дерева"
+        results.append((n, chunked, parallel))
+
+    print(f"\n{os.cpu_count()} CPU, {args.trees} trees, n_jobs={args.n_jobs}")
+    print(f"{'rows':>10} {'chunked, s':>11} {'trees/s':>9} {'parallel, s':>12} {'trees/s':>9} {'speedup':>8}")
+    for n, chunked, parallel in results:
+        print(f"{n:>10,} {chunked:>11.2f} {args.trees / chunked:>9.1f} {parallel:>12.2f} "
+              f"{args.trees / parallel:>9.1f} {chunked / parallel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Startup time and per-worker memory: joblib.load vs mmap-ed flat export.
+
+Starts N worker processes the way uvicorn --workers does (each imports the API
+module and loads the model), keeps them alive together and reports load time,
+RSS and PSS per worker. PSS splits shared pages between workers, so the sum of
+PSS is what the pod needs.
+
+Usage:
+  python benchmarks/bench_workers.py [--workers 4]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+
+import joblib
+
+from common import API_FEATURES, load_or_train_pipeline, make_customers
+
+
+def _worker(env, record, barrier, results):
+    os.environ.update(env)
+    from src.api import predict as predict_module
+
+    predict_module.load_initial_model()
+    assert "error" not in predict_module.predict_churn(record, use_cache=False)
+    barrier.wait()  # усі воркери живі одночасно — PSS ділить спільні сторінки між ними
+    results.put({"load_seconds": predict_module.last_load_seconds, **predict_module.process_memory()})
+    barrier.wait()
+
+
+def run(mode: str, env: dict, record: dict, n_workers: int):
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(n_workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(env, record, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    def avg(key):
+        values = [s[key] for s in stats if key in s]
+        return sum(values) / len(values) if values else float("nan")
+
+    total_pss = sum(s.get("pss_mb", 0.0) for s in stats)
+    print(f"{mode:>8} {avg('load_seconds'):>10.2f} {avg('rss_mb'):>10.1f} {avg('pss_mb'):>10.1f} {total_pss:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    from src.api.forest import export_serving_model
+
+    workdir = tempfile.mkdtemp(prefix="bench_workers_")
+    model_path = os.path.join(workdir, "churn_model.pkl")
+    export_dir = os.path.join(workdir, "churn_forest")
+    pipeline = load_or_train_pipeline()
+    joblib.dump(pipeline, model_path)
+    export_serving_model(pipeline, export_dir)
+    record = make_customers(1)[API_FEATURES].to_dict(orient="records")[0]
+
+    base = {"MLFLOW_TRACKING_URI": "", "PREDICTION_CACHE_SIZE": "0"}
+    print(f"{args.workers} workers, model file {os.path.getsize(model_path) / 2**20:.1f} MiB")
+    print(f"{'mode':>8} {'load, s':>10} {'RSS, MiB':>10} {'PSS, MiB':>10} {'sum PSS, MiB':>12}")
+    run("joblib", {**base, "MODEL_PATH": model_path, "MODEL_MMAP_DIR": ""}, record, args.workers)
+    run("mmap", {**base, "MODEL_PATH": model_path, "MODEL_MMAP_DIR": export_dir}, record, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+Run the scripts from the repository root, e.g. ``python benchmarks/bench_encoder.py``.
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import joblib  # noqa: E402
+
+# Ознаки, які приймає API (src/api/models.py::CustomerFeatures)
+API_FEATURES = [
+    "tenure", "MonthlyCharges", "TotalCharges", "gender", "SeniorCitizen", "Partner",
+    "Dependents", "PhoneService", "MultipleLines", "InternetService", "OnlineSecurity",
+    "OnlineBackup", "DeviceProtection", "TechSupport", "StreamingTV", "StreamingMovies",
+    "Contract", "PaperlessBilling", "PaymentMethod",
+]
+
+
+def make_customers(n: int):
+    """Генерує ``n`` синтетичних клієнтів тим самим генератором, що й DVC-пайплайн."""
+    from src.generate_dataset_ext import generate_tabular_data
+
+    return generate_tabular_data({"generation": {"samples": n}})
+
+
+def load_or_train_pipeline(model_path: str = None, n_train: int = 5000):
+    """Повертає збережену модель з ``model_path`` або тренує нову на синтетичних даних."""
+    model_path = model_path or os.getenv("MODEL_PATH", "models/churn_model.pkl")
+    if os.path.exists(model_path):
+        return joblib.load(model_path)
+
+    from pipelines.train import build_pipeline
+
+    df = make_customers(n_train)
+    X = df[API_FEATURES]
+    y = df["Churn"].map({"Yes": 1, "No": 0})
+    return build_pipeline(X).fit(X, y)
+
+
+def time_call(fn, repeat: int = 5, number: int = 1) -> float:
+    """Найкращий час (секунди) одного виклику ``fn`` з ``repeat`` спроб по ``number`` викликів."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
@@ -0,0 +1,77 @@
+"""Compare a benchmark run against a stored baseline and flag regressions.
+
+Usage:
+  python benchmarks/compare.py BASELINE.json CURRENT.json [--threshold 0.15] [--memory-threshold 0.2]
+
+Results are matched by (case, rows). Throughput (rows/s) must not drop and
+latency percentiles / peak RSS must not grow by more than the threshold.
+Exits with status 1 when any metric regressed, so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+
+# Напрямок "краще" для кожної метрики: +1 — більше краще, -1 — менше краще
+METRICS = {
+    "rows_per_sec": +1,
+    "p50_ms": -1,
+    "p95_ms": -1,
+    "preprocess_features_p50_ms": -1,
+    "predict_churn_p50_ms": -1,
+    "predict_churn_p95_ms": -1,
+    "peak_rss_mb": -1,
+}
+MEMORY_METRICS = ("peak_rss_mb",)
+
+
+def _index(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {(r["case"], r["rows"]): r for r in data["results"]}
+
+
+def compare(baseline: dict, current: dict, threshold: float, memory_threshold: float) -> list:
+    """Rows ``(case, rows, metric, baseline, current, change, regressed)`` for shared results."""
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        for metric, direction in METRICS.items():
+            old, new = baseline[key].get(metric), current[key].get(metric)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            limit = memory_threshold if metric in MEMORY_METRICS else threshold
+            rows.append((*key, metric, old, new, change, -direction * change > limit))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", help="JSON from benchmarks/run.py to compare against")
+    parser.add_argument("current", help="JSON from the run being checked")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Допустиме погіршення throughput/latency (частка, 0.15 = 15%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.20,
+                        help="Допустиме зростання peak RSS (частка)")
+    args = parser.parse_args()
+
+    baseline, current = _index(args.baseline), _index(args.current)
+    rows = compare(baseline, current, args.threshold, args.memory_threshold)
+
+    print(f"{'case':>15} {'rows':>10} {'metric':>28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for case, n, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{case:>15} {n:>10,} {metric:>28} {old:>12,.3f} {new:>12,.3f} {change:>+8.1%}{flag}")
+
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"\nNot in current run: {', '.join(f'{case}/{n}' for case, n in missing)}")
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond the thresholds")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Benchmark suite: throughput, latency and peak memory of the hot paths, saved as JSON.
+
+Cases (``--cases``, default all):
+  generate        generate_tabular_data                       rows/s at every --sizes
+  preprocess      preprocess_batch (API records → DataFrame)  rows/s at every --sizes
+  train           build_pipeline + train_and_evaluate          rows/s at --train-sizes
+  predict         predict_churn_batch (no cache)               rows/s at every --sizes
+  predict_single  preprocess_features / predict_churn          per-call latency
+  api_single      POST /predict via an in-process ASGI client  per-request latency
+  api_batch       POST /predict/batch with --batch-sizes       per-request latency
+
+Every (case, size) runs in a fresh spawned process, so ``peak_rss_mb`` is the
+high-water mark of that measurement alone (setup included).
+
+Usage:
+  python benchmarks/run.py [--output benchmarks/results/latest.json]
+  python benchmarks/run.py --cases generate,predict --sizes 1000,100000
+  python benchmarks/compare.py benchmarks/baselines/baseline.json benchmarks/results/latest.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+
+from common import API_FEATURES, ROOT, load_or_train_pipeline, make_customers, time_call
+
+
+DEFAULT_SIZES = "1000,100000,1000000"
+# Ліс зі 100 дерев на 1M рядків тренується десятки хвилин — за замовчуванням не запускаємо
+DEFAULT_TRAIN_SIZES = "1000,100000"
+DEFAULT_BATCH_SIZES = "10,100,1000"
+DEFAULT_REQUESTS = 200
+
+THROUGHPUT_CASES = ("generate", "preprocess", "train", "predict")
+LATENCY_CASES = ("predict_single", "api_single", "api_batch")
+
+
+def _repeat(n: int) -> int:
+    return 5 if n <= 10_000 else 3 if n <= 100_000 else 1
+
+
+def _records(n: int) -> list:
+    df = make_customers(n)
+    return df[API_FEATURES].to_dict(orient="records")
+
+
+def _serving_model(model_path: str):
+    from src.api import predict as predict_module
+
+    predict_module.set_model(load_or_train_pipeline(model_path), "benchmark")
+    return predict_module
+
+
+# ── Throughput: (setup → fn), час найкращого з кількох запусків ────────────────
+
+def _setup_generate(n: int, model_path: str):
+    from src.generate_dataset_ext import generate_tabular_data
+
+    config = {"generation": {"samples": n}}
+    return lambda: generate_tabular_data(config)
+
+
+def _setup_preprocess(n: int, model_path: str):
+    from src.api.predict import preprocess_batch
+
+    records = _records(n)
+    return lambda: preprocess_batch(records)
+
+
+def _setup_train(n: int, model_path: str):
+    from sklearn.model_selection import train_test_split
+
+    from pipelines.train import build_pipeline, train_and_evaluate
+
+    df = make_customers(n).drop(columns=["customerID", "RecordDate"])
+    X, y = df.drop(columns="Churn"), df["Churn"].map({"Yes": 1, "No": 0})
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return lambda: train_and_evaluate(build_pipeline(X), X_train, X_test, y_train, y_test, show_progress=False)
+
+
+def _setup_predict(n: int, model_path: str):
+    predict_module = _serving_model(model_path)
+    records = _records(n)
+    return lambda: predict_module.predict_churn_batch(records, use_cache=False)
+
+
+# ── Latency: n запитів, перцентилі по кожному ─────────────────────────────────
+
+def _latencies_predict_single(batch: int, requests: int, model_path: str) -> dict:
+    predict_module = _serving_model(model_path)
+    records = _records(requests)
+    predict_module.predict_churn(records[0], use_cache=False)  # прогрів
+    stages = {}
+    for name, fn in (("preprocess_features", predict_module.preprocess_features),
+                     ("predict_churn", lambda r: predict_module.predict_churn(r, use_cache=False))):
+        latencies = []
+        for record in records:
+            start = time.perf_counter()
+            fn(record)
+            latencies.append(time.perf_counter() - start)
+        stages[name] = latencies
+    return stages
+
+
+def _latencies_api(batch: int, requests: int, model_path: str, endpoint: str) -> dict:
+    import httpx
+
+    _serving_model(model_path)
+    from src.api.main import app
+
+    # src.api.main вмикає INFO-логування, а httpx пише рядок на кожен запит
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    records = _records(max(requests, batch))
+
+    async def run():
+        latencies = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for i in range(requests + 1):
+                if endpoint == "/predict":
+                    kwargs = {"json": records[i % len(records)]}
+                else:
+                    kwargs = {"json": [records[(i + j) % len(records)] for j in range(batch)]}
+                start = time.perf_counter()
+                response = await client.post(endpoint, params={"use_cache": "false"}, **kwargs)
+                elapsed = time.perf_counter() - start
+                response.raise_for_status()
+                if i:  # перший запит — прогрів
+                    latencies.append(elapsed)
+        return latencies
+
+    return {endpoint: asyncio.run(run())}
+
+
+def _measure(case: str, n: int, requests: int, model_path: str) -> dict:
+    """Runs in a spawned worker: one (case, size) measurement plus its peak RSS."""
+    result = {"case": case, "rows": n}
+    if case in THROUGHPUT_CASES:
+        fn = globals()[f"_setup_{case}"](n, model_path)
+        # Прогрів і оцінка: малі розміри повторюємо, поки один замір не триває ~0.2 с
+        first = time_call(fn, repeat=1)
+        seconds = min(first, time_call(fn, repeat=_repeat(n), number=max(1, int(0.2 / first))))
+        result.update(seconds=round(seconds, 6), rows_per_sec=round(n / seconds, 1))
+    else:
+        if case == "predict_single":
+            stages = _latencies_predict_single(n, requests, model_path)
+        else:
+            stages = _latencies_api(n, requests, model_path, "/predict" if case == "api_single" else "/predict/batch")
+        result["requests"] = requests
+        for name, latencies in stages.items():
+            ms = np.asarray(latencies) * 1000
+            prefix = "" if len(stages) == 1 else f"{name}_"
+            for q in (50, 95, 99):
+                result[f"{prefix}p{q}_ms"] = round(float(np.percentile(ms, q)), 4)
+        main_latencies = list(stages.values())[-1]
+        result["rows_per_sec"] = round(n * len(main_latencies) / sum(main_latencies), 1)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def _metadata() -> dict:
+    import pandas as pd
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _sizes(value: str) -> list:
+    return [int(s) for s in value.split(",") if s]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", default=",".join(THROUGHPUT_CASES + LATENCY_CASES),
+                        help="Кейси через кому")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Кількість рядків для throughput-кейсів")
+    parser.add_argument("--train-sizes", default=DEFAULT_TRAIN_SIZES, help="Кількість рядків для train")
+    parser.add_argument("--batch-sizes", default=DEFAULT_BATCH_SIZES, help="Розміри батчів для api_batch")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Запитів на latency-кейс")
+    parser.add_argument("--model", default=None,
+                        help="Модель для predict/api (за замовчуванням MODEL_PATH або нова на 5000 рядках)")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"),
+                        help="Куди записати JSON з результатами")
+    args = parser.parse_args()
+
+    cases = [c for c in args.cases.split(",") if c]
+    unknown = set(cases) - set(THROUGHPUT_CASES + LATENCY_CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    plan = []
+    for case in cases:
+        if case == "train":
+            sizes = _sizes(args.train_sizes)
+        elif case == "api_batch":
+            sizes = _sizes(args.batch_sizes)
+        elif case in LATENCY_CASES:
+            sizes = [1]
+        else:
+            sizes = _sizes(args.sizes)
+        plan.extend((case, n) for n in sizes)
+
+    results = []
+    print(f"{'case':>15} {'rows':>10} {'rows/s':>14} {'p50, ms':>10} {'p95, ms':>10} {'peak RSS, MiB':>14}")
+    for case, n in plan:
+        # Новий процес на кожен вимір: ru_maxrss не успадковує пік попереднього кейсу
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(_measure, case, n, args.requests, args.model).result()
+        results.append(result)
+        p50 = result.get("p50_ms", result.get("predict_churn_p50_ms", float("nan")))
+        p95 = result.get("p95_ms", result.get("predict_churn_p95_ms", float("nan")))
+        print(f"{case:>15} {n:>10,} {result['rows_per_sec']:>14,.0f} {p50:>10.3f} {p95:>10.3f} "
+              f"{result['peak_rss_mb']:>14.0f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": _metadata(), "results": results}, f, indent=2)
+    print(f"\nSaved {len(results)} results → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
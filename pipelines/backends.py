@@ -0,0 +1,122 @@
+"""Model backends for ``pipelines/train.py``, selected by ``model.type`` in ``conf/train.yaml``.
+
+Every backend turns the ``model`` section of the config into an unfitted
+classifier and says which categorical encoding suits it:
+
+	model:
+	  type: xgboost                 # random_forest | hist_gradient_boosting | xgboost
+	  params: {n_estimators: 100, max_depth: 5, learning_rate: 0.1}
+	  early_stopping: {validation_fraction: 0.1, rounds: 10}
+	  fallback: hist_gradient_boosting
+
+``params`` use the common names ``n_estimators``/``max_depth``/``learning_rate``
+and are translated per backend. Parameters a backend does not have are
+dropped with a warning. The boosted backends stop early on a validation split
+of the training data. HistGradientBoosting does this internally
+(``validation_fraction``), and XGBoost gets an ``eval_set`` of
+``Backend.validation_fraction`` from ``train_and_evaluate``. When XGBoost is
+not installed, ``fallback`` is used instead.
+"""
+
+import inspect
+import os
+import sys
+from typing import Dict, NamedTuple, Optional
+
+import yaml
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+try:
+	import xgboost
+	XGBOOST_AVAILABLE = True
+except ImportError:
+	XGBOOST_AVAILABLE = False
+
+
+TRAIN_CONFIG = os.getenv('TRAIN_CONFIG', 'conf/train.yaml')
+BASE_CONFIG = 'conf/config.yaml'
+
+DEFAULT_MODEL = {'type': 'random_forest', 'params': {'n_estimators': 100}}
+RANDOM_STATE = 42
+
+
+class Backend(NamedTuple):
+	name: str
+	classifier: object
+	encoding: str       # кодування категорій, яке backend використовує за замовчуванням
+	params: Dict        # параметри, з якими створено класифікатор (для MLflow)
+	# Частка тренувальних даних для eval_set, якщо класифікатор зупиняється за ним (XGBoost)
+	validation_fraction: Optional[float] = None
+
+
+def load_train_config(path: str = None) -> Dict:
+	"""``conf/config.yaml`` overlaid with ``path`` (``TRAIN_CONFIG``), section by section."""
+	config = {}
+	for config_path in (BASE_CONFIG, path or TRAIN_CONFIG):
+		if not os.path.exists(config_path):
+			continue
+		with open(config_path, encoding='utf-8') as f:
+			loaded = yaml.safe_load(f) or {}
+		for section, value in loaded.items():
+			if isinstance(value, dict) and isinstance(config.get(section), dict):
+				config[section] = {**config[section], **value}
+			else:
+				config[section] = value
+	return config
+
+
+def _accepted(estimator_cls, params: Dict, backend: str) -> Dict:
+	accepted = inspect.signature(estimator_cls).parameters
+	unknown = sorted(set(params) - set(accepted))
+	if unknown:
+		print(f"Warning: {backend} ignores model.params {', '.join(unknown)}", file=sys.stderr)
+	return {key: value for key, value in params.items() if key in accepted}
+
+
+def _random_forest(params: Dict, early_stopping: Optional[Dict]) -> Backend:
+	params = _accepted(RandomForestClassifier, {'random_state': RANDOM_STATE, **params}, 'random_forest')
+	return Backend('random_forest', RandomForestClassifier(**params), 'dense-onehot', params)
+
+
+def _hist_gradient_boosting(params: Dict, early_stopping: Optional[Dict]) -> Backend:
+	params = dict(params)
+	if 'n_estimators' in params:
+		params['max_iter'] = params.pop('n_estimators')
+	params.setdefault('random_state', RANDOM_STATE)
+	if early_stopping:
+		params.update(early_stopping=True,
+			validation_fraction=early_stopping.get('validation_fraction', 0.1),
+			n_iter_no_change=early_stopping.get('rounds', 10))
+	params = _accepted(HistGradientBoostingClassifier, params, 'hist_gradient_boosting')
+	# Ординальні коди як нативні категоріальні ознаки (build_pipeline задає categorical_features)
+	return Backend('hist_gradient_boosting', HistGradientBoostingClassifier(**params), 'ordinal', params)
+
+
+def _xgboost(params: Dict, early_stopping: Optional[Dict]) -> Backend:
+	params = {'tree_method': 'hist', 'random_state': RANDOM_STATE, 'n_jobs': -1, **params}
+	if early_stopping:
+		params['early_stopping_rounds'] = early_stopping.get('rounds', 10)
+	return Backend('xgboost', xgboost.XGBClassifier(**params), 'dense-onehot', params,
+		(early_stopping or {}).get('validation_fraction', 0.1))
+
+
+BACKENDS = {
+	'random_forest': _random_forest,
+	'hist_gradient_boosting': _hist_gradient_boosting,
+	'xgboost': _xgboost,
+}
+
+
+def make_backend(model_config: Dict = None) -> Backend:
+	"""Build the classifier described by a ``model`` config section."""
+	model_config = model_config or DEFAULT_MODEL
+	name = model_config.get('type', DEFAULT_MODEL['type'])
+	if name not in BACKENDS:
+		raise ValueError(f"unknown model.type {name!r}, expected one of {sorted(BACKENDS)}")
+	if name == 'xgboost' and not XGBOOST_AVAILABLE:
+		fallback = model_config.get('fallback', 'hist_gradient_boosting')
+		print(f'Warning: xgboost is not installed, using model.fallback={fallback}', file=sys.stderr)
+		if fallback == 'xgboost' or fallback not in BACKENDS:
+			raise ValueError(f'model.fallback={fallback!r} cannot replace xgboost')
+		name = fallback
+	return BACKENDS[name](dict(model_config.get('params') or {}), model_config.get('early_stopping'))
@@ -0,0 +1,182 @@
+"""Content-addressed cache of encoded training features for ``pipelines/train.py``.
+
+An entry holds everything ``train.py`` produces before the model fit: the
+encoded train/test matrices, the targets and the fitted preprocessor. It
+lives in ``FEATURE_CACHE_DIR/<key>/``:
+
+	X_train.npy, X_test.npy      щільні матриці (для CSR: X_train.data.npy, .indices.npy, .indptr.npy)
+	y_train.npy, y_test.npy
+	preprocessor.joblib
+	meta.json                    колонки вхідної таблиці, розміри, з чого зібрано ключ
+
+The key is a hash of the input file contents, the preprocessing code version
+and the preprocessing settings (encoding, split, ...). Editing any of them
+gives a new key. Entries that are no longer used age out: after every write
+the least recently used entries are deleted until the cache fits in
+``FEATURE_CACHE_MAX_MB``. Arrays are opened with ``mmap_mode='r'``, so a hit
+costs a few file opens and the OS pages the data in while the model trains.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, NamedTuple, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+FEATURE_CACHE = os.getenv('FEATURE_CACHE', 'true').lower() == 'true'
+FEATURE_CACHE_DIR = os.getenv('FEATURE_CACHE_DIR', '.cache/features')
+FEATURE_CACHE_MAX_MB = float(os.getenv('FEATURE_CACHE_MAX_MB', '2048'))
+
+META_FILE = 'meta.json'
+PREPROCESSOR_FILE = 'preprocessor.joblib'
+_CHUNK = 1 << 20
+
+
+class Features(NamedTuple):
+	"""Encoded train/test data and the preprocessor fitted on the train part."""
+	preprocessor: object
+	X_train: object
+	X_test: object
+	y_train: np.ndarray
+	y_test: np.ndarray
+	# Колонки і dtype вхідної таблиці: з них build_pipeline відтворює класифікатор
+	schema: Dict[str, str]
+
+	def empty_frame(self) -> pd.DataFrame:
+		"""Zero-row frame with the input columns and dtypes (for ``build_pipeline``)."""
+		return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in self.schema.items()})
+
+
+def file_digest(path: str) -> str:
+	"""Hash of a file's contents, or of every file under a directory (Parquet parts)."""
+	digest = hashlib.blake2b(digest_size=16)
+	if os.path.isdir(path):
+		files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+	else:
+		files = [path]
+	for file_path in files:
+		digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+		with open(file_path, 'rb') as f:
+			while chunk := f.read(_CHUNK):
+				digest.update(chunk)
+	return digest.hexdigest()
+
+
+def _save_matrix(path: str, name: str, X) -> None:
+	if sparse.issparse(X):
+		X = X.tocsr()
+		for part in ('data', 'indices', 'indptr'):
+			np.save(os.path.join(path, f'{name}.{part}.npy'), getattr(X, part))
+	else:
+		np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(X))
+
+
+def _load_matrix(path: str, name: str, shape, is_sparse: bool):
+	if not is_sparse:
+		return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+	parts = [np.load(os.path.join(path, f'{name}.{part}.npy'), mmap_mode='r') for part in ('data', 'indices', 'indptr')]
+	return sparse.csr_matrix(tuple(parts), shape=tuple(shape), copy=False)
+
+
+def _dir_nbytes(path: str) -> int:
+	return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class FeatureCache:
+	"""Directory of :class:`Features` entries with size-bounded LRU eviction."""
+
+	def __init__(self, root: str = None, max_mb: float = None):
+		self.root = root or FEATURE_CACHE_DIR
+		self.max_bytes = (FEATURE_CACHE_MAX_MB if max_mb is None else max_mb) * 2**20
+
+	def key(self, data_path: str, settings: Dict) -> str:
+		"""Key of the features built from ``data_path`` with ``settings`` (incl. the code version)."""
+		payload = json.dumps({'data': file_digest(data_path), **settings}, sort_keys=True, default=str)
+		return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+	def get(self, key: str) -> Optional[Features]:
+		"""The cached entry (arrays memory-mapped) or None. A broken entry is deleted."""
+		path = os.path.join(self.root, key)
+		meta_path = os.path.join(path, META_FILE)
+		if not os.path.exists(meta_path):
+			return None
+		try:
+			with open(meta_path, encoding='utf-8') as f:
+				meta = json.load(f)
+			features = Features(
+				preprocessor=joblib.load(os.path.join(path, PREPROCESSOR_FILE), mmap_mode='r'),
+				X_train=_load_matrix(path, 'X_train', meta['X_train_shape'], meta['sparse']),
+				X_test=_load_matrix(path, 'X_test', meta['X_test_shape'], meta['sparse']),
+				y_train=np.load(os.path.join(path, 'y_train.npy'), mmap_mode='r'),
+				y_test=np.load(os.path.join(path, 'y_test.npy'), mmap_mode='r'),
+				schema=meta['schema'],
+			)
+		except Exception as e:
+			print(f'Warning: dropping unreadable feature cache entry {key} ({e})', file=sys.stderr)
+			shutil.rmtree(path, ignore_errors=True)
+			return None
+		# mtime meta.json — час останнього використання для LRU
+		os.utime(meta_path)
+		return features
+
+	def put(self, key: str, features: Features, **meta) -> str:
+		"""Store ``features`` under ``key`` and evict old entries. Returns the entry path."""
+		path = os.path.join(self.root, key)
+		# Пишемо в тимчасовий каталог і перейменовуємо: обірваний запис не стане "влученням"
+		staging = f'{path}.tmp-{os.getpid()}'
+		shutil.rmtree(staging, ignore_errors=True)
+		os.makedirs(staging)
+		_save_matrix(staging, 'X_train', features.X_train)
+		_save_matrix(staging, 'X_test', features.X_test)
+		np.save(os.path.join(staging, 'y_train.npy'), np.asarray(features.y_train))
+		np.save(os.path.join(staging, 'y_test.npy'), np.asarray(features.y_test))
+		joblib.dump(features.preprocessor, os.path.join(staging, PREPROCESSOR_FILE))
+		meta = {
+			**meta,
+			'schema': features.schema,
+			'sparse': bool(sparse.issparse(features.X_train)),
+			'X_train_shape': list(features.X_train.shape),
+			'X_test_shape': list(features.X_test.shape),
+			'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		}
+		with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+			json.dump(meta, f, indent=2, default=str)
+
+		shutil.rmtree(path, ignore_errors=True)
+		os.rename(staging, path)
+		self.evict(keep=key)
+		return path
+
+	def entries(self) -> Dict[str, tuple]:
+		"""``{key: (last_used, nbytes)}`` of the complete entries."""
+		if not os.path.isdir(self.root):
+			return {}
+		result = {}
+		for entry in os.scandir(self.root):
+			meta_path = os.path.join(entry.path, META_FILE)
+			if entry.is_dir() and os.path.exists(meta_path):
+				result[entry.name] = (os.path.getmtime(meta_path), _dir_nbytes(entry.path))
+		return result
+
+	def evict(self, keep: str = None) -> list:
+		"""Delete least recently used entries (never ``keep``) until the cache fits. Returns their keys."""
+		entries = self.entries()
+		total = sum(nbytes for _, nbytes in entries.values())
+		evicted = []
+		for key, (_, nbytes) in sorted(entries.items(), key=lambda item: item[1][0]):
+			if total <= self.max_bytes:
+				break
+			if key == keep:
+				continue
+			shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+			total -= nbytes
+			evicted.append(key)
+		return evicted
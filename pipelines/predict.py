@@ -1,4 +1,307 @@
-# Placeholder для інференсу
-def predict(data):
-    # Завантажити модель, передбачити churn
-    pass
+"""Score a customer file in bulk with the saved churn model.
+
+The input (CSV or Parquet) is read in chunks of ``--chunk-size`` rows and the
+chunks are scored by a pool of ``--workers`` processes, each of which loads the
+model once. Every scored chunk is written to its own part file next to the
+output and recorded in a progress manifest, so memory stays bounded by
+``workers x chunk size`` and an interrupted run continues from the chunks that
+are already done:
+
+	python pipelines/predict.py --input data/processed/churn_dataset.csv \\
+		--output data/processed/churn_predictions.csv --workers 4 --chunk-size 200000
+
+When all chunks are done the parts are concatenated into ``--output``.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+
+import joblib  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from src.features import NUMERIC_COLUMNS  # noqa: E402
+
+
+DATA_PATH = os.getenv('DATA_PATH', 'data/telco_customers.csv')
+MODEL_PATH = os.getenv('MODEL_PATH', 'models/churn_model.pkl')
+OUTPUT_PATH = os.getenv('PREDICTIONS_PATH', 'data/processed/churn_predictions.csv')
+
+ID_COLUMN = 'customerID'
+MANIFEST_FILE = 'progress.json'
+
+# Модель окремого воркера (завантажується один раз в initializer)
+_model = None
+
+
+def _load_model(model_path: str):
+	model = joblib.load(model_path)
+	# Паралелізм дає пул процесів; потоки joblib у кожному воркері лише конкурують за CPU
+	classifier = model.steps[-1][1] if hasattr(model, 'steps') else model
+	if hasattr(classifier, 'n_jobs'):
+		classifier.n_jobs = 1
+	return model
+
+
+def _init_worker(model_path: str):
+	global _model
+	_model = _load_model(model_path)
+
+
+def _feature_columns(model):
+	columns = getattr(model, 'feature_names_in_', None)
+	return [str(col) for col in columns] if columns is not None else None
+
+
+def _is_parquet(path: str) -> bool:
+	return os.path.isdir(path) or path.endswith('.parquet')
+
+
+def _parquet_files(path: str) -> list:
+	if not os.path.isdir(path):
+		return [path]
+	return sorted(
+		os.path.join(root, name) for root, _, names in os.walk(path) for name in names if name.endswith('.parquet')
+	)
+
+
+def _read_parquet_chunks(path: str, chunk_size: int, columns=None):
+	try:
+		import pyarrow as pa
+		import pyarrow.parquet as pq
+	except ImportError:
+		print('Error: reading Parquet requires pyarrow (pip install pyarrow)', file=sys.stderr)
+		sys.exit(2)
+
+	# Row group-и (місяці) різного розміру перепаковуємо у чанки рівно по chunk_size рядків,
+	# щоб нумерація чанків для відновлення не залежала від структури файлів
+	pending, pending_rows = [], 0
+	for file_path in _parquet_files(path):
+		parquet = pq.ParquetFile(file_path)
+		names = parquet.schema_arrow.names
+		selected = [col for col in columns if col in names] if columns is not None else None
+		for batch in parquet.iter_batches(batch_size=chunk_size, columns=selected):
+			pending.append(batch)
+			pending_rows += batch.num_rows
+			while pending_rows >= chunk_size:
+				table = pa.Table.from_batches(pending)
+				yield table.slice(0, chunk_size).to_pandas()
+				rest = table.slice(chunk_size)
+				pending, pending_rows = rest.to_batches(), rest.num_rows
+	if pending_rows:
+		yield pa.Table.from_batches(pending).to_pandas()
+
+
+def read_chunks(path: str, chunk_size: int, columns=None):
+	"""Yield DataFrames of ``chunk_size`` rows (the last may be shorter) from CSV or Parquet.
+
+	A Parquet input may be a single file or a directory of part files, read in
+	file name order.
+	"""
+	if _is_parquet(path):
+		yield from _read_parquet_chunks(path, chunk_size, columns)
+		return
+
+	usecols = None
+	if columns is not None:
+		wanted = set(columns)
+		usecols = lambda col: col in wanted  # noqa: E731
+	yield from pd.read_csv(path, chunksize=chunk_size, usecols=usecols)
+
+
+def score_frame(model, df: pd.DataFrame) -> pd.DataFrame:
+	"""Return ``customerID`` (if present), ``churn_probability`` and ``churn_prediction``."""
+	X = df.drop(columns=[ID_COLUMN, 'Churn'], errors='ignore')
+	features = _feature_columns(model)
+	if features is not None:
+		X = X[features].copy()
+	# Та сама мінімальна обробка, що й у API (src/api/predict.py::preprocess_batch)
+	for col in NUMERIC_COLUMNS:
+		if col in X.columns:
+			X[col] = pd.to_numeric(X[col], errors='coerce').fillna(0)
+
+	proba = model.predict_proba(X)[:, 1]
+	out = pd.DataFrame(index=df.index)
+	if ID_COLUMN in df.columns:
+		out[ID_COLUMN] = df[ID_COLUMN].values
+	out['churn_probability'] = proba
+	out['churn_prediction'] = (proba >= 0.5).astype(int)
+	return out
+
+
+def score_chunk(index: int, df: pd.DataFrame, part_path: str, model=None) -> tuple:
+	"""Score one chunk and write it atomically to ``part_path``; returns (index, rows)."""
+	result = score_frame(model if model is not None else _model, df)
+	tmp_path = f'{part_path}.tmp'
+	result.to_csv(tmp_path, index=False)
+	os.replace(tmp_path, part_path)
+	return index, len(result)
+
+
+def _part_path(parts_dir: str, index: int) -> str:
+	return os.path.join(parts_dir, f'part-{index:06d}.csv')
+
+
+def _run_key(input_path: str, model_path: str, chunk_size: int) -> dict:
+	"""Що має збігатися, щоб продовжити попередній запуск."""
+	files = _parquet_files(input_path) if os.path.isdir(input_path) else [input_path]
+	stats = [os.stat(path) for path in files]
+	model_stat = os.stat(model_path)
+	return {
+		'input': os.path.abspath(input_path),
+		'input_size': sum(stat.st_size for stat in stats),
+		'input_mtime_ns': max((stat.st_mtime_ns for stat in stats), default=0),
+		# Як file_version у src/api/predict.py: ns-час і розмір, перезапис у ту ж секунду теж помітний
+		'model_mtime_ns': model_stat.st_mtime_ns,
+		'model_size': model_stat.st_size,
+		'chunk_size': chunk_size,
+	}
+
+
+def _load_manifest(parts_dir: str, key: dict) -> set:
+	path = os.path.join(parts_dir, MANIFEST_FILE)
+	if not os.path.exists(path):
+		return set()
+	with open(path, encoding='utf-8') as f:
+		manifest = json.load(f)
+	if manifest.get('run') != key:
+		print('Input, model or chunk size changed since the last run; starting over')
+		return set()
+	# Враховуємо лише частини, файл яких справді існує
+	return {i for i in manifest.get('completed', []) if os.path.exists(_part_path(parts_dir, i))}
+
+
+def _save_manifest(parts_dir: str, key: dict, completed: set, rows: int) -> None:
+	path = os.path.join(parts_dir, MANIFEST_FILE)
+	tmp_path = f'{path}.tmp'
+	with open(tmp_path, 'w', encoding='utf-8') as f:
+		json.dump({'run': key, 'completed': sorted(completed), 'rows': rows}, f)
+	os.replace(tmp_path, path)
+
+
+def _concatenate(parts_dir: str, n_chunks: int, output_path: str) -> None:
+	"""Склеює частини у вихідний CSV потоково (заголовок — лише з першої частини)."""
+	tmp_path = f'{output_path}.tmp'
+	with open(tmp_path, 'wb') as out:
+		for i in range(n_chunks):
+			with open(_part_path(parts_dir, i), 'rb') as part:
+				if i > 0:
+					part.readline()
+				shutil.copyfileobj(part, out)
+	os.replace(tmp_path, output_path)
+
+
+class _Progress:
+	def __init__(self, interval: float = 5.0):
+		self.start = time.perf_counter()
+		self.last_report = self.start
+		self.interval = interval
+		self.rows = 0
+		self.chunks = 0
+
+	def update(self, rows: int) -> None:
+		self.rows += rows
+		self.chunks += 1
+		if time.perf_counter() - self.last_report >= self.interval:
+			self.report()
+
+	def report(self) -> None:
+		self.last_report = time.perf_counter()
+		elapsed = self.last_report - self.start
+		print(f'Scored {self.chunks} chunks, {self.rows:,} rows '
+			f'({self.rows / max(elapsed, 1e-9):,.0f} rows/s)')
+
+
+def score_file(input_path: str, output_path: str, model_path: str = MODEL_PATH, workers: int = 1,
+		chunk_size: int = 100_000, keep_parts: bool = False) -> dict:
+	"""Score ``input_path`` into ``output_path``, resuming a previous partial run."""
+	if not os.path.exists(input_path):
+		print(f'Error: input file not found: {input_path}', file=sys.stderr)
+		sys.exit(2)
+
+	parts_dir = f'{output_path}.parts'
+	os.makedirs(parts_dir, exist_ok=True)
+	key = _run_key(input_path, model_path, chunk_size)
+	completed = _load_manifest(parts_dir, key)
+	if completed:
+		print(f'Resuming: {len(completed)} chunks already scored')
+
+	model = _load_model(model_path)
+	columns = _feature_columns(model)
+	if columns is not None:
+		columns = columns + [ID_COLUMN]
+
+	progress = _Progress()
+	n_chunks = 0
+	skipped_rows = 0
+
+	def finished(index: int, rows: int) -> None:
+		completed.add(index)
+		progress.update(rows)
+		_save_manifest(parts_dir, key, completed, progress.rows + skipped_rows)
+
+	chunks = read_chunks(input_path, chunk_size, columns)
+	if workers <= 1:
+		for index, df in enumerate(chunks):
+			n_chunks = index + 1
+			if index in completed:
+				skipped_rows += len(df)
+				continue
+			finished(*score_chunk(index, df, _part_path(parts_dir, index), model=model))
+	else:
+		del model  # воркери завантажують власну копію
+		with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+			pending = set()
+			for index, df in enumerate(chunks):
+				n_chunks = index + 1
+				if index in completed:
+					skipped_rows += len(df)
+					continue
+				# Не більше 2 чанків на воркера в черзі: пам'ять обмежена незалежно від розміру файлу
+				while len(pending) >= 2 * workers:
+					done, pending = wait(pending, return_when=FIRST_COMPLETED)
+					for future in done:
+						finished(*future.result())
+				pending.add(pool.submit(score_chunk, index, df, _part_path(parts_dir, index)))
+			for future in wait(pending).done:
+				finished(*future.result())
+
+	if progress.chunks:
+		progress.report()
+	_concatenate(parts_dir, n_chunks, output_path)
+	if not keep_parts:
+		shutil.rmtree(parts_dir, ignore_errors=True)
+
+	total_rows = progress.rows + skipped_rows
+	elapsed = time.perf_counter() - progress.start
+	print(f'✓ {total_rows:,} predictions written to {output_path} in {elapsed:.1f}s')
+	return {'rows': total_rows, 'chunks': n_chunks, 'scored_chunks': progress.chunks, 'seconds': elapsed}
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Bulk churn scoring of a CSV or Parquet file')
+	parser.add_argument('--input', default=DATA_PATH, help='Customer file (.csv, .parquet or a Parquet directory)')
+	parser.add_argument('--output', default=OUTPUT_PATH, help='Output CSV with churn probabilities')
+	parser.add_argument('--model', default=MODEL_PATH, help='Saved sklearn Pipeline (joblib)')
+	parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Scoring processes')
+	parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows per chunk')
+	parser.add_argument('--keep-parts', action='store_true', help='Keep per-chunk part files and the manifest')
+	args = parser.parse_args()
+
+	if args.chunk_size < 1:
+		parser.error('--chunk-size must be >= 1')
+	os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+	score_file(args.input, args.output, model_path=args.model, workers=args.workers,
+		chunk_size=args.chunk_size, keep_parts=args.keep_parts)
+
+
+if __name__ == '__main__':
+	main()
@@ -5,16 +5,34 @@ the script will still train and save a local model when MLflow is not
 available or not configured.
 """
 
+import argparse
+import hashlib
+import inspect
 import os
 import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+
+import numpy as np
 import pandas as pd
 import joblib
+import sklearn
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score
+from joblib import effective_n_jobs
+
+from pipelines.backends import TRAIN_CONFIG, BACKENDS, load_train_config, make_backend
+from pipelines.feature_cache import FEATURE_CACHE, FEATURE_CACHE_DIR, FeatureCache, Features
+from src.features import DATE_COLUMNS, DateFeatures, split_feature_columns, to_float32
+from src.profiling import PhaseTimer, add_profiling_args, profiled
 
 # Optional progress bar
 try:
@@ -23,11 +41,38 @@ try:
 except Exception:
 	TQDM_AVAILABLE = False
 
+# Per-tree progress hooks into joblib's private ThreadingBackend.batch_completed
+# (tested range pinned in requirements-ml.txt); without it the forest is fitted plainly
+try:
+	from joblib import parallel_config
+	from joblib._parallel_backends import ThreadingBackend
+	TREE_PROGRESS_AVAILABLE = callable(getattr(ThreadingBackend, 'batch_completed', None))
+except ImportError:
+	TREE_PROGRESS_AVAILABLE = False
+
 
 # Paths (can be overridden with env vars)
 DATA_PATH = os.getenv('DATA_PATH', 'data/telco_customers.csv')
 MODEL_PATH = os.getenv('MODEL_PATH', 'models/churn_model.pkl')
 
+# 'parallel': one fit, trees built by TRAIN_N_JOBS threads; 'chunked': the old warm-start chunks
+TRAIN_MODES = ('parallel', 'chunked')
+TRAIN_MODE = os.getenv('TRAIN_MODE', 'parallel')
+TRAIN_N_JOBS = int(os.getenv('TRAIN_N_JOBS', '-1'))
+
+# RecordDate → числові ознаки року/місяця (інакше колонка не потрапляє в модель)
+DATE_FEATURES = os.getenv('DATE_FEATURES', 'true').lower() == 'true'
+# Максимум one-hot колонок на категоріальну ознаку; рідкісні значення йдуть в одну "infrequent"
+MAX_CATEGORIES = int(os.getenv('MAX_CATEGORIES', '32'))
+# Кодування категорій: щільний / розріджений one-hot або ординальні коди.
+# Без ENCODING береться model.encoding з конфігу або кодування, яке обирає backend
+ENCODINGS = ('dense-onehot', 'sparse-onehot', 'ordinal')
+ENCODING = os.getenv('ENCODING')
+# Тип моделі поверх model.type з conf/train.yaml
+MODEL_TYPE = os.getenv('MODEL_TYPE')
+# 'random' або 'time' (тест — найпізніші RecordDate)
+TRAIN_SPLIT = os.getenv('TRAIN_SPLIT', 'random')
+
 # MLflow configuration via environment variables (optional)
 MLFLOW_TRACKING_URI = os.getenv('MLFLOW_TRACKING_URI', '').strip()
 MLFLOW_EXPERIMENT = os.getenv('MLFLOW_EXPERIMENT', 'telco_churn_experiment')
@@ -43,111 +88,414 @@ except Exception:
 	MLFLOW_AVAILABLE = False
 
 
-def load_data(path: str) -> pd.DataFrame:
+def load_data(path: str, exclude=('customerID',)) -> pd.DataFrame:
+	"""Read the training table from CSV or Parquet, skipping the ``exclude`` columns.
+
+	A Parquet path may be a single file or a directory of part files written by
+	``generate_dataset_ext.py --format parquet``. Only the needed columns are read,
+	and dictionary-encoded string columns come back as ``category``.
+	"""
 	if not os.path.exists(path):
 		print(f"Error: data file not found: {path}", file=sys.stderr)
 		sys.exit(2)
 
-	df = pd.read_csv(path)
+	if os.path.isdir(path) or path.endswith('.parquet'):
+		try:
+			import pyarrow.dataset as ds
+		except ImportError:
+			print('Error: reading Parquet requires pyarrow (pip install pyarrow)', file=sys.stderr)
+			sys.exit(2)
+		dataset = ds.dataset(path, format='parquet')
+		columns = [name for name in dataset.schema.names if name not in exclude]
+		return dataset.to_table(columns=columns).to_pandas()
+
+	df = pd.read_csv(path, usecols=lambda col: col not in exclude)
 	return df
 
 
-def build_pipeline(X: pd.DataFrame) -> Pipeline:
-	categorical_cols = X.select_dtypes(include=['object']).columns.tolist()
-	numerical_cols = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
+def prepare_frame(df: pd.DataFrame):
+	"""Clean the loaded table and split it into features ``X`` and the 0/1 target ``y``."""
+	# Basic preprocessing
+	df = df.drop(['customerID'], axis=1, errors='ignore')
+	if 'TotalCharges' in df.columns:
+		df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
+	df = df.dropna()
+
+	if 'Churn' not in df.columns:
+		print('Error: target column "Churn" not found in data', file=sys.stderr)
+		sys.exit(2)
+
+	X = df.drop('Churn', axis=1)
+	y = df['Churn'].map({'Yes': 1, 'No': 0})
+	return X, y
+
+
+def preprocessing_version() -> str:
+	"""Hash of the code and library versions that turn the input table into features."""
+	import src.features
+
+	sources = [inspect.getsource(fn) for fn in (load_data, prepare_frame, build_pipeline, split_data)]
+	sources += [inspect.getsource(src.features), sklearn.__version__, pd.__version__, np.__version__]
+	return hashlib.blake2b('\n'.join(sources).encode('utf-8'), digest_size=16).hexdigest()
 
-	# Build a OneHotEncoder in a way that's compatible with multiple
-	# scikit-learn versions (some use `sparse`, newer ones use `sparse_output`).
-	try:
-		encoder = OneHotEncoder(handle_unknown='ignore', sparse=False)
-	except TypeError:
-		# Fallback for newer sklearn versions
-		encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-
-	preprocessor = ColumnTransformer(
-		transformers=[
-			('num', 'passthrough', numerical_cols),
-			('cat', encoder, categorical_cols),
-		]
-	)
+
+def build_pipeline(X: pd.DataFrame, date_features: bool = None, max_categories: int = None,
+		encoding: str = None, classifier=None) -> Pipeline:
+	"""Preprocessor + classifier (RandomForest by default) for the columns of ``X``.
+
+	Date columns (``RecordDate``) are never one-hot encoded: with
+	``date_features`` (default ``DATE_FEATURES``) they become numeric
+	year/month features (:class:`src.features.DateFeatures`), otherwise they
+	are dropped. Every categorical column gets at most ``max_categories``
+	(default ``MAX_CATEGORIES``) distinct codes; rarer values share an
+	"infrequent" one, which also takes values unseen in training.
+
+	``encoding`` (default ``ENCODING``, else ``'dense-onehot'``) picks how categories are encoded:
+	``'dense-onehot'``, ``'sparse-onehot'`` (CSR output) or ``'ordinal'`` (one
+	float code per column, -1 for unknown values). The ordinal codes are passed
+	to a histogram GBM as native categorical features. All encodings emit
+	float32, the dtype the trees use internally, so no float64 copy is made.
+	"""
+	date_features = DATE_FEATURES if date_features is None else date_features
+	max_categories = max_categories or MAX_CATEGORIES
+	encoding = encoding or ENCODING or 'dense-onehot'
+	if encoding not in ENCODINGS:
+		raise ValueError(f"unknown encoding {encoding!r}, expected one of {ENCODINGS}")
+	numerical_cols, categorical_cols, date_cols = split_feature_columns(X)
+
+	if encoding == 'ordinal':
+		encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+			max_categories=max_categories, dtype=np.float32)
+	else:
+		sparse = encoding == 'sparse-onehot'
+		# Build a OneHotEncoder in a way that's compatible with multiple
+		# scikit-learn versions (some use `sparse`, newer ones use `sparse_output`).
+		try:
+			encoder = OneHotEncoder(handle_unknown='infrequent_if_exist', max_categories=max_categories,
+				sparse=sparse, dtype=np.float32)
+		except TypeError:
+			# Fallback for newer sklearn versions
+			encoder = OneHotEncoder(handle_unknown='infrequent_if_exist', max_categories=max_categories,
+				sparse_output=sparse, dtype=np.float32)
+
+	transformers = [
+		('num', FunctionTransformer(to_float32, feature_names_out='one-to-one'), numerical_cols),
+		('cat', encoder, categorical_cols),
+	]
+	if date_features and date_cols:
+		transformers.append(('date', DateFeatures(dtype=np.float32), date_cols))
+	preprocessor = ColumnTransformer(transformers=transformers,
+		sparse_threshold=1.0 if encoding == 'sparse-onehot' else 0.0)
+
+	if classifier is None:
+		classifier = RandomForestClassifier(n_estimators=100, random_state=42)
+	if encoding == 'ordinal' and 'categorical_features' in classifier.get_params():
+		# Ознаки після ColumnTransformer: спершу числові, далі по одному коду на категоріальну
+		start = len(numerical_cols)
+		classifier.set_params(categorical_features=list(range(start, start + len(categorical_cols))))
 
 	model = Pipeline(steps=[
 		('preprocessor', preprocessor),
-		('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
+		('classifier', classifier)
 	])
 
 	return model
 
 
-def train_and_evaluate(model: Pipeline, X_train, X_test, y_train, y_test, show_progress: bool = True):
-	"""Train the pipeline. If the classifier supports warm_start, train in chunks
-	and show a tqdm progress bar (if available). Returns (accuracy, trained_pipeline).
+def split_data(X: pd.DataFrame, y, how: str = 'random', test_size: float = 0.2):
+	"""Train/test split. ``how='time'`` tests on the latest ``test_size`` share of ``RecordDate``."""
+	if how == 'time':
+		if DATE_COLUMNS[0] not in X.columns:
+			raise ValueError(f'time split needs the {DATE_COLUMNS[0]} column')
+		dates = pd.to_datetime(X[DATE_COLUMNS[0]].astype(str), errors='coerce')
+		test = (dates > dates.quantile(1 - test_size)).to_numpy()
+		return X[~test], X[test], y[~test], y[test]
+	return train_test_split(X, y, test_size=test_size, random_state=42)
+
+
+def matrix_nbytes(X) -> int:
+	"""Bytes held by a dense or sparse (CSR/CSC) feature matrix."""
+	if hasattr(X, 'indptr'):
+		return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+	return X.nbytes
+
+
+def describe_matrix(X) -> str:
+	"""``rows × columns dtype (MiB)`` of a dense or sparse feature matrix."""
+	kind = 'sparse ' if hasattr(X, 'indptr') else ''
+	return f'{X.shape[0]:,} × {X.shape[1]} {kind}{X.dtype} ({matrix_nbytes(X) / 2**20:.1f} MiB)'
+
+
+if TREE_PROGRESS_AVAILABLE:
+	class _TreeProgressBackend(ThreadingBackend):
+		"""joblib threading backend that reports every finished task (one tree of a forest)."""
+
+		def __init__(self, on_done, **kwargs):
+			super().__init__(**kwargs)
+			self.on_done = on_done
+
+		def batch_completed(self, batch_size, duration):
+			super().batch_completed(batch_size, duration)
+			self.on_done(batch_size)
+
+
+class TreeProgress:
+	"""Thread-safe per-tree counter that drives a tqdm bar and an optional callback."""
+
+	def __init__(self, total: int, show_progress: bool = True, callback=None):
+		self.total = total
+		self.done = 0
+		self.callback = callback
+		self._lock = threading.Lock()
+		self._bar = tqdm(total=total, desc='Training trees', unit='trees') if TQDM_AVAILABLE and show_progress else None
+		self._started = time.perf_counter()
+		self.seconds = 0.0
+
+	def __call__(self, n: int = 1):
+		with self._lock:
+			self.done += n
+			if self._bar is not None:
+				self._bar.update(n)
+			if self.callback is not None:
+				self.callback(self.done, self.total)
+
+	def close(self):
+		self.seconds = time.perf_counter() - self._started
+		# Без пулу потоків (n_jobs=1) joblib не повідомляє про окремі дерева — закриваємо бар тут
+		if self.done < self.total:
+			self(self.total - self.done)
+		if self._bar is not None:
+			self._bar.close()
+
+	@property
+	def trees_per_sec(self) -> float:
+		return self.done / self.seconds if self.seconds else 0.0
+
+
+def _fit_chunked(classifier, X, y, show_progress: bool):
+	"""Grow a warm-start forest in 10 chunks (one full ``fit`` per chunk)."""
+	total_estimators = classifier.n_estimators
+	chunk = max(1, total_estimators // 10)
+	steps = list(range(chunk, total_estimators + 1, chunk))
+	if steps[-1] != total_estimators:
+		steps.append(total_estimators)
+
+	if TQDM_AVAILABLE and show_progress:
+		steps = tqdm(steps, desc='Training trees', unit='trees')
+	else:
+		print(f"Training RandomForest in chunks up to {total_estimators} trees...")
+	for n in steps:
+		classifier.warm_start = True
+		classifier.n_estimators = n
+		classifier.fit(X, y)
+
+
+def _fit_parallel(classifier, X, y, show_progress: bool, n_jobs: int, on_tree=None) -> TreeProgress:
+	"""Build all trees in one ``fit`` on ``n_jobs`` threads, reporting each finished tree.
+
+	``on_tree(done, total)`` is called from the worker threads. ``n_jobs`` is
+	reset afterwards, so the saved model predicts single-threaded as before.
+	If this joblib has no usable progress hook (``TREE_PROGRESS_AVAILABLE``),
+	the forest is fitted on ``n_jobs`` threads without per-tree reports and
+	the progress only completes at the end, with a warning.
+	"""
+	progress = TreeProgress(classifier.n_estimators, show_progress=show_progress, callback=on_tree)
+	previous = classifier.n_jobs
+	classifier.n_jobs = n_jobs
+	try:
+		if TREE_PROGRESS_AVAILABLE:
+			# Дерева будуються в потоках (Cython без GIL), тож дані не копіюються між процесами
+			with parallel_config(backend=_TreeProgressBackend(progress)):
+				classifier.fit(X, y)
+		else:
+			print('Warning: this joblib version has no per-tree progress hook; fitting without progress',
+				file=sys.stderr)
+			classifier.fit(X, y)
+		if TREE_PROGRESS_AVAILABLE and progress.done == 0 and min(effective_n_jobs(n_jobs), progress.total) > 1:
+			print('Warning: joblib reported no finished trees; per-tree progress is broken with '
+				f'joblib {joblib.__version__}', file=sys.stderr)
+	finally:
+		classifier.n_jobs = previous
+		progress.close()
+	return progress
+
+
+def train_and_evaluate(model: Pipeline, X_train, X_test, y_train, y_test, show_progress: bool = True,
+		timer: PhaseTimer = None, mode: str = None, n_jobs: int = None, on_tree=None,
+		validation_fraction: float = None):
+	"""Train the pipeline and return (accuracy, trained_pipeline).
+
+	A forest is trained according to ``mode`` (default ``TRAIN_MODE``):
+	``'parallel'`` builds all trees in one fit on ``n_jobs`` threads (default
+	``TRAIN_N_JOBS``, -1 = all cores) and reports every finished tree to a tqdm
+	bar and to ``on_tree(done, total)``; ``'chunked'`` grows a warm-start forest
+	in 10 refits, as before. Both give the same trees for the same
+	``random_state``. Other classifiers are fitted once. A classifier with
+	``early_stopping_rounds`` (XGBoost) is fitted on all but the last
+	``validation_fraction`` (default 0.1) of the training rows and stops on
+	the rest as its ``eval_set``.
+
+	With a ``timer`` the encoder fit, the classifier fit and the evaluation are
+	recorded as the ``encode``, ``fit`` and ``eval`` phases.
 	"""
-	# Extract preprocessor and classifier
+	timer = timer or PhaseTimer()
 	preprocessor = model.named_steps['preprocessor']
-	classifier = model.named_steps['classifier']
 
 	# Fit/transform preprocessors once
-	X_train_t = preprocessor.fit_transform(X_train)
-	X_test_t = preprocessor.transform(X_test)
+	with timer.phase('encode'):
+		X_train_t = preprocessor.fit_transform(X_train)
+		X_test_t = preprocessor.transform(X_test)
+	return fit_and_evaluate(model, X_train_t, X_test_t, y_train, y_test, show_progress=show_progress, timer=timer,
+		mode=mode, n_jobs=n_jobs, on_tree=on_tree, validation_fraction=validation_fraction)
+
+
+def fit_and_evaluate(model: Pipeline, X_train_t, X_test_t, y_train, y_test, show_progress: bool = True,
+		timer: PhaseTimer = None, mode: str = None, n_jobs: int = None, on_tree=None,
+		validation_fraction: float = None):
+	"""The model part of :func:`train_and_evaluate` for already encoded matrices.
+
+	``model``'s preprocessor must be fitted; only the classifier is trained.
+	"""
+	timer = timer or PhaseTimer()
+	mode = mode or TRAIN_MODE
+	if mode not in TRAIN_MODES:
+		raise ValueError(f"unknown train mode {mode!r}, expected one of {TRAIN_MODES}")
+	n_jobs = TRAIN_N_JOBS if n_jobs is None else n_jobs
+
+	preprocessor = model.named_steps['preprocessor']
+	classifier = model.named_steps['classifier']
+	print(f'Feature matrix: {describe_matrix(X_train_t)}')
 
 	total_estimators = getattr(classifier, 'n_estimators', None)
-	supports_warm = hasattr(classifier, 'warm_start')
-
-	if supports_warm and total_estimators and total_estimators > 1:
-		# Train in chunks to provide progress updates
-		chunk = max(1, total_estimators // 10)
-		trained = 0
-
-		if TQDM_AVAILABLE and show_progress:
-			iterator = list(range(chunk, total_estimators + 1, chunk))
-			if iterator[-1] != total_estimators:
-				iterator.append(total_estimators)
-			for n in tqdm(iterator, desc='Training trees', unit='trees'):
-				classifier.warm_start = True
-				classifier.n_estimators = n
-				classifier.fit(X_train_t, y_train)
-				trained = n
+	is_forest = hasattr(classifier, 'warm_start') and hasattr(classifier, 'n_jobs') and total_estimators
+
+	with timer.phase('fit'):
+		if is_forest and mode == 'parallel':
+			progress = _fit_parallel(classifier, X_train_t, y_train, show_progress, n_jobs, on_tree)
+			print(f'Built {progress.done} trees in {progress.seconds:.1f}s '
+				f'({progress.trees_per_sec:.1f} trees/s, n_jobs={n_jobs})')
+		elif is_forest and total_estimators > 1:
+			_fit_chunked(classifier, X_train_t, y_train, show_progress)
+		elif getattr(classifier, 'early_stopping_rounds', None):
+			X_fit, X_val, y_fit, y_val = train_test_split(X_train_t, y_train,
+				test_size=validation_fraction or 0.1, random_state=42)
+			classifier.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+			print(f'Early stopping: best iteration {classifier.best_iteration} of {total_estimators}')
 		else:
-			print(f"Training RandomForest in chunks up to {total_estimators} trees...")
-			for n in range(chunk, total_estimators + 1, chunk):
-				classifier.warm_start = True
-				classifier.n_estimators = n
-				classifier.fit(X_train_t, y_train)
-				trained = n
-	else:
-		# Fallback: single fit
-		classifier.fit(X_train_t, y_train)
+			# Fallback: single fit
+			classifier.fit(X_train_t, y_train)
+			if getattr(classifier, 'early_stopping', None) is True:
+				print(f'Early stopping: {classifier.n_iter_} of {classifier.max_iter} iterations')
 
 	# Build final pipeline with trained components
 	trained_pipeline = Pipeline([('preprocessor', preprocessor), ('classifier', classifier)])
 
 	# Evaluate
-	y_pred = trained_pipeline.predict(X_test)
-	acc = accuracy_score(y_test, y_pred)
+	with timer.phase('eval'):
+		y_pred = classifier.predict(X_test_t)
+		acc = accuracy_score(y_test, y_pred)
 	return acc, trained_pipeline
 
 
-def main():
-	df = load_data(DATA_PATH)
-
-	# Basic preprocessing
-	df = df.drop(['customerID'], axis=1, errors='ignore')
-	if 'TotalCharges' in df.columns:
-		df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-	df = df.dropna()
-
-	if 'Churn' not in df.columns:
-		print('Error: target column "Churn" not found in data', file=sys.stderr)
-		sys.exit(2)
-
-	X = df.drop('Churn', axis=1)
-	y = df['Churn'].map({'Yes': 1, 'No': 0})
-
-	model = build_pipeline(X)
-
-	X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def _log_timings_to_mlflow(run_id: str, report: dict):
+	"""Attach the phase report to an MLflow run (artifact + ``time_<phase>_s`` metrics)."""
+	try:
+		with mlflow.start_run(run_id=run_id):
+			mlflow.log_dict(report, 'profiling/train_timings.json')
+			mlflow.log_metrics({
+				f"time_{name.replace('/', '_')}_s": entry['seconds'] for name, entry in report['phases'].items()
+			})
+	except Exception as e:
+		print(f'Warning: could not log timings to MLflow: {e}')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Train the churn model (DATA_PATH → MODEL_PATH)')
+	parser.add_argument('--train-mode', choices=TRAIN_MODES, default=TRAIN_MODE,
+		help='parallel: one fit on --n-jobs threads with per-tree progress; chunked: 10 warm-start refits')
+	parser.add_argument('--n-jobs', type=int, default=TRAIN_N_JOBS,
+		help='Threads for building trees in parallel mode (-1 = all cores)')
+	parser.add_argument('--config', default=TRAIN_CONFIG,
+		help='Training config with the model section, overlaid on conf/config.yaml')
+	parser.add_argument('--model-type', choices=sorted(BACKENDS), default=MODEL_TYPE,
+		help='Override model.type from --config')
+	parser.add_argument('--encoding', choices=ENCODINGS, default=ENCODING,
+		help='How categorical columns are encoded (all float32; default: the backend\'s choice)')
+	parser.add_argument('--split', choices=['random', 'time'], default=TRAIN_SPLIT,
+		help='random: 80/20 shuffle; time: test on the latest 20%% of RecordDate')
+	parser.add_argument('--no-feature-cache', dest='feature_cache', action='store_false', default=FEATURE_CACHE,
+		help='Always load and encode the data (FEATURE_CACHE=false)')
+	add_profiling_args(parser, 'train')
+	args = parser.parse_args(argv)
+
+	timer = PhaseTimer(trace_memory=args.trace_memory)
+	with profiled(args.profile, top=args.profile_top):
+		run_id = train(timer, mode=args.train_mode, n_jobs=args.n_jobs, split=args.split,
+			encoding=args.encoding, config=args.config, model_type=args.model_type, feature_cache=args.feature_cache)
+	timer.print_summary()
+	report = timer.write_json(args.report, command='train', data_path=DATA_PATH, model_path=MODEL_PATH)
+	print(f'Phase timings saved to {args.report}')
+	if run_id:
+		_log_timings_to_mlflow(run_id, report)
+
+
+def train(timer: PhaseTimer, mode: str = None, n_jobs: int = None, split: str = None, encoding: str = None,
+		config: str = None, model_type: str = None, feature_cache: bool = None):
+	"""Load, train, evaluate and save the model. Returns the MLflow run id, if any.
+
+	The classifier comes from the ``model`` section of ``config`` (default
+	``TRAIN_CONFIG``), see :mod:`pipelines.backends`; ``model_type`` overrides
+	``model.type``.
+
+	With ``feature_cache`` (default ``FEATURE_CACHE``) the encoded matrices and
+	the fitted preprocessor are taken from :mod:`pipelines.feature_cache` when
+	the data, the preprocessing code and its settings are unchanged. A hit
+	skips the ``prepare`` (cleaning, split) and ``encode`` (encoder fit)
+	phases; ``load`` then only opens the entry.
+	"""
+	cfg = load_train_config(config)
+	model_cfg = dict(cfg.get('model') or {})
+	if model_type:
+		model_cfg['type'] = model_type
+	backend = make_backend(model_cfg)
+	encoding = encoding or ENCODING or model_cfg.get('encoding') or backend.encoding
+	test_size = float((cfg.get('data') or {}).get('test_size', 0.2))
+	print(f'Model: {backend.name} ({encoding})')
+
+	# Усе, від чого залежать закодовані матриці (модель і її параметри сюди не входять)
+	settings = {'code': preprocessing_version(), 'encoding': encoding, 'split': split or TRAIN_SPLIT,
+		'test_size': test_size, 'date_features': DATE_FEATURES, 'max_categories': MAX_CATEGORIES}
+	use_cache = FEATURE_CACHE if feature_cache is None else feature_cache
+	cache = FeatureCache(FEATURE_CACHE_DIR) if use_cache and os.path.exists(DATA_PATH) else None
+	features = None
+
+	with timer.phase('load'):
+		if cache:
+			key = cache.key(DATA_PATH, settings)
+			features = cache.get(key)
+		if features is None:
+			df = load_data(DATA_PATH)
+
+	if features is None:
+		with timer.phase('prepare'):
+			X, y = prepare_frame(df)
+			del df
+			model = build_pipeline(X, encoding=encoding, classifier=backend.classifier)
+			X_train, X_test, y_train, y_test = split_data(X, y, split or TRAIN_SPLIT, test_size=test_size)
+
+		with timer.phase('encode'):
+			preprocessor = model.named_steps['preprocessor']
+			features = Features(preprocessor, preprocessor.fit_transform(X_train), preprocessor.transform(X_test),
+				y_train.to_numpy(), y_test.to_numpy(), {col: str(dtype) for col, dtype in X.dtypes.items()})
+			if cache:
+				cache.put(key, features, data_path=DATA_PATH, **settings)
+	else:
+		print(f'Features loaded from cache: {os.path.join(cache.root, key)}')
+		model = build_pipeline(features.empty_frame(), encoding=encoding, classifier=backend.classifier)
+		model.steps[0] = ('preprocessor', features.preprocessor)
+	data = (features.X_train, features.X_test, features.y_train, features.y_test)
 
+	run_id = None
 	# If MLflow is available and a tracking URI was provided, attempt to log there.
 	if MLFLOW_AVAILABLE and MLFLOW_TRACKING_URI:
 		try:
@@ -158,14 +506,17 @@ def main():
 
 	if MLFLOW_AVAILABLE and MLFLOW_TRACKING_URI:
 		try:
-			with mlflow.start_run():
-				params = {'n_estimators': 100, 'random_state': 42}
+			with mlflow.start_run() as run:
+				params = {**backend.params, 'model_type': backend.name, 'train_mode': mode or TRAIN_MODE,
+					'split': split or TRAIN_SPLIT, 'test_size': test_size, 'date_features': DATE_FEATURES,
+					'max_categories': MAX_CATEGORIES, 'encoding': encoding}
 				try:
 					mlflow.log_params(params)
 				except Exception:
 					pass
 
-				acc, model = train_and_evaluate(model, X_train, X_test, y_train, y_test, show_progress=True)
+				acc, model = fit_and_evaluate(model, *data, show_progress=True, timer=timer, mode=mode, n_jobs=n_jobs,
+					validation_fraction=backend.validation_fraction)
 				print(f'Accuracy: {acc:.4f}')
 				try:
 					mlflow.log_metric('accuracy', float(acc))
@@ -179,19 +530,27 @@ def main():
 						mlflow.sklearn.log_model(model, 'model')
 				except Exception as e:
 					print(f'Warning: failed to log/register model to MLflow: {e}')
+				run_id = run.info.run_id
 		except Exception as e:
 			print(f'Warning: mlflow run failed ({e}), training locally instead')
-			acc, model = train_and_evaluate(model, X_train, X_test, y_train, y_test, show_progress=False)
+			acc, model = fit_and_evaluate(model, *data, show_progress=False, timer=timer, mode=mode, n_jobs=n_jobs,
+				validation_fraction=backend.validation_fraction)
 			print(f'Accuracy (local): {acc:.4f}')
 	else:
 		# Train without MLflow logging
-		acc, model = train_and_evaluate(model, X_train, X_test, y_train, y_test, show_progress=True)
+		acc, model = fit_and_evaluate(model, *data, show_progress=True, timer=timer, mode=mode, n_jobs=n_jobs,
+			validation_fraction=backend.validation_fraction)
 		print(f'Accuracy (no mlflow): {acc:.4f}')
 
 	# Always save local model
-	os.makedirs(os.path.dirname(MODEL_PATH) or 'models', exist_ok=True)
-	joblib.dump(model, MODEL_PATH)
-	print(f'Model saved to {MODEL_PATH}')
+	with timer.phase('dump'):
+		os.makedirs(os.path.dirname(MODEL_PATH) or 'models', exist_ok=True)
+		# Тимчасовий файл + os.replace: watcher API ніколи не бачить напівзаписаний pickle
+		tmp_path = f'{MODEL_PATH}.tmp-{os.getpid()}'
+		joblib.dump(model, tmp_path)
+		os.replace(tmp_path, MODEL_PATH)
+	print(f'Model saved to {MODEL_PATH} ({os.path.getsize(MODEL_PATH) / 2**20:.1f} MiB)')
+	return run_id
 
 
 if __name__ == '__main__':
@@ -0,0 +1,159 @@
+"""Server-side micro-batching for single-record /predict requests.
+
+Concurrent requests are put on an asyncio queue and coalesced into one
+``predict_churn_batch`` call: a batch is closed when it reaches
+``max_batch_size`` records or when ``max_wait_ms`` has passed since its
+first record arrived. Every caller awaits its own future, so from the
+endpoint's point of view ``submit`` behaves like ``predict_churn``. Records
+submitted with ``use_cache=False`` share the batch but are scored in a
+separate ``predict_batch_fn(records, use_cache=False)`` call.
+"""
+
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.api.metrics import Histogram
+
+
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+# Скільки батчів можуть виконуватись у threadpool одночасно
+MICROBATCH_MAX_CONCURRENCY = int(os.getenv("MICROBATCH_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-record predictions into batched calls."""
+
+    def __init__(
+        self,
+        predict_batch_fn: Callable[[List[Dict], bool], List[Dict]],
+        max_batch_size: int = MICROBATCH_MAX_SIZE,
+        max_wait_ms: float = MICROBATCH_MAX_WAIT_MS,
+        max_concurrency: int = MICROBATCH_MAX_CONCURRENCY,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrency = max(1, max_concurrency)
+
+        # Реєструються в /metrics застосунком (див. src/api/main.py)
+        self.batch_sizes = Histogram(
+            "churn_microbatch_batch_size", "Records per dispatched micro-batch.",
+            BATCH_SIZE_BUCKETS, registry=None,
+        )
+        self.queue_depths = Histogram(
+            "churn_microbatch_queue_depth", "Requests still queued when a micro-batch is dispatched.",
+            QUEUE_DEPTH_BUCKETS, registry=None,
+        )
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запускає фонового збирача батчів у поточному event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.create_task(self._collect_loop())
+
+    async def stop(self) -> None:
+        """Зупиняє збирача та дочікується батчів, що вже виконуються."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        # Запити, що залишились у черзі, не повинні висіти вічно
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    async def submit(self, features: Dict, use_cache: bool = True) -> Dict:
+        """Ставить запис у чергу та повертає результат predict_churn(features, use_cache) для нього."""
+        if not self.running:
+            raise RuntimeError("Micro-batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((features, use_cache, future))
+        return await future
+
+    def stats(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "inflight_batches": len(self._inflight),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth_at_dispatch": self.queue_depths.snapshot(),
+        }
+
+    async def _collect_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Спочатку забираємо все, що вже чекає в черзі
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.queue_depths.observe(self._queue.qsize())
+            self.batch_sizes.observe(len(batch))
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: List) -> None:
+        try:
+            for use_cache in (True, False):
+                group = [item for item in batch if bool(item[1]) is use_cache]
+                if group:
+                    await self._run_group(group, use_cache)
+        finally:
+            self._slots.release()
+
+    async def _run_group(self, group: List, use_cache: bool) -> None:
+        records = [features for features, _, _ in group]
+        try:
+            results = await run_in_threadpool(self.predict_batch_fn, records, use_cache)
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(group, results):
+            # Клієнт міг відключитись — його future вже скасовано
+            if not future.done():
+                future.set_result(result)
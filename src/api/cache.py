@@ -0,0 +1,117 @@
+"""Bounded in-process LRU/TTL cache for churn predictions.
+
+Keys are a stable hash of the normalized feature dict, so the same customer
+sent twice (with keys in any order, numbers as ints or floats) hits the same
+entry. The cache remembers which model version produced its entries and drops
+all of them as soon as a different version asks, so a reloaded model never
+serves stale predictions.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+
+
+def _normalize_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return 0.0 if math.isnan(number) else number
+
+
+def feature_key(features: Dict, numeric_columns: Iterable[str] = ()) -> str:
+    """Stable hash of a feature dict (key order and int/float spelling do not matter)."""
+    numeric_columns = set(numeric_columns)
+    normalized = {
+        name: _normalize_number(value) if name in numeric_columns or isinstance(value, (int, float)) else value
+        for name, value in features.items()
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with optional per-entry TTL."""
+
+    def __init__(self, maxsize: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl  # секунди; 0 — без обмеження часу життя
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
+
+    def get(self, key: str, version) -> Optional[Dict]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, version, value: Dict) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,187 @@
+"""DataFrame-free feature encoder compiled from a fitted sklearn Pipeline.
+
+The saved model is ``Pipeline([('preprocessor', ColumnTransformer), ('classifier', ...)])``
+(see ``pipelines/train.py``). For single records most of the request time goes into
+building a one-row DataFrame and running the ColumnTransformer on it. ``CompiledEncoder``
+reads the fitted transformer once, at model-load time, and afterwards maps feature dicts
+straight into a NumPy matrix with the same layout (and dtype) the classifier was trained on.
+
+All three encodings of ``build_pipeline`` are supported: dense and sparse one-hot
+and ordinal codes. For a sparse model the rows are still produced dense. Trees
+split on the same values either way, so the predictions are identical.
+"""
+
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder
+
+from src.features import NUMERIC_COLUMNS, DateFeatures, to_float32
+
+
+class UnsupportedPipelineError(ValueError):
+    """The pipeline uses a step the compiled encoder cannot reproduce exactly."""
+
+
+def _is_passthrough(spec, fitted) -> bool:
+    if isinstance(spec, str):
+        return spec == 'passthrough'
+    # sklearn >= 1.2 замінює 'passthrough' на FunctionTransformer без func
+    return isinstance(fitted, FunctionTransformer) and fitted.func in (None, to_float32)
+
+
+def _coerce_number(value, fill_nan: bool) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if fill_nan and math.isnan(number):
+        return 0.0
+    return number
+
+
+class CompiledEncoder:
+    """Maps feature dicts to the classifier's input matrix without pandas.
+
+    Build it with :meth:`from_pipeline`; :meth:`transform` then returns exactly
+    what ``pipeline[:-1].transform(preprocess_batch(records))`` would (densified
+    if the pipeline's output is sparse).
+    """
+
+    def __init__(self, width: int, numeric: List, categorical: List, classifier=None, dates: List = (),
+                 ordinal: List = (), dtype=np.float64):
+        self.width = width
+        self.numeric = numeric          # [(column, output_index)]
+        self.categorical = categorical  # [(column, {value: output_index}, handle_unknown, unknown_index)]
+        self.ordinal = list(ordinal)    # [(column, output_index, {value: code}, unknown_code or None)]
+        self.dates = list(dates)        # [(column, first_output_index, DateFeatures, fitted_column_index)]
+        self.classifier = classifier
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def input_columns(self) -> List[str]:
+        return ([col for col, _ in self.numeric] + [col for col, *_ in self.categorical] +
+                [col for col, *_ in self.ordinal] + [col for col, *_ in self.dates])
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> 'CompiledEncoder':
+        if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+            raise UnsupportedPipelineError('expected Pipeline(preprocessor, classifier)')
+        preprocessor, classifier = pipeline.steps[0][1], pipeline.steps[-1][1]
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise UnsupportedPipelineError('preprocessor is not a ColumnTransformer')
+        specs = {name: spec for name, spec, _ in preprocessor.transformers}
+        numeric, categorical, ordinal, dates, dtypes = [], [], [], [], []
+        for name, fitted, columns in preprocessor.transformers_:
+            out = preprocessor.output_indices_[name]
+            if out.stop == out.start or fitted == 'drop':
+                continue
+            if any(not isinstance(col, str) for col in columns):
+                raise UnsupportedPipelineError(f'transformer {name!r} selects columns by position')
+
+            if _is_passthrough(specs.get(name, fitted), fitted):
+                numeric.extend((col, out.start + i) for i, col in enumerate(columns))
+                dtypes.append(np.float32 if getattr(fitted, 'func', None) is to_float32 else np.float64)
+            elif isinstance(fitted, OneHotEncoder):
+                categorical.extend(cls._compile_onehot(name, fitted, columns, out.start))
+                dtypes.append(fitted.dtype)
+            elif isinstance(fitted, OrdinalEncoder):
+                ordinal.extend(cls._compile_ordinal(name, fitted, columns, out.start))
+                dtypes.append(fitted.dtype)
+            elif isinstance(fitted, DateFeatures):
+                dates.extend((col, out.start + 2 * i, fitted, i) for i, col in enumerate(columns))
+                dtypes.append(fitted.dtype)
+            else:
+                raise UnsupportedPipelineError(f'transformer {name!r} ({type(fitted).__name__}) is not supported')
+
+        width = max([idx + 1 for _, idx in numeric] +
+                    [idx + 1 for _, mapping, _, _ in categorical for idx in mapping.values()] +
+                    [idx + 1 for _, idx, _, _ in ordinal] +
+                    [start + 2 for _, start, _, _ in dates] + [0])
+        dtype = np.result_type(*dtypes) if dtypes else np.float64
+        return cls(width, numeric, categorical, classifier, dates, ordinal, dtype)
+
+    @staticmethod
+    def _compile_onehot(name: str, encoder: OneHotEncoder, columns, offset: int) -> List:
+        if encoder.drop_idx_ is not None:
+            raise UnsupportedPipelineError(f'{name!r}: OneHotEncoder(drop=...) is not supported')
+
+        infrequent_per_column = getattr(encoder, 'infrequent_categories_', None) or [None] * len(columns)
+        compiled = []
+        for col, categories, infrequent in zip(columns, encoder.categories_, infrequent_per_column):
+            # Часті категорії — у порядку categories_, усі рідкісні — одна спільна колонка в кінці
+            rare = set(infrequent) if infrequent is not None else set()
+            frequent = [value for value in categories if value not in rare]
+            mapping = {value: offset + j for j, value in enumerate(frequent)}
+            unknown_index = -1
+            if rare:
+                unknown_index = offset + len(frequent)
+                mapping.update((value, unknown_index) for value in rare)
+                if encoder.handle_unknown != 'infrequent_if_exist':
+                    unknown_index = -1
+            compiled.append((col, mapping, encoder.handle_unknown, unknown_index))
+            offset += len(frequent) + bool(rare)
+        return compiled
+
+    @staticmethod
+    def _compile_ordinal(name: str, encoder: OrdinalEncoder, columns, offset: int) -> List:
+        if encoder.handle_unknown == 'use_encoded_value' and not isinstance(encoder.unknown_value, (int, float)):
+            raise UnsupportedPipelineError(f'{name!r}: unknown_value={encoder.unknown_value!r} is not supported')
+        unknown = encoder.unknown_value if encoder.handle_unknown == 'use_encoded_value' else None
+
+        infrequent_per_column = getattr(encoder, 'infrequent_categories_', None) or [None] * len(columns)
+        compiled = []
+        for i, (col, categories, infrequent) in enumerate(zip(columns, encoder.categories_, infrequent_per_column)):
+            # Як у OneHotEncoder: часті категорії 0..k-1, усі рідкісні мають спільний код k
+            rare = set(infrequent) if infrequent is not None else set()
+            frequent = [value for value in categories if value not in rare]
+            mapping = {value: float(code) for code, value in enumerate(frequent)}
+            mapping.update((value, float(len(frequent))) for value in rare)
+            compiled.append((col, offset + i, mapping, unknown))
+        return compiled
+
+    def transform(self, records: List[Dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Encode ``records`` into a ``(len(records), width)`` matrix of the pipeline's dtype.
+
+        ``out`` may be a preallocated matrix of at least that shape; it is
+        zeroed and filled in place.
+        """
+        n = len(records)
+        if out is None:
+            X = np.zeros((n, self.width), dtype=self.dtype)
+        else:
+            X = out[:n]
+            X.fill(0.0)
+
+        for col, idx in self.numeric:
+            fill_nan = col in NUMERIC_COLUMNS
+            X[:, idx] = [_coerce_number(record[col], fill_nan) for record in records]
+
+        rows = np.arange(n)
+        for col, mapping, handle_unknown, unknown_index in self.categorical:
+            idx = np.fromiter((mapping.get(record[col], unknown_index) for record in records),
+                              dtype=np.intp, count=n)
+            known = idx >= 0
+            if handle_unknown == 'error' and not known.all():
+                bad = records[int(np.flatnonzero(~known)[0])][col]
+                raise ValueError(f'Found unknown category {bad!r} in column {col!r} during transform')
+            X[rows[known], idx[known]] = 1.0
+
+        for col, idx, mapping, unknown in self.ordinal:
+            codes = [mapping.get(record[col], unknown) for record in records]
+            if unknown is None and None in codes:
+                bad = records[codes.index(None)][col]
+                raise ValueError(f'Found unknown category {bad!r} in column {col!r} during transform')
+            X[:, idx] = codes
+
+        for col, start, date_features, index in self.dates:
+            # Дата необов'язкова: без неї DateFeatures підставляє останню дату з тренування
+            X[:, start:start + 2] = date_features.encode_column([record.get(col) for record in records], index)
+        return X
+
+    def predict_proba(self, records: List[Dict]) -> np.ndarray:
+        """Encode ``records`` and return the classifier's ``predict_proba`` output."""
+        return self.classifier.predict_proba(self.transform(records))
@@ -0,0 +1,276 @@
+"""Flattened, NumPy-only evaluator for a fitted RandomForestClassifier.
+
+``RandomForestClassifier.predict_proba`` validates the input and dispatches one
+joblib task per tree on every call, which dominates latency for small batches.
+``FlatForest`` stores all trees in a few contiguous arrays and walks every
+tree for a whole batch at once, one depth level per NumPy step. The result is
+bit-identical to ``predict_proba`` (same float32 input cast, same ``<=`` split
+rule, same per-tree accumulation order).
+
+Export a trained model to a directory of ``.npy`` files:
+
+    python -m src.api.forest --model models/churn_model.pkl --output models/churn_forest
+
+For a Pipeline the export also contains ``preprocessor.joblib``, so the API can
+serve from the directory alone (``MODEL_MMAP_DIR``): the arrays are opened with
+``np.load(mmap_mode='r')`` and every uvicorn worker shares the same read-only
+pages instead of unpickling its own copy of the forest.
+
+Other models (the boosted backends of ``pipelines/train.py``) cannot be
+flattened. They are exported whole as ``model.joblib``, and ``forest.json``
+only records ``"format": "joblib"``. They are small, so every worker loads
+its own copy.
+"""
+
+import argparse
+import json
+import os
+import shutil
+from typing import Optional
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+
+ARRAYS = ('feature', 'threshold', 'children', 'is_leaf', 'missing_left', 'value', 'roots')
+META_FILE = 'forest.json'
+PREPROCESSOR_FILE = 'preprocessor.joblib'
+MODEL_FILE = 'model.joblib'
+
+# З sklearn 1.4 tree_.value для класифікаторів вже зберігає частки класів
+_VALUE_IS_FRACTION = tuple(int(p) for p in sklearn.__version__.split('.')[:2]) >= (1, 4)
+
+
+class FlatForest:
+    """All trees of a forest laid out in contiguous node arrays.
+
+    Node ``i`` splits on ``feature[i] <= threshold[i]`` and continues at
+    ``children[2 * i + 1]`` when the test holds, ``children[2 * i]`` otherwise
+    (one gather instead of two plus a select). Leaves point to themselves and
+    are flagged in ``is_leaf``. ``value[i]`` holds the class probabilities of
+    node ``i`` and ``roots[t]`` the root node of tree ``t``.
+    """
+
+    def __init__(self, feature, threshold, children, is_leaf, missing_left, value, roots,
+                 max_depth: int, classes, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.is_leaf = is_leaf
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, forest, leaf_dtype=np.float64) -> 'FlatForest':
+        """Flatten a fitted single-output forest classifier.
+
+        ``leaf_dtype=np.float32`` halves the size of the value table at the cost
+        of exact parity with ``predict_proba`` (differences around 1e-7).
+        """
+        if not isinstance(forest, (RandomForestClassifier, ExtraTreesClassifier)):
+            raise TypeError(f'unsupported estimator: {type(forest).__name__}')
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise TypeError('multi-output forests are not supported')
+
+        features, thresholds, children, leaves, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n)
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            right = np.where(leaf, own, tree.children_right + offset)
+            left = np.where(leaf, own, tree.children_left + offset)
+            children.append(np.column_stack([right, left]).ravel())
+            leaves.append(leaf)
+            missing.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(n)), dtype=bool))
+
+            value = tree.value[:, 0, :forest.n_classes_]
+            if not _VALUE_IS_FRACTION:
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int64),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int64),
+            is_leaf=np.concatenate(leaves),
+            missing_left=np.concatenate(missing),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=leaf_dtype),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=max_depth,
+            classes=forest.classes_,
+            n_features=forest.n_features_in_,
+        )
+
+    def apply(self, X, max_depth: Optional[int] = None) -> np.ndarray:
+        """Return the node reached in every tree, shape ``(n_samples, n_trees)``.
+
+        With ``max_depth`` smaller than the forest depth the walk stops early
+        and internal nodes are returned (depth-limited evaluation).
+        """
+        # Як і sklearn, дерева порівнюють ознаки у float32
+        if hasattr(X, 'toarray'):  # sparse-onehot pipeline: дерева дають той самий результат на dense
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X has shape {X.shape}, expected (n, {self.n_features_in_})')
+        n_samples, n_features = X.shape
+        X_flat = X.ravel()
+        has_nan = np.isnan(X_flat).any()
+
+        # Пара (рядок, дерево) — один елемент; обробляємо лише ті, що ще не в листі
+        node = np.tile(self.roots, n_samples)
+        row_offset = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+        steps = self.max_depth if max_depth is None else min(max_depth, self.max_depth)
+        for _ in range(steps):
+            if not active.size:
+                break
+            current = node[active]
+            x = X_flat[row_offset[active] + self.feature[current]]
+            go_left = x <= self.threshold[current]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[current], go_left)
+            current = self.children[2 * current + go_left]
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(n_samples, self.n_trees)
+
+    def predict_proba(self, X, max_depth: Optional[int] = None) -> np.ndarray:
+        node_values = self.value[self.apply(X, max_depth=max_depth)]
+        proba = np.zeros((node_values.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Накопичуємо по деревах у тому ж порядку, що й RandomForestClassifier
+        for t in range(self.n_trees):
+            proba += node_values[:, t]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def save(self, path: str) -> None:
+        """Write the arrays as ``<name>.npy`` plus ``forest.json`` into ``path``."""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        meta = {
+            'max_depth': self.max_depth,
+            'classes': self.classes_.tolist(),
+            'n_features': self.n_features_in_,
+            'n_trees': self.n_trees,
+            'n_nodes': self.n_nodes,
+        }
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> 'FlatForest':
+        """Load an exported forest; ``mmap_mode='r'`` maps the arrays read-only."""
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(**arrays, max_depth=meta['max_depth'], classes=meta['classes'], n_features=meta['n_features'])
+
+
+def export_serving_model(model, path: str, leaf_dtype=np.float64) -> Optional[FlatForest]:
+    """Export ``model`` (Pipeline or bare forest) to ``path`` for mmap serving.
+
+    A model without a forest is saved whole as ``model.joblib`` and None is
+    returned. The export is written to a temporary sibling directory and
+    renamed into place, so a watcher never sees a half-written model. Workers
+    that still map the previous files keep them alive until they reload.
+    """
+    forest = model.steps[-1][1] if isinstance(model, Pipeline) else model
+    try:
+        flat = FlatForest.from_sklearn(forest, leaf_dtype=leaf_dtype)
+    except TypeError:
+        flat = None
+
+    path = os.path.abspath(path)
+    staging = f'{path}.tmp-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    if flat is None:
+        os.makedirs(staging)
+        joblib.dump(model, os.path.join(staging, MODEL_FILE))
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'format': 'joblib', 'estimator': type(forest).__name__}, f, indent=2)
+    else:
+        flat.save(staging)
+        if isinstance(model, Pipeline) and len(model.steps) > 1:
+            joblib.dump(model[:-1], os.path.join(staging, PREPROCESSOR_FILE))
+
+    previous = f'{path}.old-{os.getpid()}'
+    if os.path.exists(path):
+        os.rename(path, previous)
+    os.rename(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return flat
+
+
+def load_serving_model(path: str, mmap_mode: Optional[str] = 'r'):
+    """Load an export as ``Pipeline(preprocessor, FlatForest)`` (or the bare forest).
+
+    A ``model.joblib`` export is returned as saved.
+    """
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        if json.load(f).get('format') == 'joblib':
+            return joblib.load(os.path.join(path, MODEL_FILE))
+    flat = FlatForest.load(path, mmap_mode=mmap_mode)
+    preprocessor_path = os.path.join(path, PREPROCESSOR_FILE)
+    if not os.path.exists(preprocessor_path):
+        return flat
+    preprocessor = joblib.load(preprocessor_path)
+    # Pipeline тут лише контейнер для predict_proba: FlatForest не тренується
+    return Pipeline(preprocessor.steps + [('classifier', flat)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a trained forest to flat .npy arrays (other models as joblib)')
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'models/churn_model.pkl'),
+                        help='Saved sklearn Pipeline or forest (joblib)')
+    parser.add_argument('--output', default='models/churn_forest', help='Output directory')
+    parser.add_argument('--leaf-dtype', choices=['float64', 'float32'], default='float64',
+                        help='float32 halves the value table (approximate probabilities)')
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    flat = export_serving_model(model, args.output, leaf_dtype=np.dtype(args.leaf_dtype))
+    if flat is None:
+        print(f'✓ Not a forest, exported the whole model → {args.output}/{MODEL_FILE}')
+        return
+    print(f'✓ Exported {flat.n_trees} trees ({flat.n_nodes:,} nodes, '
+          f'{flat.nbytes / 2**20:.1f} MiB, max depth {flat.max_depth}) → {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,18 +2,46 @@ import warnings
 # Suppress Pydantic v2 warnings from transitive dependencies (e.g., LangChain)
 warnings.filterwarnings("ignore", message=".*protected namespace.*", category=UserWarning)
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from pydantic import ValidationError
 from datetime import datetime
+from typing import Optional
+import asyncio
+import hmac
+import json
 import logging
+import os
+import time
 
 # Імпорти з власного модуля
-from src.api.models import CustomerFeatures, PredictionResponse
+from src.api.models import (
+    BatchPredictionError,
+    BatchPredictionResponse,
+    CustomerFeatures,
+    PredictionResponse,
+)
 from src.api import predict as predict_module
+from src.api.batching import MICROBATCH_ENABLED, MicroBatcher
+from src.api.metrics import CONTENT_TYPE, PREDICT_STAGE_SECONDS, REGISTRY, CallbackMetric, MetricsMiddleware
+from src.api.request_log import REQUEST_LOG_DIR, RequestLogger, prediction_record
 
 # Налаштування логування (корисно в контейнері)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Максимальна кількість записів в одному запиті /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+# Максимальний розмір тіла /predict/batch у байтах: перевіряється до розбору JSON
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(MAX_BATCH_SIZE * 4096)))
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Як часто (секунди) перевіряти нову версію моделі; 0 — вимкнути watcher
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "30"))
+# POST /admin/reload вимагає заголовок X-Admin-Token з цим значенням; без токена ендпоінт вимкнено
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 app = FastAPI(
     title="Telco Customer Churn Prediction API",
     description="API для прогнозування відтоку клієнтів (churn prediction)",
@@ -21,48 +49,210 @@ app = FastAPI(
     docs_url="/docs",          # Swagger UI
     redoc_url="/redoc",        # ReDoc (додатково)
 )
+# Лічильники та гістограми затримок по маршрутах для GET /metrics
+app.add_middleware(MetricsMiddleware)
 
-# Перевірка моделі при старті (логування)
-@app.on_event("startup")
-async def startup_event():
+# Мікробатчинг одиночних /predict запитів (вмикається MICROBATCH_ENABLED=true)
+batcher = MicroBatcher(predict_module.predict_churn_batch) if MICROBATCH_ENABLED else None
+
+# Журнал запитів і прогнозів у JSONL.gz (вмикається REQUEST_LOG_DIR); запис — у фоновому потоці
+request_logger = RequestLogger(REQUEST_LOG_DIR) if REQUEST_LOG_DIR else None
+
+
+def _model_info():
+    bundle = predict_module.current_bundle()
+    return {(bundle.version, bundle.source): 1} if bundle is not None else None
+
+
+def _cache_counter(name):
+    def read():
+        cache = predict_module.prediction_cache
+        return getattr(cache, name) if cache is not None else None
+    return read
+
+
+def _process_rss_bytes():
+    rss_mb = predict_module.process_memory().get("rss_mb")
+    return rss_mb * 2**20 if rss_mb is not None else None
+
+
+# Стан, що вже живе в інших модулях, читається під час scrape
+CallbackMetric("churn_model_info", "Currently served model (always 1).", _model_info,
+               labelnames=("model_version", "model_source"))
+CallbackMetric("churn_model_load_seconds", "Duration of the last model load.",
+               lambda: predict_module.last_load_seconds)
+CallbackMetric("process_resident_memory_bytes", "Resident memory of this worker.", _process_rss_bytes)
+for _name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+    CallbackMetric(f"churn_prediction_cache_{_name}_total", f"Prediction cache {_name}.",
+                   _cache_counter(_name), type="counter")
+CallbackMetric("churn_prediction_cache_size", "Entries in the prediction cache.",
+               lambda: len(predict_module.prediction_cache) if predict_module.prediction_cache is not None else None)
+
+def _request_log_counter(name):
+    return lambda: getattr(request_logger, name) if request_logger is not None else None
+
+
+for _name in ("enqueued", "written", "dropped", "write_errors"):
+    CallbackMetric(f"churn_request_log_{_name}_total", f"Request log records/errors: {_name}.",
+                   _request_log_counter(_name), type="counter")
+if batcher is not None:
+    REGISTRY.register(batcher.batch_sizes)
+    REGISTRY.register(batcher.queue_depths)
+
+# Фонові задачі: початкове завантаження моделі та watcher нових версій
+background_tasks = set()
+
+
+async def load_model_in_background():
+    """Завантажує модель у threadpool, не блокуючи старт воркера."""
+    result = await run_in_threadpool(predict_module.load_initial_model)
     if predict_module.model is None:
         logger.error("Модель не завантажилася при старті API!")
-        # Можна навіть підняти виняток, якщо критичний запуск без моделі:
-        # raise RuntimeError("Не вдалося завантажити модель churn")
     else:
-        logger.info("Модель успішно завантажена при старті API")
+        logger.info(f"Модель завантажена у фоні: {result}")
+
+
+async def watch_model_updates():
+    """Періодично перевіряє файл моделі / MLflow registry та підміняє модель на нову версію."""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        if predict_module.load_state == "loading":
+            continue
+        try:
+            result = await run_in_threadpool(predict_module.reload_if_changed)
+        except Exception as e:
+            logger.error(f"Помилка перевірки нової версії моделі: {e}", exc_info=True)
+            continue
+        if result.get("reloaded"):
+            logger.info(f"Модель оновлено: {result}")
+
+
+def _log_predictions(endpoint, items):
+    """Ставить (features, result, customer_id) у журнал запитів; ніколи не блокує запит."""
+    if request_logger is None:
+        return
+    bundle = predict_module.current_bundle()
+    version, source = (bundle.version, bundle.source) if bundle is not None else (None, None)
+    for features, result, customer_id in items:
+        request_logger.log(prediction_record(endpoint, features, result, customer_id, version, source))
+
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+# Старт: модель вантажиться у фоні, /health показує model_status=loading до готовності
+@app.on_event("startup")
+async def startup_event():
+    _spawn(load_model_in_background())
+    if MODEL_WATCH_INTERVAL > 0:
+        _spawn(watch_model_updates())
+
+    if request_logger is not None:
+        request_logger.start()
+        logger.info(f"Журнал запитів: {request_logger.directory}")
+
+    if batcher is not None:
+        batcher.start()
+        logger.info(
+            f"Мікробатчинг увімкнено: max_batch_size={batcher.max_batch_size}, "
+            f"max_wait_ms={batcher.max_wait * 1000:g}"
+        )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in list(background_tasks):
+        task.cancel()
+    if batcher is not None:
+        await batcher.stop()
+    if request_logger is not None:
+        await run_in_threadpool(request_logger.stop)
 
 @app.get("/health")
 def health():
     """
     Перевірка стану сервісу та наявності моделі
     """
-    model_status = "завантажена" if predict_module.model is not None else "НЕ завантажена"
-    return {
-        "status": "healthy" if predict_module.model is not None else "degraded",
+    bundle = predict_module.current_bundle()
+    if bundle is not None:
+        status, model_status = "healthy", "ready"
+    elif predict_module.load_state in ("idle", "loading"):
+        status, model_status = "starting", "loading"
+    else:
+        status, model_status = "degraded", "failed"
+    response = {
+        "status": status,
         "service": "churn-prediction-api",
         "timestamp": datetime.utcnow().isoformat(),
         "model_status": model_status,
         "model_path": getattr(predict_module, "MODEL_PATH", "невідомо"),
+        "model_source": bundle.source if bundle else None,
+        "model_version": bundle.version if bundle else None,
+        "model_loaded_at": bundle.loaded_at.isoformat() if bundle else None,
+        "last_load_error": predict_module.last_load_error,
+        "process": {
+            "pid": os.getpid(),
+            "model_load_seconds": predict_module.last_load_seconds,
+            **predict_module.process_memory(),
+        },
     }
+    if predict_module.prediction_cache is not None:
+        response["cache"] = predict_module.prediction_cache.stats()
+    if batcher is not None:
+        response["microbatch"] = batcher.stats()
+    if request_logger is not None:
+        response["request_log"] = request_logger.stats()
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Метрики у текстовому форматі Prometheus (лічильники, гістограми затримок, стан моделі)
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = True, x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Перезавантажує модель у фоні (поза шляхом запиту) та атомарно підміняє її.
+    Запити, що вже виконуються, завершуються на старій моделі.
+    `?force=false` — перезавантажити лише якщо з'явилась нова версія.
+    Без налаштованого ADMIN_TOKEN ендпоінт вимкнено.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin API вимкнено (ADMIN_TOKEN не задано)")
+    if not hmac.compare_digest((x_admin_token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Невірний X-Admin-Token")
+    result = await run_in_threadpool(predict_module.reload_model, force)
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result)
+    logger.info(f"Ручне перезавантаження моделі: {result}")
+    return result
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict(features: CustomerFeatures):
+async def predict(features: CustomerFeatures, use_cache: bool = True):
     """
     Прогноз ймовірності відтоку клієнта.
-    Надішліть JSON з ознаками клієнта.
+    Надішліть JSON з ознаками клієнта. `?use_cache=false` оминає кеш прогнозів.
     """
     try:
-        # Перетворюємо Pydantic-модель у dict
-        input_data = features.dict()
+        # Перетворюємо Pydantic-модель у dict (customer_id не є ознакою моделі)
+        input_data = features.dict(exclude={"customer_id"}, exclude_none=True)
 
-        # Виклик прогнозу
-        result = predict_module.predict_churn(input_data)
+        # Виклик прогнозу: через мікробатчер або напряму в threadpool
+        if batcher is not None and batcher.running:
+            result = await batcher.submit(input_data, use_cache)
+        else:
+            result = await run_in_threadpool(predict_module.predict_churn, input_data, use_cache)
 
         if "error" in result:
             raise ValueError(result["error"])
 
+        _log_predictions("/predict", [(input_data, result, features.customer_id)])
         return PredictionResponse(
+            customer_id=features.customer_id,
             churn_probability=result["churn_probability"],
             churn_prediction=result["churn_prediction"],
             features_used=result["features_used"]
@@ -74,3 +264,126 @@ def predict(features: CustomerFeatures):
             status_code=500,
             detail=f"Помилка обробки запиту: {str(e)}"
         )
+
+
+def _too_many_records(count) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Забагато записів у батчі: {count} > {MAX_BATCH_SIZE}")
+
+
+async def _read_batch_body(request: Request) -> bytes:
+    """Читає тіло запиту, відхиляючи його з 413, щойно воно перевищує MAX_BATCH_BYTES."""
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некоректний заголовок Content-Length")
+        if declared > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"Тіло запиту завелике: {declared} > {MAX_BATCH_BYTES} байт")
+    # Content-Length може бути відсутнім (chunked) або неправдивим — рахуємо фактичні байти
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"Тіло запиту завелике: > {MAX_BATCH_BYTES} байт")
+    return bytes(body)
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> list:
+    """Розбирає тіло запиту: JSON-масив або NDJSON (один JSON-об'єкт на рядок)."""
+    if content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES:
+        records = []
+        for line_no, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            if len(records) >= MAX_BATCH_SIZE:
+                raise _too_many_records(f"{MAX_BATCH_SIZE + 1}+")
+            try:
+                records.append(json.loads(line.decode("utf-8")))
+            except ValueError as e:  # JSONDecodeError і UnicodeDecodeError
+                raise HTTPException(status_code=400, detail=f"Некоректний NDJSON у рядку {line_no}: {e}")
+        return records
+
+    try:
+        records = json.loads(body.decode("utf-8"))
+    except ValueError as e:  # JSONDecodeError і UnicodeDecodeError
+        raise HTTPException(status_code=400, detail=f"Некоректний JSON: {e}")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Очікується JSON-масив записів CustomerFeatures")
+    return records
+
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/CustomerFeatures"}}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def predict_batch(request: Request, use_cache: bool = True):
+    """
+    Пакетний прогноз відтоку для багатьох клієнтів одним викликом predict_proba.
+    Приймає JSON-масив записів CustomerFeatures або NDJSON (Content-Type: application/x-ndjson).
+    Некоректні записи не зупиняють батч, а повертаються в полі errors.
+    `?use_cache=false` оминає кеш прогнозів.
+    """
+    records = _parse_batch_body(await _read_batch_body(request), request.headers.get("content-type", ""))
+    if len(records) > MAX_BATCH_SIZE:
+        raise _too_many_records(len(records))
+
+    valid = []  # (index, CustomerFeatures)
+    errors = []
+    validate_started = time.perf_counter()
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append(BatchPredictionError(index=index, error="Запис має бути JSON-об'єктом"))
+            continue
+        try:
+            valid.append((index, CustomerFeatures(**record)))
+        except ValidationError as e:
+            customer_id = record.get("customer_id")
+            errors.append(BatchPredictionError(
+                index=index,
+                customer_id=customer_id if isinstance(customer_id, str) else None,
+                error=str(e),
+            ))
+    PREDICT_STAGE_SECONDS.observe(time.perf_counter() - validate_started, stage="validate")
+
+    inputs = [features.dict(exclude={"customer_id"}, exclude_none=True) for _, features in valid]
+    results = await run_in_threadpool(predict_module.predict_churn_batch, inputs, use_cache)
+
+    predictions = []
+    logged = []
+    for (index, features), input_data, result in zip(valid, inputs, results):
+        if "error" in result:
+            errors.append(BatchPredictionError(index=index, customer_id=features.customer_id, error=result["error"]))
+            continue
+        logged.append((input_data, result, features.customer_id))
+        predictions.append(PredictionResponse(
+            customer_id=features.customer_id,
+            churn_probability=result["churn_probability"],
+            churn_prediction=result["churn_prediction"],
+            features_used=result["features_used"]
+        ))
+
+    _log_predictions("/predict/batch", logged)
+
+    errors.sort(key=lambda err: err.index)
+    if errors:
+        logger.warning(f"Батч: {len(errors)} з {len(records)} записів не оброблено")
+
+    return BatchPredictionResponse(
+        total=len(records),
+        succeeded=len(predictions),
+        failed=len(errors),
+        predictions=predictions,
+        errors=errors,
+    )
@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 class CustomerFeatures(BaseModel):
+    customer_id: Optional[str] = None  # не є ознакою моделі, повертається у відповіді
     tenure: int
     MonthlyCharges: float
     TotalCharges: float
@@ -21,9 +22,22 @@ class CustomerFeatures(BaseModel):
     Contract: str
     PaperlessBilling: str
     PaymentMethod: str
+    RecordDate: Optional[str] = None  # YYYY-MM-DD; без дати модель бере останню дату з тренування
 
 class PredictionResponse(BaseModel):
     customer_id: Optional[str] = None
     churn_probability: float
     churn_prediction: int  # 0 або 1
-    features_used: List[str]
\ No newline at end of file
+    features_used: List[str]
+
+class BatchPredictionError(BaseModel):
+    index: int  # позиція запису у вхідному батчі
+    customer_id: Optional[str] = None
+    error: str
+
+class BatchPredictionResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    predictions: List[PredictionResponse]
+    errors: List[BatchPredictionError]
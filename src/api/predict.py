@@ -1,103 +1,473 @@
+"""Model loading and churn scoring for the API.
+
+The model is not loaded at import time: ``load_initial_model`` is called from a
+background task after startup, and ``reload_if_changed`` / ``reload_model``
+load newer versions off the request path. Everything derived from one model
+(compiled encoder, flat forest, version) lives in a single ``ModelBundle`` that
+is swapped in with one assignment, so a request that already picked up the old
+bundle finishes on it.
+"""
+
 import joblib
 import pandas as pd
+import itertools
 import os
 import sys
-from typing import Dict
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
 
-# Import mlflow only if needed, but don't fail startup
-try:
-    import mlflow
-    import mlflow.sklearn
-    MLFLOW_AVAILABLE = True
-except ImportError:
-    MLFLOW_AVAILABLE = False
-    print("Warning: mlflow not available, will use local model only", file=sys.stderr)
+from src.api.cache import PredictionCache, PREDICTION_CACHE_SIZE, feature_key
+from src.api.encoder import CompiledEncoder, UnsupportedPipelineError
+from src.api.forest import META_FILE, FlatForest, load_serving_model
+from src.api.metrics import PREDICT_STAGE_SECONDS, PREDICTIONS
+from src.features import DATE_COLUMNS, NUMERIC_COLUMNS
 
 # Local model path fallback
 MODEL_PATH = os.getenv("MODEL_PATH", "models/churn_model.pkl")
+# Flat export (python -m src.api.forest) served via read-only mmap shared by all workers
+MODEL_MMAP_DIR = os.getenv("MODEL_MMAP_DIR", "").strip()
 
 # MLflow model settings
 MLFLOW_TRACKING_URI = os.getenv('MLFLOW_TRACKING_URI', '').strip()
 MLFLOW_MODEL_NAME = os.getenv('MLFLOW_MODEL_NAME', 'ChurnModel')
 MLFLOW_MODEL_STAGE = os.getenv('MLFLOW_MODEL_STAGE', 'Production')
 
-model = None
-model_source = None
+# DataFrame-free encoding of requests (falls back to the pipeline when unsupported)
+FAST_ENCODER = os.getenv('FAST_ENCODER', 'true').lower() == 'true'
+# Tree evaluation engine: 'sklearn' (predict_proba) or 'numpy' (FlatForest)
+TREE_ENGINE = os.getenv('TREE_ENGINE', 'sklearn').strip().lower()
+# Larger batches go to sklearn: its Cython traversal wins once per-call overhead is amortized
+TREE_ENGINE_MAX_BATCH = int(os.getenv('TREE_ENGINE_MAX_BATCH', '256'))
+
+# Predictions are immutable for a given model version, so repeats can be served from memory
+prediction_cache = PredictionCache() if PREDICTION_CACHE_SIZE > 0 else None
+_load_counter = itertools.count(1)
+
+
+def _import_mlflow():
+    """Import mlflow lazily: it is slow to import and optional for serving."""
+    try:
+        import mlflow
+        import mlflow.sklearn
+        return mlflow
+    except ImportError:
+        return None
+
+
+def build_encoder(pipeline):
+    """Compile a :class:`CompiledEncoder` for ``pipeline`` or return None."""
+    if pipeline is None or not FAST_ENCODER:
+        return None
+    try:
+        return CompiledEncoder.from_pipeline(pipeline)
+    except UnsupportedPipelineError as e:
+        print(f"Warning: fast encoder disabled, using pipeline transform ({e})", file=sys.stderr)
+        return None
+
 
-# Try MLflow registry only if tracking URI is explicitly provided and mlflow is available
-if MLFLOW_AVAILABLE and MLFLOW_TRACKING_URI:
+def build_tree_evaluator(pipeline):
+    """Flatten the pipeline's forest into a :class:`FlatForest` when TREE_ENGINE=numpy."""
+    if pipeline is None or not hasattr(pipeline, 'steps'):
+        return None
+    if isinstance(pipeline.steps[-1][1], FlatForest):
+        return pipeline.steps[-1][1]  # mmap export: the forest is already flat
+    if TREE_ENGINE != 'numpy':
+        return None
+    try:
+        return FlatForest.from_sklearn(pipeline.steps[-1][1])
+    except TypeError as e:
+        print(f"Warning: numpy tree engine disabled, using sklearn ({e})", file=sys.stderr)
+        return None
+
+
+def required_columns(pipeline, encoder=None) -> List[str]:
+    """Input columns the model needs in every record (empty when unknown).
+
+    Date columns are optional: a missing ``RecordDate`` is encoded as the
+    latest date the model was trained on.
+    """
+    if encoder is not None:
+        columns = encoder.input_columns
+    else:
+        columns = getattr(pipeline, 'feature_names_in_', None)
+        if columns is None:
+            return []
+    return [str(col) for col in columns if col not in DATE_COLUMNS]
+
+
+class ModelBundle:
+    """A loaded model together with everything derived from it."""
+
+    def __init__(self, model, source: str, version: Optional[str] = None):
+        self.model = model
+        self.source = source
+        # Without an explicit version every load gets a fresh one, so cached
+        # predictions of the previous model are never served for the new one.
+        self.version = version or f"load-{next(_load_counter)}"
+        self.encoder = build_encoder(model)
+        self.forest = build_tree_evaluator(model)
+        self.required_columns = required_columns(model, self.encoder)
+        self.loaded_at = datetime.utcnow()
+
+
+_bundle: Optional[ModelBundle] = None
+_reload_lock = threading.Lock()
+
+# 'idle' до старту, 'loading' під час першого завантаження, далі 'ready' або 'failed'
+load_state = 'idle'
+last_load_error: Optional[str] = None
+last_load_seconds: Optional[float] = None
+
+
+def __getattr__(name):
+    # Backwards-compatible module attributes (predict_module.model etc.)
+    aliases = {
+        'model': 'model',
+        'model_source': 'source',
+        'model_version': 'version',
+        'feature_encoder': 'encoder',
+        'tree_evaluator': 'forest',
+    }
+    if name in aliases:
+        return getattr(_bundle, aliases[name]) if _bundle is not None else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def current_bundle() -> Optional[ModelBundle]:
+    return _bundle
+
+
+def registry_version():
+    """Return the version number of the registered model in MLFLOW_MODEL_STAGE, if known."""
+    mlflow = _import_mlflow()
+    if mlflow is None or not MLFLOW_TRACKING_URI:
+        return None
     try:
         mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-        model_uri = f"models:/{MLFLOW_MODEL_NAME}/{MLFLOW_MODEL_STAGE}"
-        model = mlflow.sklearn.load_model(model_uri)
-        model_source = f"MLflow registry ({model_uri})"
-        print(f"✓ Model loaded from {model_source}")
-    except Exception as e:
-        print(f"Warning: Could not load from MLflow: {e}", file=sys.stderr)
-        # Fall through to local model attempt
+        client = mlflow.tracking.MlflowClient()
+        versions = client.get_latest_versions(MLFLOW_MODEL_NAME, stages=[MLFLOW_MODEL_STAGE])
+        return versions[0].version if versions else None
+    except Exception:
+        return None
+
+
+def file_version(path: str):
+    """Version tag of a local model file: its modification time in ns plus its size.
+
+    Whole-second mtimes gave two saves within one second the same version.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"mtime-{stat.st_mtime_ns}-{stat.st_size}"
+
 
-# Fallback to local model file
-if model is None:
+def available_version():
+    """Cheap check of the version a fresh load would get (no model is loaded)."""
+    version = registry_version()
+    if version is not None:
+        return f"v{version}"
+    if MODEL_MMAP_DIR and os.path.isdir(MODEL_MMAP_DIR):
+        return file_version(os.path.join(MODEL_MMAP_DIR, META_FILE))
+    return file_version(MODEL_PATH)
+
+
+def process_memory() -> Dict:
+    """Memory of this worker process in MiB.
+
+    ``rss_mb`` counts shared pages (e.g. an mmap-ed model) in full for every
+    worker; ``pss_mb`` splits them between the processes that share them, so
+    the sum of ``pss_mb`` over workers is what the pod actually uses.
+    """
+    info = {}
+    fields = {'VmRSS': 'rss_mb', 'VmHWM': 'peak_rss_mb', 'Pss': 'pss_mb',
+              'Shared_Clean': 'shared_clean_mb', 'Private_Clean': 'private_clean_mb',
+              'Private_Dirty': 'private_dirty_mb'}
+    for proc_file in ('/proc/self/status', '/proc/self/smaps_rollup'):
+        try:
+            with open(proc_file) as f:
+                for line in f:
+                    key, _, rest = line.partition(':')
+                    if key in fields and rest.strip().endswith('kB'):
+                        info[fields[key]] = round(int(rest.split()[0]) / 1024, 1)
+        except OSError:
+            continue
+    if 'rss_mb' not in info:
+        import resource
+        # Linux: ru_maxrss у кілобайтах
+        info['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return info
+
+
+def load_model() -> Optional[ModelBundle]:
+    """Load the model from the MLflow registry, falling back to MODEL_PATH."""
+    # Try MLflow registry only if tracking URI is explicitly provided and mlflow is available
+    if MLFLOW_TRACKING_URI:
+        mlflow = _import_mlflow()
+        if mlflow is None:
+            print("Warning: mlflow not available, will use local model only", file=sys.stderr)
+        else:
+            try:
+                mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+                model_uri = f"models:/{MLFLOW_MODEL_NAME}/{MLFLOW_MODEL_STAGE}"
+                version = registry_version()
+                loaded = mlflow.sklearn.load_model(model_uri)
+                print(f"✓ Model loaded from MLflow registry ({model_uri})")
+                return ModelBundle(loaded, f"MLflow registry ({model_uri})", f"v{version}" if version else None)
+            except Exception as e:
+                print(f"Warning: Could not load from MLflow: {e}", file=sys.stderr)
+                # Fall through to local model attempt
+
+    # Flat mmap export shared between workers
+    if MODEL_MMAP_DIR and os.path.isdir(MODEL_MMAP_DIR):
+        try:
+            version = file_version(os.path.join(MODEL_MMAP_DIR, META_FILE))
+            loaded = load_serving_model(MODEL_MMAP_DIR, mmap_mode='r')
+            print(f"✓ Model memory-mapped from {MODEL_MMAP_DIR}")
+            return ModelBundle(loaded, f"mmap export ({MODEL_MMAP_DIR})", version)
+        except Exception as e:
+            print(f"Warning: Could not load mmap export: {e}", file=sys.stderr)
+
+    # Fallback to local model file
     try:
-        model = joblib.load(MODEL_PATH)
-        model_source = f"local file ({MODEL_PATH})"
-        print(f"✓ Model loaded from {model_source}")
+        version = file_version(MODEL_PATH)
+        loaded = joblib.load(MODEL_PATH)
+        print(f"✓ Model loaded from local file ({MODEL_PATH})")
+        return ModelBundle(loaded, f"local file ({MODEL_PATH})", version)
     except Exception as e:
         print(f"Warning: Could not load local model: {e}", file=sys.stderr)
-        model = None
-        model_source = None
+        return None
 
-if model is None:
-    print("Warning: No model loaded - predictions will fail until model is available", file=sys.stderr)
 
+def set_model(new_model, source: str = None, version: str = None) -> ModelBundle:
+    """Install ``new_model`` for serving (one atomic swap of the bundle)."""
+    global _bundle, load_state
+    bundle = ModelBundle(new_model, source, version) if new_model is not None else None
+    _bundle = bundle
+    load_state = 'ready' if bundle is not None else 'idle'
+    return bundle
 
-def preprocess_features(features: Dict) -> pd.DataFrame:
-    """Return a DataFrame suitable for the saved sklearn Pipeline.
+
+def reload_model(force: bool = True) -> Dict:
+    """Load the current model off the request path and swap it in.
+
+    With ``force=False`` nothing is loaded unless the registry/file version
+    differs from the serving one. The serving model is kept when loading fails.
+    """
+    global _bundle, load_state, last_load_error, last_load_seconds
+    with _reload_lock:
+        serving = _bundle
+        if not force and serving is not None:
+            available = available_version()
+            if available is None or available == serving.version:
+                return {"reloaded": False, "version": serving.version, "source": serving.source}
+
+        started = time.perf_counter()
+        bundle = load_model()
+        if bundle is None:
+            last_load_error = "No model could be loaded"
+            if serving is None:
+                load_state = 'failed'
+                print("Warning: No model loaded - predictions will fail until model is available", file=sys.stderr)
+            return {"reloaded": False, "error": last_load_error,
+                    "version": serving.version if serving else None}
+
+        last_load_seconds = time.perf_counter() - started
+        last_load_error = None
+        _bundle = bundle
+        load_state = 'ready'
+        memory = process_memory()
+        print(f"✓ Model {bundle.version} ready in {last_load_seconds:.2f}s "
+              f"(pid {os.getpid()}, RSS {memory.get('rss_mb', '?')} MiB, PSS {memory.get('pss_mb', '?')} MiB)")
+        return {"reloaded": True, "version": bundle.version, "source": bundle.source,
+                "load_seconds": round(last_load_seconds, 3)}
+
+
+def load_initial_model() -> Dict:
+    """First load after startup; sets ``load_state`` to 'loading' while it runs."""
+    global load_state
+    if _bundle is not None:
+        load_state = 'ready'
+        return {"reloaded": False, "version": _bundle.version, "source": _bundle.source}
+    load_state = 'loading'
+    return reload_model(force=True)
+
+
+def reload_if_changed() -> Dict:
+    """Watcher hook: reload only when a newer model version is available."""
+    return reload_model(force=False)
+
+
+def preprocess_batch(records: List[Dict]) -> pd.DataFrame:
+    """Return a DataFrame with one row per record for the saved sklearn Pipeline.
 
     Do minimal numeric coercion and otherwise leave categorical values as-is
     so the pipeline's ColumnTransformer / OneHotEncoder can handle them.
     """
-    df = pd.DataFrame([features])
+    df = pd.DataFrame.from_records(records)
 
     # Ensure numeric columns are numeric (common potential issue)
-    if 'TotalCharges' in df.columns:
-        df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-    if 'MonthlyCharges' in df.columns:
-        df['MonthlyCharges'] = pd.to_numeric(df['MonthlyCharges'], errors='coerce')
-    if 'tenure' in df.columns:
-        df['tenure'] = pd.to_numeric(df['tenure'], errors='coerce')
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
 
     # Fill NA with reasonable defaults (pipeline may still raise if unexpected)
-    df = df.fillna({
-        'TotalCharges': 0,
-        'MonthlyCharges': 0,
-        'tenure': 0
-    })
+    df = df.fillna({col: 0 for col in NUMERIC_COLUMNS})
+
+    # Optional date columns: None lets the model's DateFeatures fill in its latest date
+    for col in DATE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
 
     return df
 
 
-def predict_churn(features: Dict) -> Dict:
-    if model is None:
-        return {"error": "Model not loaded"}
+def preprocess_features(features: Dict) -> pd.DataFrame:
+    """Single-record variant of :func:`preprocess_batch`."""
+    return preprocess_batch([features])
 
-    try:
-        X = preprocess_features(features)
 
-        # Some MLflow-loaded models may be pyfunc wrappers; prefer predict_proba when available
-        if hasattr(model, 'predict_proba'):
-            prob = model.predict_proba(X)[0][1]
+def _validate(bundle: ModelBundle, records: List[Dict]) -> None:
+    """Raise ValueError when a record lacks a column the model was trained on."""
+    with PREDICT_STAGE_SECONDS.time(stage='validate'):
+        for record in records:
+            missing = [col for col in bundle.required_columns if col not in record]
+            if missing:
+                raise ValueError(f"Missing features: {', '.join(missing)}")
+
+
+def _predict_proba(bundle: ModelBundle, records: List[Dict]):
+    """Return the churn probability for every record.
+
+    The work is split into a ``preprocess`` stage (records → model input
+    matrix) and an ``infer`` stage (trees), each timed separately.
+    """
+    _validate(bundle, records)
+    encoder, forest, model = bundle.encoder, bundle.forest, bundle.model
+    if len(records) > TREE_ENGINE_MAX_BATCH:
+        forest = None
+
+    with PREDICT_STAGE_SECONDS.time(stage='preprocess'):
+        if encoder is not None:
+            X = encoder.transform(records)
+            classifier = forest or encoder.classifier
         else:
-            # fallback to predict (binary 0/1) and map to probability-like value
-            pred = model.predict(X)[0]
-            prob = float(pred)
+            X = preprocess_batch(records)
+            if hasattr(model, 'steps') and hasattr(model.steps[-1][1], 'predict_proba'):
+                X = model[:-1].transform(X)
+                classifier = forest or model.steps[-1][1]
+            else:
+                classifier = model
+
+    with PREDICT_STAGE_SECONDS.time(stage='infer'):
+        # Some MLflow-loaded models may be pyfunc wrappers; prefer predict_proba when available
+        if hasattr(classifier, 'predict_proba'):
+            return classifier.predict_proba(X)[:, 1]
+        # fallback to predict (binary 0/1) and map to probability-like value
+        return classifier.predict(X).astype(float)
 
-        pred = 1 if prob >= 0.5 else 0
 
-        return {
-            "churn_probability": round(float(prob), 4),
-            "churn_prediction": int(pred),
-            "features_used": list(X.columns)
-        }
+def _format_result(prob: float, features_used: List[str]) -> Dict:
+    return {
+        "churn_probability": round(float(prob), 4),
+        "churn_prediction": 1 if prob >= 0.5 else 0,
+        "features_used": features_used,
+    }
+
+
+def _count_predictions(bundle: ModelBundle, results: List[Dict]) -> None:
+    churn = sum(1 for result in results if result.get("churn_prediction") == 1)
+    errors = sum(1 for result in results if "error" in result)
+    labels = {"model_version": bundle.version, "model_source": bundle.source}
+    for outcome, count in (("churn", churn), ("no_churn", len(results) - churn - errors), ("error", errors)):
+        if count:
+            PREDICTIONS.inc(count, result=outcome, **labels)
+
+
+def cache_key(features: Dict) -> str:
+    return feature_key(features, NUMERIC_COLUMNS)
+
+
+def predict_churn(features: Dict, use_cache: bool = True, bundle: ModelBundle = None) -> Dict:
+    bundle = bundle or _bundle
+    if bundle is None:
+        return {"error": "Model not loaded"}
+    result = _predict_one(bundle, features, use_cache)
+    _count_predictions(bundle, [result])
+    return result
+
+
+def _predict_one(bundle: ModelBundle, features: Dict, use_cache: bool) -> Dict:
+    cache = prediction_cache if use_cache else None
+    version = bundle.version
+    if cache is not None:
+        key = cache_key(features)
+        cached = cache.get(key, version)
+        if cached is not None:
+            return dict(cached)
+
+    try:
+        prob = _predict_proba(bundle, [features])[0]
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+    with PREDICT_STAGE_SECONDS.time(stage='serialize'):
+        result = _format_result(prob, list(features))
+        if cache is not None:
+            cache.put(key, version, result)
+        return dict(result)
+
+
+def predict_churn_batch(records: List[Dict], use_cache: bool = True) -> List[Dict]:
+    """Score many records with a single vectorized ``predict_proba`` call.
+
+    Returns one result dict per input record, in the same order. A record
+    that cannot be scored gets ``{"error": ...}`` instead of failing the
+    whole batch: if the vectorized call raises, the batch is re-scored
+    record by record to isolate the offending rows. Records found in the
+    prediction cache are not scored again.
+    """
+    bundle = _bundle
+    if bundle is None:
+        return [{"error": "Model not loaded"} for _ in records]
+    if not records:
+        return []
+    results = _predict_many(bundle, records, use_cache)
+    _count_predictions(bundle, results)
+    return results
+
+
+def _predict_many(bundle: ModelBundle, records: List[Dict], use_cache: bool) -> List[Dict]:
+    cache = prediction_cache if use_cache else None
+    version = bundle.version
+    results = [None] * len(records)
+    keys = [None] * len(records)
+    if cache is not None:
+        for i, record in enumerate(records):
+            keys[i] = cache_key(record)
+            cached = cache.get(keys[i], version)
+            if cached is not None:
+                results[i] = dict(cached)
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    try:
+        probs = _predict_proba(bundle, [records[i] for i in pending])
+    except Exception:
+        for i in pending:
+            results[i] = _predict_one(bundle, records[i], use_cache)
+        return results
+
+    with PREDICT_STAGE_SECONDS.time(stage='serialize'):
+        for i, prob in zip(pending, probs):
+            # Записи одного батча можуть мати різні поля (exclude_none, необов'язковий RecordDate)
+            result = _format_result(prob, list(records[i]))
+            if cache is not None:
+                cache.put(keys[i], version, result)
+            results[i] = dict(result)
+    return results
@@ -0,0 +1,224 @@
+"""Non-blocking request/prediction log for drift analysis and retraining.
+
+Endpoints call ``RequestLogger.log`` with a plain dict. It only appends the
+dict to a bounded in-memory buffer, so a slow or full disk never adds latency
+to ``/predict``. A background thread drains the buffer in batches and writes
+gzip-compressed JSONL files, rotated by size and age:
+
+    <REQUEST_LOG_DIR>/requests-20240101T120000-<pid>-0001.jsonl.gz
+
+The file being written carries an extra ``.tmp`` suffix and is renamed when it
+is rotated, so consumers only ever see complete files. A file whose write
+failed (e.g. a full disk) may be truncated and is renamed to ``.corrupt``
+instead. When the buffer is full new records are dropped and counted instead
+of blocking the caller.
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+
+REQUEST_LOG_DIR = os.getenv("REQUEST_LOG_DIR", "").strip()
+REQUEST_LOG_BUFFER = int(os.getenv("REQUEST_LOG_BUFFER", "10000"))
+REQUEST_LOG_BATCH = int(os.getenv("REQUEST_LOG_BATCH", "500"))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("REQUEST_LOG_FLUSH_INTERVAL", "1.0"))
+# Ротація: розмір нестиснутих даних (байти) та вік файлу (секунди)
+REQUEST_LOG_MAX_BYTES = int(os.getenv("REQUEST_LOG_MAX_BYTES", str(64 * 2**20)))
+REQUEST_LOG_MAX_AGE = float(os.getenv("REQUEST_LOG_MAX_AGE", "3600"))
+
+TMP_SUFFIX = ".tmp"
+CORRUPT_SUFFIX = ".corrupt"
+
+
+class RequestLogger:
+    """Bounded buffer plus a background thread writing rotating ``.jsonl.gz`` files."""
+
+    def __init__(
+        self,
+        directory: str,
+        buffer_size: int = REQUEST_LOG_BUFFER,
+        batch_size: int = REQUEST_LOG_BATCH,
+        flush_interval: float = REQUEST_LOG_FLUSH_INTERVAL,
+        max_bytes: int = REQUEST_LOG_MAX_BYTES,
+        max_age: float = REQUEST_LOG_MAX_AGE,
+    ):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be >= 1")
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.01, flush_interval)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._file = None
+        self._path: Optional[str] = None
+        self._file_bytes = 0
+        self._file_opened_at = 0.0
+        self._sequence = 0
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self.files_closed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Записує все, що залишилось у буфері, та закриває поточний файл."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        # Якщо writer ще пише, start() не повинен запускати другий потік на тому ж буфері
+        if not self._thread.is_alive():
+            self._thread = None
+
+    def log(self, record: Dict) -> bool:
+        """Queue ``record`` for writing; returns False if it was dropped."""
+        with self._lock:
+            if len(self._buffer) >= self.buffer_size:
+                self.dropped += 1
+                return False
+            self._buffer.append(record)
+            self.enqueued += 1
+            wake = len(self._buffer) >= self.batch_size
+        if wake:
+            self._wakeup.set()
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "running": self.running,
+                "buffered": len(self._buffer),
+                "buffer_size": self.buffer_size,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+                "files_closed": self.files_closed,
+            }
+
+    # ── Фоновий запис ──────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            stopping = self._stopping.is_set()
+            while self._flush_batch():
+                pass
+            if self._file is not None and (stopping or self._expired()):
+                self._close_file()
+            if stopping:
+                return
+
+    def _take_batch(self) -> list:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _flush_batch(self) -> bool:
+        batch = self._take_batch()
+        if not batch:
+            return False
+        payload = "".join(json.dumps(record, default=str, separators=(",", ":")) + "\n" for record in batch)
+        data = payload.encode("utf-8")
+        try:
+            if self._file is None:
+                self._open_file()
+            self._file.write(data)
+            # Z_SYNC_FLUSH: дані батчу потрапляють у файл, не чекаючи закриття
+            self._file.flush()
+        except OSError as e:
+            with self._lock:
+                self.write_errors += 1
+                self.dropped += len(batch)
+            print(f"Warning: request log write failed ({e}); dropped {len(batch)} records", file=sys.stderr)
+            self._close_file(corrupt=True)
+            return True
+
+        self._file_bytes += len(data)
+        with self._lock:
+            self.written += len(batch)
+        if self._file_bytes >= self.max_bytes or self._expired():
+            self._close_file()
+        return True
+
+    def _expired(self) -> bool:
+        return self.max_age > 0 and time.monotonic() - self._file_opened_at >= self.max_age
+
+    def _open_file(self) -> None:
+        self._sequence += 1
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        name = f"requests-{stamp}-{os.getpid()}-{self._sequence:04d}.jsonl.gz"
+        self._path = os.path.join(self.directory, name)
+        self._file = gzip.open(self._path + TMP_SUFFIX, "wb")
+        self._file_bytes = 0
+        self._file_opened_at = time.monotonic()
+
+    def _close_file(self, corrupt: bool = False) -> None:
+        """Close the current file and rename it to its final name, or to ``.corrupt`` after a failed write."""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except OSError as e:
+            if not corrupt:
+                self.write_errors += 1
+                print(f"Warning: could not close request log {self._path} ({e})", file=sys.stderr)
+            corrupt = True
+        # Обрізаний gzip не повинен виглядати як завершений файл
+        final_path = self._path + CORRUPT_SUFFIX if corrupt else self._path
+        try:
+            os.replace(self._path + TMP_SUFFIX, final_path)
+            if not corrupt:
+                self.files_closed += 1
+        except OSError as e:
+            self.write_errors += 1
+            print(f"Warning: could not finalize request log {final_path} ({e})", file=sys.stderr)
+        finally:
+            self._file = None
+            self._path = None
+
+
+def prediction_record(endpoint: str, features: Dict, result: Dict, customer_id: Optional[str] = None,
+                      model_version: Optional[str] = None, model_source: Optional[str] = None) -> Dict:
+    """Build one log line: the model input and the prediction it produced."""
+    return {
+        "ts": datetime.utcnow().isoformat(),
+        "endpoint": endpoint,
+        "customer_id": customer_id,
+        "model_version": model_version,
+        "model_source": model_source,
+        "features": features,
+        "churn_probability": result.get("churn_probability"),
+        "churn_prediction": result.get("churn_prediction"),
+    }
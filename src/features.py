@@ -0,0 +1,100 @@
+"""Feature engineering shared by training (``pipelines/train.py``) and serving (``src.api``).
+
+The generator writes ``RecordDate`` as a ``YYYY-MM-DD`` string. Treated as a
+category it becomes one one-hot column per calendar day, and every date after
+the training period encodes as all zeros. ``DateFeatures`` replaces it with two
+numeric columns instead:
+
+- ``<col>_year``: the fractional year (``2023.5`` is early July 2023), which
+  carries the drift across years;
+- ``<col>_month``: the month, 1–12, for seasonality.
+
+Missing or unparseable dates (e.g. an API request without ``RecordDate``) get
+the latest date seen in training. That is the most recent state the model
+knows, and it is also where trees place any later date.
+
+The class lives under ``src/`` because it is pickled with the model and the
+API must be able to import it.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Колонки з датою запису, які не можна кодувати як категорії
+DATE_COLUMNS = ('RecordDate',)
+# Числові колонки, які при скорингу приводяться pd.to_numeric(errors='coerce') + fillna(0)
+NUMERIC_COLUMNS = ('TotalCharges', 'MonthlyCharges', 'tenure')
+
+
+def split_feature_columns(X: pd.DataFrame) -> Tuple[List[str], List[str], List[str]]:
+    """Split the columns of ``X`` into ``(numeric, categorical, date)`` lists."""
+    dates = [col for col in X.columns if col in DATE_COLUMNS]
+    categorical = [col for col in X.select_dtypes(include=['object', 'category']).columns if col not in dates]
+    numeric = [col for col in X.select_dtypes(include=['int64', 'float64']).columns if col not in dates]
+    return numeric, categorical, dates
+
+
+def _to_days(values, fill=None) -> np.ndarray:
+    """Date strings (or datetimes) → ``datetime64[D]``, NaT replaced by ``fill`` if given."""
+    days = pd.to_datetime(pd.Series(np.asarray(values, dtype=object)), errors='coerce').to_numpy('datetime64[D]')
+    if fill is not None:
+        days[np.isnat(days)] = fill
+    return days
+
+
+def to_float32(X) -> np.ndarray:
+    """Numeric passthrough that emits float32, the dtype sklearn trees work in anyway."""
+    return np.asarray(X, dtype=np.float32)
+
+
+class DateFeatures(BaseEstimator, TransformerMixin):
+    """Encode date columns as ``(fractional year, month)`` pairs of ``dtype``."""
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        columns = self._columns(X)
+        self.n_features_in_ = len(columns)
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        fill = []
+        for values in columns:
+            days = _to_days(values)
+            valid = days[~np.isnat(days)]
+            fill.append(valid.max() if len(valid) else np.datetime64('1970-01-01', 'D'))
+        self.fill_ = np.asarray(fill, dtype='datetime64[D]')
+        return self
+
+    def transform(self, X):
+        columns = self._columns(X)
+        if len(columns) != self.n_features_in_:
+            raise ValueError(f'DateFeatures was fitted on {self.n_features_in_} columns, got {len(columns)}')
+        if not columns:
+            return np.empty((len(X), 0), dtype=self.dtype)
+        return np.hstack([self.encode_column(values, i) for i, values in enumerate(columns)])
+
+    def encode_column(self, values: Sequence, index: int = 0) -> np.ndarray:
+        """``(len(values), 2)`` matrix for the ``index``-th fitted column."""
+        days = _to_days(values, self.fill_[index])
+        years = days.astype('datetime64[Y]')
+        day_of_year = (days - years.astype('datetime64[D]')).astype(np.float64)
+        out = np.empty((len(days), 2), dtype=self.dtype)
+        out[:, 0] = years.astype(np.int64) + 1970 + day_of_year / 365.25
+        out[:, 1] = days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        if input_features is None:
+            input_features = getattr(self, 'feature_names_in_', [f'x{i}' for i in range(self.n_features_in_)])
+        return np.asarray([f'{col}_{part}' for col in input_features for part in ('year', 'month')], dtype=object)
+
+    @staticmethod
+    def _columns(X) -> list:
+        if isinstance(X, pd.DataFrame):
+            return [X[col].to_numpy() for col in X.columns]
+        X = np.asarray(X, dtype=object)
+        return [X[:, i] for i in range(X.shape[1])] if X.ndim == 2 else [X]
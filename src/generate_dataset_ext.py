@@ -7,6 +7,20 @@ from faker import Faker
 from datetime import datetime, timedelta
 from pathlib import Path
 import argparse
+import math
+import os
+import string
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
+from typing import Iterator, List, NamedTuple, Optional
+
+try:
+    from src.profiling import PhaseTimer, add_profiling_args, profiled
+except ImportError:  # запуск як скрипт: python src/generate_dataset_ext.py
+    from profiling import PhaseTimer, add_profiling_args, profiled
 
 fake = Faker()
 random.seed(42)
@@ -93,234 +107,1218 @@ def load_config(config_path: str = "config/config.yaml") -> dict:
         return yaml.safe_load(f) or {}
 
 
-def generate_tabular_data(config: dict = None) -> pd.DataFrame:
-    config = config or {}
+DEFAULT_SEED = 42
+
+GENDERS          = np.array(["Male", "Female"], dtype=object)
+YES_NO           = np.array(["Yes", "No"], dtype=object)
+INTERNET_TYPES   = np.array(["DSL", "Fiber optic", "No"], dtype=object)
+CONTRACT_TYPES   = np.array(["Month-to-month", "One year", "Two year"], dtype=object)
+PAYMENT_METHODS  = np.array(
+    ["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"], dtype=object
+)
+SERVICE_LABELS   = np.array(["Yes", "No", "No internet service"], dtype=object)
+LINES_LABELS     = np.array(["Yes", "No", "No phone service"], dtype=object)
+ID_LETTERS       = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+
+# Індекси категорій у масивах вище
+DSL, FIBER, NO_INTERNET = 0, 1, 2
+MONTH_TO_MONTH, ONE_YEAR, TWO_YEAR = 0, 1, 2
+ELECTRONIC_CHECK = 0
+
+
+def _bernoulli(rng: np.random.Generator, prob, n: int) -> np.ndarray:
+    """Boolean array: True with probability ``prob`` (scalar or one value per row)."""
+    return rng.random(n) < prob
+
+
+def _choice(rng: np.random.Generator, weights, n: int) -> np.ndarray:
+    """Vectorized ``random.choices``: category index by inverse CDF over per-row weights."""
+    cdf = np.cumsum([np.broadcast_to(np.asarray(w, dtype=float), (n,)) for w in weights], axis=0)
+    u = rng.random(n) * cdf[-1]
+    # Як bisect_right у random.choices: кількість меж, що не перевищують u
+    return np.minimum((u >= cdf[:-1]).sum(axis=0), len(weights) - 1)
+
+
+def _labels(values: np.ndarray) -> np.ndarray:
+    """``YES_NO`` labels for a boolean array (True → "Yes")."""
+    return YES_NO[(~values).astype(np.intp)]
+
+
+# ── customerID: лічильник рядків, переставлений афінним відображенням ─────────
+
+LETTER_SPACE = 26**5
+ID_SPACE = 9000 * LETTER_SPACE                 # 106 932 384 000 ID у форматі NNNN-XXXXX
+# multiplier * counter + offset має вміщатися в int64
+_MAX_ID_MULTIPLIER = (2**63 - 1 - ID_SPACE) // ID_SPACE
+_ID_STREAM = 2**31 + 1                         # spawn_key ключа ID (поза потоками шардів і вікон)
+
+
+class IdKey(NamedTuple):
+    """Two rounds of ``x -> (multiplier * x + offset) mod ID_SPACE`` with their inverses."""
+    multipliers: tuple
+    offsets: tuple
+    inverses: tuple
+
+
+@lru_cache(maxsize=None)
+def id_key(seed: int = DEFAULT_SEED) -> IdKey:
+    """ID permutation of a seed: IDs look random, but distinct counters never collide."""
+    state = np.random.SeedSequence(seed, spawn_key=(_ID_STREAM,)).generate_state(4, np.uint64)
+    low = _MAX_ID_MULTIPLIER // 2
+    multipliers = []
+    for value in state[:2]:
+        multiplier = low + int(value) % (_MAX_ID_MULTIPLIER - low)
+        # Бієкція лише для multiplier, взаємно простого з 9000 * 26^5 = 2^6 * 3^2 * 5^3 * 13^5
+        while math.gcd(multiplier, ID_SPACE) != 1:
+            multiplier -= 1
+        multipliers.append(multiplier)
+    return IdKey(
+        tuple(multipliers),
+        tuple(int(value) % ID_SPACE for value in state[2:]),
+        tuple(pow(multiplier, -1, ID_SPACE) for multiplier in multipliers),
+    )
+
+
+def _swap_radix(index: np.ndarray) -> np.ndarray:
+    # d * 26^5 + l -> l * 9000 + d: бієкція, що переносить зміни молодших розрядів у старші
+    digits, letters = np.divmod(index, LETTER_SPACE)
+    return letters * 9000 + digits
+
+
+def _unswap_radix(index: np.ndarray) -> np.ndarray:
+    letters, digits = np.divmod(index, 9000)
+    return digits * LETTER_SPACE + letters
+
+
+def encode_ids(counters: np.ndarray, key: IdKey) -> np.ndarray:
+    """``NNNN-XXXXX`` IDs for distinct ``counters`` (global row numbers), built as a byte array."""
+    counters = np.asarray(counters, dtype=np.int64)
+    if counters.size and (counters.min() < 0 or counters.max() >= ID_SPACE):
+        raise ValueError(f"customer counters must be in [0, {ID_SPACE})")
+    index = (counters * key.multipliers[0] + key.offsets[0]) % ID_SPACE
+    index = (_swap_radix(index) * key.multipliers[1] + key.offsets[1]) % ID_SPACE
+    digits, letters = np.divmod(index, LETTER_SPACE)
+    digits += 1000
+
+    n = len(counters)
+    buf = np.empty((n, 10), dtype=np.uint8)
+    for pos, power in enumerate((1000, 100, 10, 1)):
+        buf[:, pos] = ord("0") + digits // power % 10
+    buf[:, 4] = ord("-")
+    for pos in range(9, 4, -1):
+        letters, code = np.divmod(letters, 26)
+        buf[:, pos] = ID_LETTERS[code]
+    return buf.view("S10").ravel().astype("U10").astype(object)
+
+
+def _mulmod(x: np.ndarray, k: int, m: int) -> np.ndarray:
+    # x * k mod m без переповнення int64: k ділиться на дві половини по 18 біт
+    high, low = divmod(k, 2**18)
+    return ((x * high % m) * 2**18 + x * low) % m
+
+
+def decode_ids(ids, key: IdKey) -> np.ndarray:
+    """Counters of ``NNNN-XXXXX`` IDs (inverse of :func:`encode_ids`)."""
+    buf = np.asarray(ids, dtype="S10").view(np.uint8).reshape(-1, 10).astype(np.int64)
+    digits = (buf[:, :4] - ord("0")) @ np.array([1000, 100, 10, 1]) - 1000
+    letters = (buf[:, 5:] - ord("A")) @ (26 ** np.arange(4, -1, -1))
+    index = digits * LETTER_SPACE + letters
+    index = _unswap_radix(_mulmod((index - key.offsets[1]) % ID_SPACE, key.inverses[1], ID_SPACE))
+    return _mulmod((index - key.offsets[0]) % ID_SPACE, key.inverses[0], ID_SPACE)
+
+
+# Значення за замовчуванням для секцій drift / pricing / churn конфігу
+DEFAULT_DRIFT = {
+    # Частки на початку періоду (progress = 0) і мінімуми, нижче яких drift не опускає
+    "dsl_share": 0.40,
+    "fiber_share": 0.40,
+    "no_internet_share": 0.20,
+    "echeck_share": 0.40,
+    "echeck_floor": 0.15,
+    "m2m_share": 0.55,
+    "m2m_floor": 0.30,
+    "senior_share": 0.18,
+    "senior_floor": 0.08,
+    "paperless_share": 0.59,
+    "paperless_growth_rate": 0.15,
+    "mailed_check_share": 0.25,
+    "bank_transfer_share": 0.25,
+    "bank_transfer_growth_rate": 0.10,
+    "credit_card_share": 0.25,
+    "credit_card_growth_rate": 0.15,
+    "fiber_growth_rate": 0.25,
+    "dsl_decline_rate": 0.20,
+    "no_internet_decline": 0.05,
+    "echeck_decline_rate": 0.25,
+    "m2m_decline_rate": 0.25,
+    "streaming_boost_factor": 0.3,
+    "senior_decline_rate": 0.12,
+    "churn_base_decline": 0.20,
+}
+DEFAULT_PRICING = {
+    "base_charge": 20.0,
+    "phone_addon": 25.0,
+    "multiple_lines_addon": 18.0,
+    "dsl_addon": 50.0,
+    "fiber_base": 82.0,
+    "fiber_progress_bonus": 10.0,
+    "extra_service_per_item": 8.0,
+    "extra_service_progress_bonus": 3.0,
+    "one_year_discount": 0.94,
+    "two_year_discount": 0.88,
+    "two_year_progress_penalty": 0.03,
+}
+DEFAULT_CHURN = {
+    "base": 0.45,
+    "month_to_month": 0.35,
+    "electronic_check": 0.18,
+    "fiber": 0.08,
+    "new_customer_months": 12,
+    "new_customer_bonus": 0.25,
+    "new_customer_decay": 0.02,
+}
+
+
+class RuleProgram(NamedTuple):
+    """Drift, pricing and churn rules of a config compiled into coefficients.
+
+    Category effects are lookup tables indexed by category code (order of
+    ``INTERNET_TYPES``, ``CONTRACT_TYPES``, ``PAYMENT_METHODS``). Terms that
+    drift are stored as ``intercept`` and ``slope`` per unit of ``progress``.
+    :func:`generate_customers` applies them to a whole batch with a few
+    gathers and multiply-adds. Built once per config by :func:`compile_program`.
+    """
+    # Drift
+    internet_weights: np.ndarray    # (2, 3): intercept, slope для DSL / Fiber / No
+    echeck_share: float
+    echeck_floor: float
+    echeck_decline: float
+    m2m_share: float
+    m2m_floor: float
+    m2m_decline: float
+    streaming_boost: float
+    senior_share: float
+    senior_floor: float
+    senior_decline: float
+    churn_decline: float
+    paperless: np.ndarray           # (2,): intercept, slope
+    payment_weights: np.ndarray     # (2, 3): intercept, slope для Mailed / Bank / Credit (echeck окремо)
+    # Pricing
+    base_charge: float
+    phone_addon: float
+    lines_addon: float
+    internet_addon: np.ndarray      # (2, 3)
+    service_addon: np.ndarray       # (2,): за кожен додатковий сервіс
+    contract_factor: np.ndarray     # (2, 3): множник ціни
+    # Churn
+    churn_base: float
+    churn_contract: np.ndarray      # (3,)
+    churn_payment: np.ndarray       # (4,)
+    churn_internet: np.ndarray      # (3,)
+    new_customer_months: int
+    new_customer_bonus: float
+    new_customer_decay: float
+
+
+def _section(config: dict, name: str, defaults: dict) -> dict:
+    values = {**defaults, **(config.get(name) or {})}
+    unknown = set(values) - set(defaults)
+    if unknown:
+        raise ValueError(f"unknown {name} keys: {sorted(unknown)}")
+    return {key: float(value) for key, value in values.items()}
+
+
+def compile_program(config: dict) -> RuleProgram:
+    """Read the ``drift``, ``pricing`` and ``churn`` sections once into a :class:`RuleProgram`."""
+    drift = _section(config, "drift", DEFAULT_DRIFT)
+    pricing = _section(config, "pricing", DEFAULT_PRICING)
+    churn = _section(config, "churn", DEFAULT_CHURN)
+    return RuleProgram(
+        internet_weights=np.array([
+            [drift["dsl_share"], drift["fiber_share"], drift["no_internet_share"]],
+            [-drift["dsl_decline_rate"], drift["fiber_growth_rate"], -drift["no_internet_decline"]],
+        ]),
+        echeck_share=drift["echeck_share"],
+        echeck_floor=drift["echeck_floor"],
+        echeck_decline=drift["echeck_decline_rate"],
+        m2m_share=drift["m2m_share"],
+        m2m_floor=drift["m2m_floor"],
+        m2m_decline=drift["m2m_decline_rate"],
+        streaming_boost=drift["streaming_boost_factor"],
+        senior_share=drift["senior_share"],
+        senior_floor=drift["senior_floor"],
+        senior_decline=drift["senior_decline_rate"],
+        churn_decline=drift["churn_base_decline"],
+        paperless=np.array([drift["paperless_share"], drift["paperless_growth_rate"]]),
+        payment_weights=np.array([
+            [drift["mailed_check_share"], drift["bank_transfer_share"], drift["credit_card_share"]],
+            [0.0, drift["bank_transfer_growth_rate"], drift["credit_card_growth_rate"]],
+        ]),
+        base_charge=pricing["base_charge"],
+        phone_addon=pricing["phone_addon"],
+        lines_addon=pricing["multiple_lines_addon"],
+        internet_addon=np.array([
+            [pricing["dsl_addon"], pricing["fiber_base"], 0.0],
+            [0.0, pricing["fiber_progress_bonus"], 0.0],
+        ]),
+        service_addon=np.array([pricing["extra_service_per_item"], pricing["extra_service_progress_bonus"]]),
+        contract_factor=np.array([
+            [1.0, pricing["one_year_discount"], pricing["two_year_discount"]],
+            [0.0, 0.0, -pricing["two_year_progress_penalty"]],
+        ]),
+        churn_base=churn["base"],
+        churn_contract=np.array([churn["month_to_month"], 0.0, 0.0]),
+        churn_payment=np.array([churn["electronic_check"], 0.0, 0.0, 0.0]),
+        churn_internet=np.array([0.0, churn["fiber"], 0.0]),
+        new_customer_months=int(churn["new_customer_months"]),
+        new_customer_bonus=churn["new_customer_bonus"],
+        new_customer_decay=churn["new_customer_decay"],
+    )
+
+
+def _linear(coefficients: np.ndarray, codes: np.ndarray, progress: np.ndarray) -> np.ndarray:
+    """``intercept[code] + slope[code] * progress`` for every row."""
+    return coefficients[0][codes] + coefficients[1][codes] * progress
+
+
+def generate_customers(days: np.ndarray, start: datetime, total_days: int, program: RuleProgram,
+                       rng: np.random.Generator, ids: np.ndarray) -> pd.DataFrame:
+    """Generate one customer per entry of ``days`` (offsets from ``start``), column by column.
+
+    The distributions and their drift over ``progress = day / total_days`` are
+    the same as the original per-row loop; every column is drawn for all rows
+    at once from ``rng`` and the rules come from ``program`` (see
+    :func:`compile_program`). Categories are kept as integer codes / masks
+    until the DataFrame is built. Days after ``total_days`` (incremental
+    windows) continue the drift with ``progress > 1``. ``ids`` are the
+    customer IDs of the rows, encoded with the key of ``generation.seed``
+    (see :func:`encode_ids`).
+    """
+    days = np.asarray(days, dtype=np.int64)
+    n = len(days)
+    progress = days / total_days if total_days else np.zeros(n)
+
+    internet_weights = program.internet_weights[0][:, None] + program.internet_weights[1][:, None] * progress
+    echeck_prob = np.maximum(program.echeck_floor, program.echeck_share - program.echeck_decline * progress)
+    m2m_prob = np.maximum(program.m2m_floor, program.m2m_share - program.m2m_decline * progress)
+    streaming_boost = program.streaming_boost * progress
+    senior_prob = np.maximum(program.senior_floor, program.senior_share - program.senior_decline * progress)
+
+    gender = rng.integers(0, 2, size=n)
+    senior_citizen = _bernoulli(rng, senior_prob, n).astype(np.int64)
+    has_partner = _choice(rng, [52 + 10 * progress, 48 - 10 * progress], n) == 0
+    has_dependents = _bernoulli(rng, 0.3 - 0.1 * progress, n)
+
+    tenure = (rng.beta(2 + progress, 3 - 0.5 * progress) * 72).astype(np.int64)
+    tenure = np.clip(tenure, 0, 72)
+
+    has_phone = _bernoulli(rng, 0.92, n)
+    internet_service = _choice(rng, internet_weights, n)
+    no_internet = internet_service == NO_INTERNET
+
+    base_yes = 0.5 + streaming_boost
+    services = {}
+    extra_count = np.zeros(n, dtype=np.int64)
+    for column, prob in (("OnlineSecurity", base_yes * 0.7), ("OnlineBackup", base_yes * 0.8),
+                         ("DeviceProtection", base_yes * 0.75), ("TechSupport", base_yes * 0.6),
+                         ("StreamingTV", base_yes + 0.1), ("StreamingMovies", base_yes + 0.1)):
+        has_service = _bernoulli(rng, prob, n) & ~no_internet
+        extra_count += has_service
+        # 0 = Yes, 1 = No, 2 = No internet service
+        services[column] = SERVICE_LABELS[np.where(no_internet, 2, (~has_service).astype(np.intp))]
+
+    multiple_lines = _bernoulli(rng, 0.45 + 0.1 * progress, n) & has_phone
+
+    contract = _choice(rng, [m2m_prob, (1 - m2m_prob) * 0.6, (1 - m2m_prob) * 0.4], n)
+    paperless_billing = _bernoulli(rng, program.paperless[0] + program.paperless[1] * progress, n)
+    payment_weights = program.payment_weights[0][:, None] + program.payment_weights[1][:, None] * progress
+    payment_method = _choice(rng, [echeck_prob, *payment_weights], n)
+
+    # Ціноутворення
+    base = program.base_charge + program.phone_addon * has_phone + program.lines_addon * multiple_lines
+    base = base + _linear(program.internet_addon, internet_service, progress)
+    base = base + extra_count * (program.service_addon[0] + program.service_addon[1] * progress)
+    base = base * _linear(program.contract_factor, contract, progress)
+
+    monthly_charges = np.round(np.maximum(18.5, base + rng.normal(0, 6, size=n)), 2)
+    total_charges = np.round(monthly_charges * tenure * rng.uniform(0.97, 1.03, size=n), 2)
+
+    new_customer = tenure < program.new_customer_months
+    churn_base = (program.churn_base
+                  + program.churn_contract[contract]
+                  + program.churn_payment[payment_method]
+                  + program.churn_internet[internet_service]
+                  + np.where(new_customer, program.new_customer_bonus - tenure * program.new_customer_decay, 0.0)
+                  - program.churn_decline * progress)
+    churn = _bernoulli(rng, churn_base, n)
+
+    # Рядки дат — одна на кожен день періоду, а не на кожен рядок
+    last_day = max(total_days, int(days.max())) if n else total_days
+    day_labels = np.datetime_as_string(
+        np.datetime64(start.date()) + np.arange(last_day + 1), unit="D"
+    ).astype(object)
+
+    return pd.DataFrame({
+        "customerID": ids,
+        "gender": GENDERS[gender],
+        "SeniorCitizen": senior_citizen,
+        "Partner": _labels(has_partner),
+        "Dependents": _labels(has_dependents),
+        "tenure": tenure,
+        "PhoneService": _labels(has_phone),
+        "MultipleLines": LINES_LABELS[np.where(has_phone, (~multiple_lines).astype(np.intp), 2)],
+        "InternetService": INTERNET_TYPES[internet_service],
+        **services,
+        "Contract": CONTRACT_TYPES[contract],
+        "PaperlessBilling": _labels(paperless_billing),
+        "PaymentMethod": PAYMENT_METHODS[payment_method],
+        "MonthlyCharges": monthly_charges,
+        "TotalCharges": total_charges,
+        "Churn": _labels(churn),
+        "RecordDate": day_labels[days],
+    })
+
+
+class ShardSpec(NamedTuple):
+    """Rows ``[start_row, stop_row)`` of the dataset and the seed that generates them.
+
+    Row ``r`` gets the customer ID of counter ``id_offset + r``: non-zero for
+    incremental windows, whose rows are numbered from 0.
+    """
+    index: int
+    start_row: int
+    stop_row: int
+    seed: np.random.SeedSequence
+    id_offset: int = 0
+
+
+def _settings(config: dict):
     gen = config.get("generation", {})
-    drift = config.get("drift", {})
-
-    n_samples   = gen.get("samples", 50000)
-    start_date  = gen.get("start_date", "2023-01-01")
-    end_date    = gen.get("end_date", "2024-12-31")
-
-    # Drift параметри (fallback на оригінальні значення)
-    fiber_growth_rate      = drift.get("fiber_growth_rate", 0.25)
-    dsl_decline_rate       = drift.get("dsl_decline_rate", 0.20)
-    no_inet_decline        = drift.get("no_internet_decline", 0.05)
-    echeck_decline_rate    = drift.get("echeck_decline_rate", 0.25)
-    m2m_decline_rate       = drift.get("m2m_decline_rate", 0.25)
-    streaming_boost_factor = drift.get("streaming_boost_factor", 0.3)
-    senior_decline_rate    = drift.get("senior_decline_rate", 0.12)
-    churn_base_decline     = drift.get("churn_base_decline", 0.20)
-
-    data = []
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
-    total_days = (end - start).days
-
-    for _ in range(n_samples):
-        record_date = start + timedelta(days=random.randint(0, total_days))
-        progress = (record_date - start).days / total_days
-
-        fiber_prob = 0.40 + fiber_growth_rate * progress
-        dsl_prob = 0.40 - dsl_decline_rate * progress
-        no_inet_prob = 0.20 - no_inet_decline * progress
-
-        echeck_prob = max(0.15, 0.40 - echeck_decline_rate * progress)
-        m2m_prob = max(0.30, 0.55 - m2m_decline_rate * progress)
-        streaming_boost = streaming_boost_factor * progress
-        senior_prob = max(0.08, 0.18 - senior_decline_rate * progress)
-
-        gender = random.choice(["Male", "Female"])
-        senior_citizen = 1 if random.random() < senior_prob else 0
-        has_partner = random.choices(["Yes", "No"], weights=[52 + 10*progress, 48 - 10*progress])[0]
-        has_dependents = "Yes" if random.random() < (0.3 - 0.1*progress) else "No"
-
-        tenure = int(np.random.beta(2 + progress, 3 - 0.5*progress) * 72)
-        tenure = max(0, min(tenure, 72))
-
-        phone_service = "Yes" if random.random() < 0.92 else "No"
-        internet_service = random.choices(
-            ["DSL", "Fiber optic", "No"],
-            weights=[dsl_prob, fiber_prob, no_inet_prob]
-        )[0]
-
-        if internet_service == "No":
-            secs = ["No internet service"] * 6
-            online_security, online_backup, device_protection, tech_support, streaming_tv, streaming_movies = secs
-        else:
-            base_yes = 0.5 + streaming_boost
-            online_security   = "Yes" if random.random() < (base_yes * 0.7)  else "No"
-            online_backup     = "Yes" if random.random() < (base_yes * 0.8)  else "No"
-            device_protection = "Yes" if random.random() < (base_yes * 0.75) else "No"
-            tech_support      = "Yes" if random.random() < (base_yes * 0.6)  else "No"
-            streaming_tv      = "Yes" if random.random() < (base_yes + 0.1) else "No"
-            streaming_movies  = "Yes" if random.random() < (base_yes + 0.1) else "No"
-
-        multiple_lines = "No phone service" if phone_service == "No" else (
-            "Yes" if random.random() < 0.45 + 0.1*progress else "No"
-        )
+    start = datetime.strptime(gen.get("start_date", "2023-01-01"), "%Y-%m-%d")
+    end = datetime.strptime(gen.get("end_date", "2024-12-31"), "%Y-%m-%d")
+    return gen.get("samples", 50000), start, (end - start).days, compile_program(config)
 
-        contract = random.choices(
-            ["Month-to-month", "One year", "Two year"],
-            weights=[m2m_prob, (1-m2m_prob)*0.6, (1-m2m_prob)*0.4]
-        )[0]
-
-        paperless_billing = "Yes" if random.random() < 0.59 + 0.15*progress else "No"
-
-        payment_method = random.choices(
-            ["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"],
-            weights=[echeck_prob, 0.25, 0.25 + 0.1*progress, 0.25 + 0.15*progress]
-        )[0]
-
-        base = 20.0
-        if phone_service == "Yes":
-            base += 25
-            if multiple_lines == "Yes":
-                base += 18
-        if internet_service == "DSL":
-            base += 50
-        elif internet_service == "Fiber optic":
-            base += 82 + 10*progress
-
-        extra_count = sum([online_security=="Yes", online_backup=="Yes", device_protection=="Yes",
-                           tech_support=="Yes", streaming_tv=="Yes", streaming_movies=="Yes"])
-        base += extra_count * (8 + 3*progress)
-
-        if contract == "One year":
-            base *= 0.94
-        elif contract == "Two year":
-            base *= 0.88 - 0.03*progress
-
-        monthly_charges = round(max(18.5, base + np.random.normal(0, 6)), 2)
-        total_charges = round(monthly_charges * tenure * random.uniform(0.97, 1.03), 2)
-
-        churn_base = 0.45
-        if contract == "Month-to-month": churn_base += 0.35
-        if payment_method == "Electronic check": churn_base += 0.18
-        if internet_service == "Fiber optic": churn_base += 0.08
-        if tenure < 12: churn_base += 0.25 - tenure*0.02
-        churn_base -= churn_base_decline * progress
-
-        churn = "Yes" if random.random() < churn_base else "No"
-
-        customer_id = f"{random.randint(1000,9999)}-{''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=5))}"
-
-        row = {
-            "customerID": customer_id,
-            "gender": gender,
-            "SeniorCitizen": senior_citizen,
-            "Partner": has_partner,
-            "Dependents": has_dependents,
-            "tenure": tenure,
-            "PhoneService": phone_service,
-            "MultipleLines": multiple_lines,
-            "InternetService": internet_service,
-            "OnlineSecurity": online_security,
-            "OnlineBackup": online_backup,
-            "DeviceProtection": device_protection,
-            "TechSupport": tech_support,
-            "StreamingTV": streaming_tv,
-            "StreamingMovies": streaming_movies,
-            "Contract": contract,
-            "PaperlessBilling": paperless_billing,
-            "PaymentMethod": payment_method,
-            "MonthlyCharges": monthly_charges,
-            "TotalCharges": total_charges,
-            "Churn": churn,
-            "RecordDate": record_date.strftime("%Y-%m-%d")
-        }
-        data.append(row)
 
-    df = pd.DataFrame(data)
-    df = df.sort_values("RecordDate").reset_index(drop=True)
-    return df
+def _seed_streams(config: dict, count: int) -> List[np.random.SeedSequence]:
+    """Незалежні потоки: [0] — план днів, [1] — вибірка для розмов, [2 + i] — шард i.
 
+    ``SeedSequence.spawn`` дає дитині i ту саму послідовність незалежно від
+    загальної кількості дітей, тож шард i не залежить від числа шардів.
+    """
+    seed = config.get("generation", {}).get("seed", DEFAULT_SEED)
+    return np.random.SeedSequence(seed).spawn(count)
 
-def generate_conversation(customer: dict) -> dict:
-    issue_type = random.choice(list(COMPLAINT_TEMPLATES.keys()))
-    complaint_template = random.choice(COMPLAINT_TEMPLATES[issue_type])
 
-    if issue_type == "billing_high":
-        normal = round(customer['MonthlyCharges'] * random.uniform(0.7, 0.85), 2)
-        complaint = complaint_template.format(
-            amount=customer['MonthlyCharges'],
-            normal=normal
-        )
-    elif issue_type == "service_slow":
-        speed_label = "fiber optic speeds" if customer['InternetService'] == "Fiber optic" else "DSL speeds"
-        complaint = complaint_template.format(
-            days=random.randint(2, 14),
-            speed=speed_label,
-            service=customer['InternetService'].lower()
-        )
-    elif issue_type == "service_outage":
-        complaint = complaint_template.format(
-            service=customer['InternetService'],
-            time=random.choice(["this morning", "yesterday morning", "last night", "2 days ago"]),
-            hours=random.randint(4, 72),
-            days=random.randint(1, 7)
-        )
-    elif issue_type == "contract_confusion":
-        complaint = complaint_template.format(
-            contract=customer['Contract'].lower(),
-            actual_contract=random.choice(["Month-to-month", "One year", "Two year"]),
-            date=(datetime.now() + timedelta(days=random.randint(30, 730))).strftime("%B %d, %Y"),
-            feature=random.choice(["free installation", "premium tech support", "streaming bundle"])
-        )
-    elif issue_type == "want_to_cancel":
-        complaint = complaint_template.format(
-            tenure=customer['tenure'],
-            feature=random.choice(["faster internet", "better support", "lower monthly price"])
-        )
+def day_counts(n_samples: int, total_days: int, rng: np.random.Generator) -> np.ndarray:
+    """Customers per day of the period (uniform over days, as ``randint`` per row)."""
+    return rng.multinomial(n_samples, np.full(total_days + 1, 1.0 / (total_days + 1)))
+
+
+def plan_shards(config: dict, shards: int = 1):
+    """Return ``(counts_per_day, [ShardSpec])`` splitting the rows into ``shards`` parts.
+
+    Rows are ordered by day, so shard ``i`` covers a contiguous date range and
+    concatenating the shards in order gives a dataset sorted by ``RecordDate``.
+    """
+    if shards < 1:
+        raise ValueError("shards must be >= 1")
+    n_samples, _, total_days, _ = _settings(config)
+    streams = _seed_streams(config, shards + 2)
+    counts = day_counts(n_samples, total_days, np.random.default_rng(streams[0]))
+    bounds = np.linspace(0, n_samples, shards + 1).astype(np.int64)
+    specs = [ShardSpec(i, int(bounds[i]), int(bounds[i + 1]), streams[i + 2]) for i in range(shards)]
+    return counts, specs
+
+
+def _chunk_seed(spec: ShardSpec, chunk: int) -> np.random.SeedSequence:
+    # Без spec.seed.spawn(): spawn змінює стан SeedSequence, а чанк k має бути тим самим при кожному виклику
+    return np.random.SeedSequence(spec.seed.entropy, spawn_key=spec.seed.spawn_key + (chunk,))
+
+
+def iter_shard_chunks(config: dict, counts: np.ndarray, spec: ShardSpec,
+                      chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield the rows of one shard in date order, ``chunk_size`` rows at a time.
+
+    Without ``chunk_size`` the shard is generated in one piece. With it, every
+    chunk has its own generator derived from the shard's seed, so memory is
+    bounded by the chunk and the output depends on (seed, shards, chunk_size).
+    """
+    _, start, total_days, program = _settings(config)
+    cumulative = np.cumsum(counts)
+    if chunk_size is None:
+        bounds = [(spec.start_row, spec.stop_row, spec.seed)]
     else:
-        complaint = complaint_template
-
-    # Resolution
-    resolution_template = random.choice(RESOLUTION_TEMPLATES[issue_type])
-    if issue_type == "billing_high":
-        diff = round(customer['MonthlyCharges'] * random.uniform(0.15, 0.35), 2)
-        resolution = resolution_template.format(
-            reason=random.choice(["late fee", "equipment rental", "one-time upgrade charge"]),
-            credit=diff,
-            normal=round(customer['MonthlyCharges'] - diff, 2),
-            diff=diff
-        )
-    elif issue_type == "service_slow":
-        resolution = resolution_template.format(
-            date=(datetime.now() + timedelta(days=random.randint(1, 7))).strftime("%B %d"),
-            credit=random.choice([10, 15, 20, 25, 30])
-        )
-    elif issue_type == "service_outage":
-        resolution = resolution_template.format(
-            reason=random.choice(["fiber line damage", "power outage in the area", "equipment failure", "scheduled upgrade"]),
-            time=random.choice(["within 4 hours", "by end of day", "within 24 hours", "by tomorrow morning"]),
-            credit=random.choice([15, 20, 25, 30, 50])
-        )
-    elif issue_type == "contract_confusion":
-        resolution = resolution_template.format(
-            contract_type=customer['Contract'],
-            details=f"{customer['Contract']} with auto-renewal, cancel anytime after term with 30 days notice"
-        )
-    elif issue_type == "want_to_cancel":
-        resolution = resolution_template.format(
-            offer=random.choice(["15% discount for 12 months", "free upgrade to Fiber", "one month free"]),
-            discount=random.choice([10, 15, 20, 25]),
-            months=random.choice([6, 12]),
-            tenure=customer['tenure'],
-            plan="Premium Fiber 1 Gbps"
-        )
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        starts = range(spec.start_row, spec.stop_row, chunk_size)
+        bounds = [(lo, min(lo + chunk_size, spec.stop_row), _chunk_seed(spec, k)) for k, lo in enumerate(starts)]
+
+    key = id_key(config.get("generation", {}).get("seed", DEFAULT_SEED))
+    for lo, hi, seed in bounds:
+        # Рядок -> день за кумулятивним планом: дні йдуть по зростанню без сортування
+        rows = np.arange(lo, hi)
+        days = np.searchsorted(cumulative, rows, side="right")
+        df = generate_customers(days, start, total_days, program, np.random.default_rng(seed),
+                                ids=encode_ids(rows + spec.id_offset, key))
+        df.index = pd.RangeIndex(lo, hi)
+        yield df
+
+
+def generate_shard(config: dict, counts: np.ndarray, spec: ShardSpec,
+                   chunk_size: Optional[int] = None) -> pd.DataFrame:
+    """Generate the rows of one shard (index = global row numbers)."""
+    chunks = list(iter_shard_chunks(config, counts, spec, chunk_size))
+    if not chunks:
+        # Порожній шард із chunk_size не дає чанків; без нього — один порожній кадр з колонками
+        chunks = list(iter_shard_chunks(config, counts, spec))
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def _map_shards(fn, specs: List[ShardSpec], workers: int, *args) -> list:
+    """``fn(*args, spec=spec)`` for every shard, in shard order, optionally in a process pool."""
+    if workers <= 1 or len(specs) == 1:
+        return [fn(*args, spec=spec) for spec in specs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(specs))) as pool:
+        futures = [pool.submit(fn, *args, spec=spec) for spec in specs]
+        return [future.result() for future in futures]
+
+
+def generate_tabular_data(config: dict = None, rng: np.random.Generator = None,
+                          workers: int = 1, shards: int = 1, chunk_size: Optional[int] = None) -> pd.DataFrame:
+    """Generate ``generation.samples`` customers ordered by ``RecordDate``.
+
+    The rows are split into ``shards`` parts, each with its own generator
+    spawned from ``generation.seed`` (default 42), and generated by up to
+    ``workers`` processes. For a fixed seed, shard count and ``chunk_size``
+    (see :func:`iter_shard_chunks`) the result is the same whatever the number
+    of workers. Passing ``rng`` generates a single shard from that generator
+    instead.
+    """
+    config = config or {}
+    if rng is not None:
+        n_samples, start, total_days, program = _settings(config)
+        days = np.repeat(np.arange(total_days + 1), day_counts(n_samples, total_days, rng))
+        key = id_key(config.get("generation", {}).get("seed", DEFAULT_SEED))
+        return generate_customers(days, start, total_days, program, rng, ids=encode_ids(np.arange(len(days)), key))
+
+    counts, specs = plan_shards(config, shards)
+    frames = _map_shards(partial(generate_shard, chunk_size=chunk_size), specs, workers, config, counts)
+    return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+
+def churn_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Кількість Churn=Yes/No по роках (суми по шардах складаються).
+
+    Групуємо спершу за датою (сотні унікальних значень), а рік беремо вже з
+    маленького результату: так не створюються мільйони тимчасових рядків.
+    """
+    by_day = df.groupby(["RecordDate", "Churn"]).size().unstack(fill_value=0)
+    years = by_day.index.str[:4].astype(int).rename("Year")
+    return by_day.groupby(years).sum()
+
+
+# Колонки, що зберігаються у Parquet як dictionary (pandas category) з фіксованим набором категорій
+CATEGORIES = {
+    "gender": GENDERS,
+    "Partner": YES_NO,
+    "Dependents": YES_NO,
+    "PhoneService": YES_NO,
+    "MultipleLines": LINES_LABELS,
+    "InternetService": INTERNET_TYPES,
+    **{column: SERVICE_LABELS for column in ("OnlineSecurity", "OnlineBackup", "DeviceProtection",
+                                             "TechSupport", "StreamingTV", "StreamingMovies")},
+    "Contract": CONTRACT_TYPES,
+    "PaperlessBilling": YES_NO,
+    "PaymentMethod": PAYMENT_METHODS,
+    "Churn": YES_NO,
+}
+# Parquet row group не більше цього числа рядків (місяць, більший за ліміт, ділиться на кілька)
+ROW_GROUP_MAX_ROWS = 1_000_000
+
+
+def to_categorical(df: pd.DataFrame, day_labels: np.ndarray) -> pd.DataFrame:
+    """Convert string columns to ``category`` with fixed categories (stable Parquet schema)."""
+    df = df.copy()
+    for column, labels in CATEGORIES.items():
+        df[column] = pd.Categorical(df[column], categories=list(labels))
+    df["RecordDate"] = pd.Categorical(df["RecordDate"], categories=list(day_labels))
+    return df
+
+
+class _CsvPart:
+    def __init__(self, path: str, header: bool):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._header = header
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetPart:
+    """Writes one shard as a Parquet file with one row group per RecordDate month."""
+
+    def __init__(self, path: str, day_labels: np.ndarray, max_rows: int = ROW_GROUP_MAX_ROWS):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self._path = path
+        self._day_labels = day_labels
+        # Номер місяця для кожного дня періоду (дні вже відсортовані)
+        months = np.array([label[:7] for label in day_labels])
+        self._month_of_day = np.r_[0, np.cumsum(months[1:] != months[:-1])]
+        self._max_rows = max_rows
+        self._writer = None
+        self._pending, self._pending_rows, self._pending_month = [], 0, None
+
+    def write(self, df: pd.DataFrame) -> None:
+        df = to_categorical(df, self._day_labels)
+        month = self._month_of_day[df["RecordDate"].cat.codes.to_numpy()]
+        cuts = np.r_[0, np.flatnonzero(np.diff(month)) + 1, len(df)]
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        for lo, hi in zip(cuts[:-1], cuts[1:]):
+            if month[lo] != self._pending_month or self._pending_rows >= self._max_rows:
+                self._flush()
+                self._pending_month = month[lo]
+            self._pending.append(table.slice(lo, hi - lo))
+            self._pending_rows += hi - lo
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        table = self._pa.concat_tables(self._pending)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema, compression="snappy")
+        self._writer.write_table(table, row_group_size=len(table))
+        self._pending, self._pending_rows = [], 0
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _day_labels(config: dict, n_days: Optional[int] = None) -> np.ndarray:
+    _, start, total_days, _ = _settings(config)
+    n_days = total_days + 1 if n_days is None else n_days
+    return np.datetime_as_string(np.datetime64(start.date()) + np.arange(n_days), unit="D")
+
+
+# Частини запису шарду, які write_customers(timings=...) рахує окремо
+SHARD_PHASES = ("tabular_generation", "churn_stats", "conversation_sample", "write")
+
+
+def _write_shard(config: dict, counts: np.ndarray, path: str, fmt: str, sample_rows: np.ndarray,
+                 chunk_size: Optional[int], spec: ShardSpec):
+    if fmt == "parquet":
+        part = _ParquetPart(os.path.join(path, f"part-{spec.index:05d}.parquet"), _day_labels(config, len(counts)))
     else:
-        resolution = resolution_template
+        # Заголовок пише перший непорожній шард: при shards > samples шард 0 буває порожнім
+        part = _CsvPart(_part_path(path, spec.index), header=spec.start_row == 0 < spec.stop_row)
+
+    rows, stats, samples = 0, [], []
+    # Генерація і запис чергуються по чанках — час кожної частини рахуємо окремо
+    timings = dict.fromkeys(SHARD_PHASES, 0.0)
+    chunks = iter_shard_chunks(config, counts, spec, chunk_size)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            df = next(chunks, None)
+            t1 = time.perf_counter()
+            timings["tabular_generation"] += t1 - t0
+            if df is None:
+                break
+            part.write(df)
+            t2 = time.perf_counter()
+            timings["write"] += t2 - t1
+            rows += len(df)
+            stats.append(churn_counts(df))
+            t3 = time.perf_counter()
+            timings["churn_stats"] += t3 - t2
+            in_chunk = sample_rows[(sample_rows >= df.index[0]) & (sample_rows <= df.index[-1])] if len(df) else []
+            samples.append(df.loc[np.unique(in_chunk), CONVERSATION_COLUMNS])
+            timings["conversation_sample"] += time.perf_counter() - t3
+    finally:
+        t0 = time.perf_counter()
+        part.close()
+        timings["write"] += time.perf_counter() - t0
+    if not rows:
+        return 0, None, None, timings
+    return rows, pd.concat(stats).groupby(level=0).sum(), pd.concat(samples), timings
+
 
+def _part_path(path: str, index: int) -> str:
+    return f"{path}.part-{index:05d}"
+
+
+def write_customers(config: dict, path, fmt: str = "csv", workers: int = 1, shards: int = 1,
+                    sample_size: int = 0, chunk_size: Optional[int] = None, plan=None,
+                    timings: Optional[dict] = None):
+    """Generate the customer table straight into ``path``, shard by shard.
+
+    ``fmt="csv"``: every worker writes its shard to a part file that is then
+    appended to ``path`` in shard order, so the file is identical to
+    ``generate_tabular_data(config, shards=shards, chunk_size=chunk_size).to_csv(path, index=False)``.
+
+    ``fmt="parquet"``: ``path`` is a directory with one ``part-NNNNN.parquet``
+    per shard. String columns are dictionary-encoded (read back as pandas
+    ``category``) and every row group holds a single ``RecordDate`` month.
+
+    The parent never holds the table, and with ``chunk_size`` every worker
+    only holds one chunk, so memory stays flat however many rows are
+    requested. Returns ``(rows, churn counts per year, sample)`` where
+    ``sample`` holds ``sample_size`` rows drawn with replacement (for support
+    conversations), accumulated chunk by chunk.
+
+    If ``timings`` is a dict, the seconds spent in each of ``SHARD_PHASES`` are
+    added to it. They are summed over shards, so with several workers they add
+    up to more than the wall-clock time.
+    """
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"unsupported format: {fmt!r}")
+    path = str(path)
+    if fmt == "parquet":
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+    counts, specs = plan or plan_shards(config, shards)
+    n_samples = specs[-1].stop_row
+    sample_rng = np.random.default_rng(_seed_streams(config, 2)[1])
+    sample_rows = sample_rng.integers(0, n_samples, size=sample_size) if n_samples else np.empty(0, np.int64)
+
+    results = _map_shards(_write_shard, specs, workers, config, counts, path, fmt, sample_rows, chunk_size)
+
+    start = time.perf_counter()
+    if fmt == "csv":
+        with open(path, "wb") as out:
+            for spec in specs:
+                part = _part_path(path, spec.index)
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out, 16 * 2**20)
+                os.remove(part)
+    if timings is not None:
+        for r in results:
+            for name, seconds in r[3].items():
+                timings[name] = timings.get(name, 0.0) + seconds
+        timings["write"] = timings.get("write", 0.0) + time.perf_counter() - start
+
+    results = [r for r in results if r[0]]
+    if not results:
+        return 0, pd.DataFrame(), pd.DataFrame()
+    rows = sum(r[0] for r in results)
+    stats = pd.concat([r[1] for r in results]).groupby(level=0).sum()
+    sampled = pd.concat([r[2] for r in results])
+    sample = sampled.loc[sample_rows] if len(sample_rows) else sampled.iloc[:0]
+    return rows, stats, sample
+
+
+def run_scenario(config: dict, path=None, fmt: str = "csv", chunk_size: Optional[int] = None) -> dict:
+    """Generate one scenario in a single shard and return its summary.
+
+    Used by the scenario sweep (``python -m src.scenario_sweep``): the config
+    is compiled once, the rows are generated chunk by chunk and, if ``path``
+    is given, written as with :func:`write_customers`. The summary holds the
+    row count, churn rate, mean ``MonthlyCharges``, fiber share and the churn
+    rate per year.
+    """
+    counts, (spec,) = plan_shards(config, 1)
+    part = None
+    if path is not None:
+        path = str(path)
+        if fmt == "parquet":
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            part = _ParquetPart(os.path.join(path, "part-00000.parquet"), _day_labels(config, len(counts)))
+        else:
+            part = _CsvPart(path, header=True)
+
+    rows, churned, charges, fiber, stats = 0, 0, 0.0, 0, []
+    try:
+        for df in iter_shard_chunks(config, counts, spec, chunk_size):
+            if part is not None:
+                part.write(df)
+            rows += len(df)
+            churned += int((df["Churn"] == "Yes").sum())
+            charges += float(df["MonthlyCharges"].sum())
+            fiber += int((df["InternetService"] == "Fiber optic").sum())
+            stats.append(churn_counts(df))
+    finally:
+        if part is not None:
+            part.close()
+
+    summary = {
+        "rows": rows,
+        "churn_rate": churned / rows if rows else float("nan"),
+        "mean_monthly_charges": charges / rows if rows else float("nan"),
+        "fiber_share": fiber / rows if rows else float("nan"),
+    }
+    if rows:
+        by_year = pd.concat(stats).groupby(level=0).sum()
+        for year, rate in (by_year.get("Yes", 0) / by_year.sum(axis=1)).items():
+            summary[f"churn_rate_{year}"] = float(rate)
+    return summary
+
+
+# ── Інкрементальна генерація (нові вікна дат як окремі партиції) ──────────────
+
+MANIFEST_FILE = "_manifest.json"  # "_" — pyarrow.dataset не вважає його файлом даних
+# Перший елемент spawn_key потоків вікон: не перетинається з потоками [0, shards + 2) з _seed_streams
+_WINDOW_STREAM = 2**31
+
+
+def _format_date(value) -> str:
+    return value.strftime("%Y-%m-%d")
+
+
+def read_manifest(path) -> Optional[dict]:
+    manifest_path = Path(path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(path, manifest: dict) -> None:
+    manifest_path = Path(path) / MANIFEST_FILE
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def new_manifest(config: dict, rows: int, last_date: Optional[datetime] = None) -> dict:
+    """Manifest of a full dataset written with ``config`` (the root part files, ``rows`` rows).
+
+    The anchors — seed, period (drift progress) and daily volume — are kept
+    for all later windows, whatever the config says by then.
+    """
+    n_samples, start, total_days, _ = _settings(config)
+    end = start + timedelta(days=total_days)
     return {
-        "customerID": customer["customerID"],
-        "issue_type": issue_type,
-        "complaint": complaint,
-        "resolution": resolution,
-        "RecordDate": customer["RecordDate"]
+        "seed": config.get("generation", {}).get("seed", DEFAULT_SEED),
+        "start_date": _format_date(start),
+        "end_date": _format_date(end),
+        "rows_per_day": n_samples / (total_days + 1),
+        "partitions": [_partition_entry(".", start, last_date or end, rows)],
     }
 
 
+def _partition_entry(path: str, first: datetime, last: datetime, rows: int) -> dict:
+    return {
+        "path": path,
+        "first_date": _format_date(first),
+        "last_date": _format_date(last),
+        "rows": int(rows),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+
+def _scan_parquet_dataset(path) -> tuple:
+    """``(rows, max RecordDate)`` of a dataset without a manifest, from Parquet footers only."""
+    import pyarrow.parquet as pq
+
+    rows, last = 0, None
+    for file_path in sorted(Path(path).rglob("*.parquet")):
+        metadata = pq.ParquetFile(file_path).metadata
+        rows += metadata.num_rows
+        column = metadata.schema.names.index("RecordDate")
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(column).statistics
+            if stats is not None and stats.has_min_max:
+                value = stats.max.decode() if isinstance(stats.max, bytes) else stats.max
+                last = value if last is None else max(last, value)
+    return rows, last
+
+
+def plan_window(config: dict, first_day: int, last_day: int, rows_per_day: float, shards: int = 1,
+                id_offset: int = 0):
+    """Like :func:`plan_shards` for days ``[first_day, last_day]`` after ``generation.start_date``.
+
+    ``counts`` is zero before ``first_day``, so rows get their absolute day
+    offsets and the drift ``progress = day / total_days`` continues past the
+    original period. Seeds are derived from (seed, first_day): rerunning the
+    same window gives the same rows. Customer IDs continue from ``id_offset``
+    (the rows already in the dataset), so they stay unique across windows.
+    """
+    if shards < 1:
+        raise ValueError("shards must be >= 1")
+    n_days = last_day - first_day + 1
+    seed = config.get("generation", {}).get("seed", DEFAULT_SEED)
+    streams = np.random.SeedSequence(seed, spawn_key=(_WINDOW_STREAM, first_day)).spawn(shards + 1)
+    n_rows = int(round(rows_per_day * n_days))
+    counts = np.zeros(last_day + 1, dtype=np.int64)
+    counts[first_day:] = day_counts(n_rows, n_days - 1, np.random.default_rng(streams[0]))
+    bounds = np.linspace(0, n_rows, shards + 1).astype(np.int64)
+    specs = [ShardSpec(i, int(bounds[i]), int(bounds[i + 1]), streams[i + 1], id_offset)
+             for i in range(shards)]
+    return counts, specs
+
+
+def append_window(config: dict, path, until: datetime, workers: int = 1, shards: int = 1,
+                  chunk_size: Optional[int] = None, timings: Optional[dict] = None):
+    """Append the days after the dataset's last ``RecordDate`` up to ``until`` as a new partition.
+
+    ``path`` is a Parquet dataset directory. Its ``_manifest.json`` lists the
+    partitions and anchors the seed, the original period and the daily
+    volume, so the new rows continue the drift where the history stopped and
+    a daily run costs O(new rows). A missing dataset is first generated in
+    full (root part files, as without ``--incremental``); a dataset without a
+    manifest gets one from its Parquet footers.
+    The partition ``window-YYYYMMDD-YYYYMMDD/`` is written to a temporary
+    directory and renamed, then the manifest is replaced atomically.
+
+    Returns ``(rows, churn counts per year, partition entry)``; rows is 0 and
+    the entry is None when there is nothing new to generate. ``timings`` is
+    passed on to :func:`write_customers`.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    if manifest is None and not path.exists():
+        rows, _, _ = write_customers(config, path, fmt="parquet", workers=workers, shards=shards,
+                                     chunk_size=chunk_size, timings=timings)
+        manifest = new_manifest(config, rows)
+        _write_manifest(path, manifest)
+    elif manifest is None:
+        rows, last = _scan_parquet_dataset(path)
+        if last is None:
+            raise ValueError(f"{path}: no RecordDate statistics, cannot find where the dataset ends")
+        manifest = new_manifest(config, rows, last_date=datetime.strptime(last, "%Y-%m-%d"))
+
+    # Сід, період і обсяг — з маніфесту; drift-параметри — з поточного конфігу
+    window_config = {
+        **config,
+        "generation": {**config.get("generation", {}), "seed": manifest["seed"],
+                       "start_date": manifest["start_date"], "end_date": manifest["end_date"]},
+    }
+    start = datetime.strptime(manifest["start_date"], "%Y-%m-%d")
+    last = max(datetime.strptime(p["last_date"], "%Y-%m-%d") for p in manifest["partitions"])
+    first_day = (last - start).days + 1
+    last_day = (until - start).days
+    if last_day < first_day:
+        _write_manifest(path, manifest)
+        return 0, pd.DataFrame(), None
+
+    first = start + timedelta(days=first_day)
+    name = f"window-{first:%Y%m%d}-{until:%Y%m%d}"
+    staging = path / f".{name}.tmp"
+    existing_rows = sum(p["rows"] for p in manifest["partitions"])
+    plan = plan_window(window_config, first_day, last_day, manifest["rows_per_day"], shards, existing_rows)
+    rows, stats, _ = write_customers(window_config, staging, fmt="parquet", workers=workers,
+                                     chunk_size=chunk_size, plan=plan, timings=timings)
+    shutil.rmtree(path / name, ignore_errors=True)
+    os.replace(staging, path / name)
+
+    manifest["partitions"].append(_partition_entry(name, first, until, rows))
+    _write_manifest(path, manifest)
+    return rows, stats, manifest["partitions"][-1]
+
+
+def _is_parquet(path: str) -> bool:
+    return os.path.isdir(path) or path.endswith(".parquet")
+
+
+def _parquet_files(path: str) -> list:
+    if os.path.isfile(path):
+        return [path]
+    return [
+        f for f in sorted(Path(path).rglob("*.parquet"))
+        # Як pyarrow.dataset: пропускаємо тимчасові (".") та службові ("_") шляхи
+        if not any(part.startswith((".", "_")) for part in f.relative_to(path).parts)
+    ]
+
+
+def _issued_rows(path) -> int:
+    """Upper bound of the ID counters issued to ``path``: the rows in its manifest or in the data.
+
+    A Parquet dataset without a manifest is counted from its footers, and a CSV by its line count.
+    """
+    path = str(path)
+    manifest = read_manifest(path) if os.path.isdir(path) else None
+    if manifest is not None:
+        return sum(p["rows"] for p in manifest["partitions"])
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        return sum(pq.ParquetFile(f).metadata.num_rows for f in _parquet_files(path))
+    # Рядки даних + заголовок: не менше, ніж записів у файлі
+    with open(path, "rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(2**20), b"")) + 1
+
+
+def _iter_id_batches(path, chunk_size: int) -> Iterator[np.ndarray]:
+    path = str(path)
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        # По одній row group: на 100M рядків iter_batches/dataset тримають у пам'яті гігабайти
+        for file_path in _parquet_files(path):
+            parquet = pq.ParquetFile(file_path)
+            for i in range(parquet.num_row_groups):
+                ids = parquet.read_row_group(i, columns=["customerID"]).column(0).to_numpy()
+                for lo in range(0, len(ids), chunk_size):
+                    yield ids[lo:lo + chunk_size]
+    else:
+        for chunk in pd.read_csv(path, usecols=["customerID"], chunksize=chunk_size):
+            yield chunk["customerID"].to_numpy()
+
+
+def verify_unique_ids(path, seed: int = DEFAULT_SEED, chunk_size: int = 1_000_000,
+                      max_counter: Optional[int] = None) -> dict:
+    """Check that every ``customerID`` in a CSV file or Parquet dataset is unique.
+
+    IDs are streamed ``chunk_size`` at a time and decoded back to their
+    counters (:func:`decode_ids`), which are marked in a bitmap: 100M rows
+    need 12.5 MB, not a set of 100M strings. Counters at or above
+    ``max_counter`` (default: the rows issued to ``path``, see
+    :func:`_issued_rows`) mean the IDs were not issued under ``seed`` and are
+    reported as ``foreign``; the bound also caps the bitmap at
+    ``max_counter / 8`` bytes. Returns row, duplicate and foreign counts.
+    """
+    key = id_key(seed)
+    if max_counter is None:
+        max_counter = _issued_rows(path)
+    seen = np.zeros(0, dtype=np.uint8)
+    rows = duplicates = foreign = 0
+    for ids in _iter_id_batches(path, chunk_size):
+        rows += len(ids)
+        counters = decode_ids(ids, key)
+        outside = counters >= max_counter
+        foreign += int(outside.sum())
+        counters = np.sort(counters[~outside])
+        if not counters.size:
+            continue
+        repeated = np.r_[False, counters[1:] == counters[:-1]]
+        duplicates += int(repeated.sum())
+        counters = counters[~repeated]
+
+        byte, bit = counters >> 3, (counters & 7).astype(np.uint8)
+        if byte[-1] >= len(seen):
+            size = min(max(int(byte[-1]) + 1, 2 * len(seen)), (max_counter + 7) >> 3)
+            seen = np.concatenate([seen, np.zeros(size - len(seen), np.uint8)])
+        mask = np.left_shift(np.uint8(1), bit)
+        duplicates += int(np.count_nonzero(seen[byte] & mask))
+        # Кілька лічильників можуть ділити один байт: OR накопичується через ufunc.at
+        np.bitwise_or.at(seen, byte, mask)
+    return {"rows": rows, "duplicates": duplicates, "foreign": foreign}
+
+
+# Колонки клієнта, з яких беруться значення для шаблонів розмов
+CONVERSATION_COLUMNS = ["customerID", "MonthlyCharges", "InternetService", "Contract", "tenure", "RecordDate"]
+CONVERSATION_CHUNK_SIZE = 100_000
+
+ISSUE_TYPES = list(COMPLAINT_TEMPLATES)
+_FORMATTER = string.Formatter()
+
+
+def _compile_template(template: str) -> List[tuple]:
+    """``[(literal, field_name or None), ...]`` — шаблон, розібраний один раз."""
+    return [(literal, field) for literal, field, _, _ in _FORMATTER.parse(template)]
+
+
+_COMPLAINTS = {issue: [_compile_template(t) for t in templates] for issue, templates in COMPLAINT_TEMPLATES.items()}
+_RESOLUTIONS = {issue: [_compile_template(t) for t in templates] for issue, templates in RESOLUTION_TEMPLATES.items()}
+
+
+def _as_text(values) -> np.ndarray:
+    """Значення слотів як рядки (так само, як їх відформатував би ``str.format``)."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        return values
+    return values.astype(str).astype(object)
+
+
+def _pick(rng: np.random.Generator, options: list, n: int) -> np.ndarray:
+    return np.array(options, dtype=object)[rng.integers(0, len(options), size=n)]
+
+
+def _date_labels(reference: datetime, offsets: np.ndarray, fmt: str) -> np.ndarray:
+    # Лише кілька сотень різних зсувів: форматуємо кожну дату один раз
+    unique, inverse = np.unique(offsets, return_inverse=True)
+    labels = np.array([(reference + timedelta(days=int(d))).strftime(fmt) for d in unique], dtype=object)
+    return labels[inverse]
+
+
+def _issue_slots(issue: str, customers: pd.DataFrame, rng: np.random.Generator, reference: datetime):
+    """Column-wise slot values for ``(complaint, resolution)`` of one issue type."""
+    n = len(customers)
+    charges = customers["MonthlyCharges"].to_numpy(dtype=float)
+    internet = customers["InternetService"].astype(str).to_numpy(dtype=object)
+    contract = customers["Contract"].astype(str).to_numpy(dtype=object)
+    tenure = _as_text(customers["tenure"].to_numpy())
+
+    if issue == "billing_high":
+        diff = np.round(charges * rng.uniform(0.15, 0.35, size=n), 2)
+        complaint = {"amount": _as_text(charges), "normal": _as_text(np.round(charges * rng.uniform(0.7, 0.85, size=n), 2))}
+        resolution = {
+            "reason": _pick(rng, ["late fee", "equipment rental", "one-time upgrade charge"], n),
+            "credit": _as_text(diff),
+            "normal": _as_text(np.round(charges - diff, 2)),
+            "diff": _as_text(diff),
+        }
+    elif issue == "service_slow":
+        complaint = {
+            "days": _as_text(rng.integers(2, 15, size=n)),
+            "speed": np.where(internet == "Fiber optic", "fiber optic speeds", "DSL speeds").astype(object),
+            "service": np.array([value.lower() for value in internet], dtype=object),
+        }
+        resolution = {
+            "date": _date_labels(reference, rng.integers(1, 8, size=n), "%B %d"),
+            "credit": _as_text(_pick(rng, [10, 15, 20, 25, 30], n).astype(np.int64)),
+        }
+    elif issue == "service_outage":
+        complaint = {
+            "service": internet,
+            "time": _pick(rng, ["this morning", "yesterday morning", "last night", "2 days ago"], n),
+            "hours": _as_text(rng.integers(4, 73, size=n)),
+            "days": _as_text(rng.integers(1, 8, size=n)),
+        }
+        resolution = {
+            "reason": _pick(rng, ["fiber line damage", "power outage in the area", "equipment failure",
+                                  "scheduled upgrade"], n),
+            "time": _pick(rng, ["within 4 hours", "by end of day", "within 24 hours", "by tomorrow morning"], n),
+            "credit": _as_text(_pick(rng, [15, 20, 25, 30, 50], n).astype(np.int64)),
+        }
+    elif issue == "contract_confusion":
+        complaint = {
+            "contract": np.array([value.lower() for value in contract], dtype=object),
+            "actual_contract": _pick(rng, ["Month-to-month", "One year", "Two year"], n),
+            "date": _date_labels(reference, rng.integers(30, 731, size=n), "%B %d, %Y"),
+            "feature": _pick(rng, ["free installation", "premium tech support", "streaming bundle"], n),
+        }
+        resolution = {
+            "contract_type": contract,
+            "details": contract + " with auto-renewal, cancel anytime after term with 30 days notice",
+        }
+    else:  # want_to_cancel
+        complaint = {
+            "tenure": tenure,
+            "feature": _pick(rng, ["faster internet", "better support", "lower monthly price"], n),
+        }
+        resolution = {
+            "offer": _pick(rng, ["15% discount for 12 months", "free upgrade to Fiber", "one month free"], n),
+            "discount": _as_text(_pick(rng, [10, 15, 20, 25], n).astype(np.int64)),
+            "months": _as_text(_pick(rng, [6, 12], n).astype(np.int64)),
+            "tenure": tenure,
+            "plan": np.full(n, "Premium Fiber 1 Gbps", dtype=object),
+        }
+    return complaint, resolution
+
+
+def _render(templates: List[List[tuple]], choice: np.ndarray, slots: dict) -> np.ndarray:
+    """Render ``templates[choice[i]]`` for every row, one template at a time."""
+    out = np.empty(len(choice), dtype=object)
+    for t, pieces in enumerate(templates):
+        rows = np.flatnonzero(choice == t)
+        if not rows.size:
+            continue
+        text = np.full(rows.size, "", dtype=object)
+        for literal, field in pieces:
+            if literal:
+                text = text + literal
+            if field is not None:
+                text = text + slots[field][rows]
+        out[rows] = text
+    return out
+
+
+def _default_reference_date(customers: pd.DataFrame) -> datetime:
+    # Наступний день після останнього запису: не залежить від моменту запуску
+    return datetime.strptime(str(customers["RecordDate"].max()), "%Y-%m-%d") + timedelta(days=1)
+
+
+def iter_conversations(customers: pd.DataFrame, rng: np.random.Generator, reference_date: datetime,
+                       chunk_size: int = CONVERSATION_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield one support conversation per row of ``customers``, ``chunk_size`` rows at a time."""
+    for lo in range(0, len(customers), chunk_size):
+        chunk = customers.iloc[lo:lo + chunk_size]
+        n = len(chunk)
+        issue = rng.integers(0, len(ISSUE_TYPES), size=n)
+        complaint = np.empty(n, dtype=object)
+        resolution = np.empty(n, dtype=object)
+        for i, name in enumerate(ISSUE_TYPES):
+            rows = np.flatnonzero(issue == i)
+            if not rows.size:
+                continue
+            complaint_slots, resolution_slots = _issue_slots(name, chunk.iloc[rows], rng, reference_date)
+            complaint_choice = rng.integers(0, len(_COMPLAINTS[name]), size=rows.size)
+            resolution_choice = rng.integers(0, len(_RESOLUTIONS[name]), size=rows.size)
+            complaint[rows] = _render(_COMPLAINTS[name], complaint_choice, complaint_slots)
+            resolution[rows] = _render(_RESOLUTIONS[name], resolution_choice, resolution_slots)
+
+        yield pd.DataFrame({
+            "customerID": chunk["customerID"].to_numpy(),
+            "issue_type": np.array(ISSUE_TYPES, dtype=object)[issue],
+            "complaint": complaint,
+            "resolution": resolution,
+            "RecordDate": chunk["RecordDate"].astype(str).to_numpy(dtype=object),
+        })
+
+
+def generate_conversations(df: pd.DataFrame, n: Optional[int] = None, rng: np.random.Generator = None,
+                           reference_date: Optional[datetime] = None) -> pd.DataFrame:
+    """Generate support conversations for customers of ``df``.
+
+    With ``n`` the customers are drawn from ``df`` with replacement, otherwise
+    every row gets one conversation. Issue types, templates and slot values
+    are drawn as arrays from ``rng`` (seed 42 by default), and dates in the
+    texts are relative to ``reference_date`` (default: the day after the
+    latest ``RecordDate``), so the output is reproducible.
+    """
+    rng = rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+    reference_date = reference_date or _default_reference_date(df)
+    if n is not None:
+        df = df.iloc[rng.integers(0, len(df), size=n)]
+    chunks = list(iter_conversations(df, rng, reference_date))
+    if not chunks:
+        return pd.DataFrame(columns=["customerID", "issue_type", "complaint", "resolution", "RecordDate"])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_conversations(customers: pd.DataFrame, path: Path, fmt: str = "csv", rng: np.random.Generator = None,
+                        reference_date: Optional[datetime] = None,
+                        chunk_size: int = CONVERSATION_CHUNK_SIZE) -> int:
+    """Render and write conversations chunk by chunk; returns the number of rows."""
+    rng = rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+    reference_date = reference_date or _default_reference_date(customers)
+    rows = 0
+    writer = None
+    with open(path, "w", newline="", encoding="utf-8") if fmt == "csv" else nullcontext() as f:
+        for chunk in iter_conversations(customers, rng, reference_date, chunk_size):
+            if fmt == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                chunk["issue_type"] = pd.Categorical(chunk["issue_type"], categories=ISSUE_TYPES)
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(f, header=rows == 0, index=False)
+            rows += len(chunk)
+    if writer is not None:
+        writer.close()
+    return rows
+
+
+def generate_conversation(customer: dict, rng: np.random.Generator = None,
+                          reference_date: Optional[datetime] = None) -> dict:
+    """Single-customer variant of :func:`generate_conversations`."""
+    df = pd.DataFrame([{column: customer[column] for column in CONVERSATION_COLUMNS}])
+    return generate_conversations(df, rng=rng, reference_date=reference_date).iloc[0].to_dict()
+
+
+def conversation_rng(config: dict) -> np.random.Generator:
+    """Генератор для розмов: дочірній потік від потоку вибірки клієнтів (див. _seed_streams)."""
+    sample_seed = _seed_streams(config, 2)[1]
+    return np.random.default_rng(
+        np.random.SeedSequence(sample_seed.entropy, spawn_key=sample_seed.spawn_key + (0,))
+    )
+
+
 def generate_knowledge_base(output_dir: str | Path):
     kb_data = [
         {"id": 1, "title": "How to reset your modem", "content": "1. Unplug the power cord from the modem. 2. Wait 30 seconds. 3. Plug it back in. 4. Wait for all lights to stabilize."},
@@ -348,54 +1346,144 @@ def generate_knowledge_base(output_dir: str | Path):
 # Головний запуск
 # ──────────────────────────────────────────────────────────────────────────────
 
-if __name__ == "__main__":
+def _report_id_check(path, seed: int) -> None:
+    start = time.perf_counter()
+    result = verify_unique_ids(path, seed)
+    print(f"Перевірка customerID: {result['rows']:,} рядків, {result['duplicates']:,} дублікатів, "
+          f"{result['foreign']:,} сторонніх ({time.perf_counter() - start:.1f}s)")
+    if result["duplicates"]:
+        raise SystemExit(f"{path}: customerID is not unique")
+
+
+def main():
     parser = argparse.ArgumentParser(description="Генерація розширеного Telco датасету: churn + support conversations + knowledge base")
     parser.add_argument("--config", type=str, default="config/config.yaml",
                         help="Шлях до config.yaml (опціонально)")
     parser.add_argument("--samples", type=int, help="Кількість клієнтів (перевизначення)")
     parser.add_argument("--conv-samples", type=int, help="Кількість розмов support (перевизначення)")
+    parser.add_argument("--seed", type=int, help="Seed генератора (перевизначення generation.seed)")
+    parser.add_argument("--workers", type=int, default=1, help="Кількість процесів генерації")
+    parser.add_argument("--shards", type=int,
+                        help="Кількість шардів (за замовчуванням generation.shards або --workers); "
+                             "однаковий seed + shards → однаковий датасет за будь-якого --workers")
+    parser.add_argument("--chunk-size", type=int,
+                        help="Потоковий режим: генерувати й записувати по N рядків (пам'ять не росте з --samples)")
+    parser.add_argument("--format", choices=["csv", "parquet"],
+                        help="Формат клієнтів і розмов (за замовчуванням generation.format або csv); "
+                             "parquet — директорія part-файлів з dictionary-кодуванням")
+    parser.add_argument("--output", type=str,
+                        help="Шлях до таблиці клієнтів (за замовчуванням <output-dir>/telco_customers.<format>)")
     parser.add_argument("--output-dir", type=str, default="data",
                         help="Директорія для збереження файлів")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Дописати до parquet-датасету лише дні після його останнього RecordDate "
+                             "(нова партиція + _manifest.json); розмови та knowledge base не генеруються")
+    parser.add_argument("--verify-ids", action="store_true",
+                        help="Після запису перечитати customerID і перевірити, що всі унікальні")
+    parser.add_argument("--until", type=str,
+                        help="Останній день нового вікна, YYYY-MM-DD (за замовчуванням сьогодні)")
+    add_profiling_args(parser, "generate")
     args = parser.parse_args()
 
-    config = load_config(args.config)
+    timer = PhaseTimer(trace_memory=args.trace_memory)
+    with profiled(args.profile, top=args.profile_top):
+        _generate(parser, args, timer)
+    timer.print_summary()
+    timer.write_json(args.report, command="generate")
+    print(f"Час по фазах → {args.report}")
+
+
+def _add_shard_timings(timer: PhaseTimer, timings: dict, prefix: str = "customers"):
+    for name, seconds in timings.items():
+        timer.add(f"{prefix}/{name}", seconds)
+
+
+def _generate(parser, args, timer: PhaseTimer):
+    with timer.phase("config"):
+        config = load_config(args.config)
 
     # Пріоритет: CLI > config.yaml > дефолт
     n_samples    = args.samples    or config.get("generation", {}).get("samples", 50000)
     conv_samples = args.conv_samples or config.get("generation", {}).get("conv_samples", 7500)
     output_dir   = args.output_dir or config.get("generation", {}).get("output_dir", "data")
+    shards       = args.shards or config.get("generation", {}).get("shards") or max(1, args.workers)
+    chunk_size   = args.chunk_size or config.get("generation", {}).get("chunk_size")
+    fmt          = args.format or config.get("generation", {}).get("format")
+    if fmt is None:
+        fmt = "parquet" if args.output and args.output.endswith(".parquet") else "csv"
+
+    gen_config = config.setdefault("generation", {})
+    gen_config["samples"] = n_samples
+    if args.seed is not None:
+        gen_config["seed"] = args.seed
 
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True, parents=True)
 
-    print(f"Генерація: {n_samples:,} клієнтів + {conv_samples:,} розмов → {output_path}")
+    # 1. Табличні дані (кожен шард пишеться своїм процесом)
+    customers_path = Path(args.output) if args.output else output_path / f"telco_customers.{fmt}"
+    customers_path.parent.mkdir(exist_ok=True, parents=True)
+
+    if args.incremental:
+        if fmt != "parquet":
+            parser.error("--incremental works with --format parquet only")
+        until = datetime.strptime(args.until, "%Y-%m-%d") if args.until else datetime.combine(
+            datetime.now().date(), datetime.min.time())
+        timings = {}
+        with timer.phase("customers"):
+            n_rows, churn_by_year, partition = append_window(
+                config, customers_path, until, workers=args.workers, shards=shards, chunk_size=chunk_size,
+                timings=timings,
+            )
+        _add_shard_timings(timer, timings)
+        if partition is None:
+            print(f"{customers_path} вже містить дані до {until:%Y-%m-%d} — нічого генерувати")
+            return
+        print(f"Додано {n_rows:,} клієнтів ({partition['first_date']} … {partition['last_date']}) "
+              f"→ {customers_path / partition['path']}")
+        print("\nChurn rate по роках (нове вікно):")
+        print(churn_by_year.div(churn_by_year.sum(axis=1), axis=0).round(3))
+        if args.verify_ids:
+            with timer.phase("verify_ids"):
+                _report_id_check(customers_path, read_manifest(customers_path)["seed"])
+        return
 
-    # 1. Табличні дані
-    df_customers = generate_tabular_data(config)
-    customers_path = output_path / "telco_customers.csv"
-    df_customers.to_csv(customers_path, index=False)
-    print(f"Збережено {len(df_customers):,} клієнтів → {customers_path}")
+    print(f"Генерація: {n_samples:,} клієнтів + {conv_samples:,} розмов → {output_path} "
+          f"({shards} шардів, {args.workers} процесів)")
+    timings = {}
+    with timer.phase("customers"):
+        n_rows, churn_by_year, sampled_customers = write_customers(
+            config, customers_path, fmt=fmt, workers=args.workers, shards=shards, sample_size=conv_samples,
+            chunk_size=chunk_size, timings=timings,
+        )
+        if fmt == "parquet":
+            _write_manifest(customers_path, new_manifest(config, n_rows))
+    _add_shard_timings(timer, timings)
+    print(f"Збережено {n_rows:,} клієнтів → {customers_path}")
+    if args.verify_ids:
+        with timer.phase("verify_ids"):
+            _report_id_check(customers_path, gen_config.get("seed", DEFAULT_SEED))
 
     # Статистика churn drift
-    df_customers['Year'] = pd.to_datetime(df_customers['RecordDate']).dt.year
     print("\nChurn rate по роках:")
-    print(df_customers.groupby('Year')['Churn'].value_counts(normalize=True).unstack().round(3))
+    print(churn_by_year.div(churn_by_year.sum(axis=1), axis=0).round(3))
 
-    # 2. Support conversations
+    # 2. Support conversations (рендеринг і запис чанками)
     print("\nГенерація support conversations...")
-    conv_data = []
-    sampled_customers = df_customers.sample(n=conv_samples, replace=True)
-    for _, customer in sampled_customers.iterrows():
-        conv = generate_conversation(customer.to_dict())
-        conv_data.append(conv)
-
-    df_conversations = pd.DataFrame(conv_data)
-    conv_path = output_path / "support_conversations.csv"
-    df_conversations.to_csv(conv_path, index=False)
-    print(f"Згенеровано та збережено {len(df_conversations):,} розмов → {conv_path}")
+    _, start, total_days, _ = _settings(config)
+    conv_path = output_path / f"support_conversations.{fmt}"
+    with timer.phase("conversations"):
+        conv_rows = write_conversations(sampled_customers, conv_path, fmt=fmt, rng=conversation_rng(config),
+                                        reference_date=start + timedelta(days=total_days + 1))
+    print(f"Згенеровано та збережено {conv_rows:,} розмов → {conv_path}")
 
     # 3. Knowledge base
     print("\nГенерація knowledge base...")
-    generate_knowledge_base(output_path)
+    with timer.phase("knowledge_base"):
+        generate_knowledge_base(output_path)
 
-    print("\nГотово! Дані підготовлені для MLOps / LLMOps демо.")
\ No newline at end of file
+    print("\nГотово! Дані підготовлені для MLOps / LLMOps демо.")
+
+
+if __name__ == "__main__":
+    main()
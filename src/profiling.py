@@ -0,0 +1,156 @@
+"""Per-phase timers, tracemalloc snapshots and cProfile for the command-line tools.
+
+``generate_dataset_ext.py`` and ``pipelines/train.py`` wrap every stage in
+``timer.phase(name)``:
+
+    timer = PhaseTimer(trace_memory=args.trace_memory)
+    with profiled(args.profile, top=args.profile_top):
+        with timer.phase("load"):
+            df = load_data(path)
+        ...
+    timer.print_summary()
+    timer.write_json("reports/train_timings.json")
+
+The wall-clock time of each phase always goes into the report. With
+``trace_memory=True``, each phase also records the traced Python memory at its
+end, the peak during the phase and the top allocation sites that grew.
+tracemalloc only sees the current process. Memory used in worker processes and
+by native buffers outside Python's allocator is not included. ``profiled(path)``
+runs cProfile around the block, dumps the stats to ``path`` (open with
+``python -m pstats`` or snakeviz) and prints the top-N functions by cumulative
+time.
+"""
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+TOP_ALLOCATIONS = 10
+
+
+class PhaseTimer:
+    """Collects wall-clock time (and optionally memory) per named phase.
+
+    Entering the same phase again adds to its time. ``add`` records time
+    measured elsewhere, e.g. summed over worker processes; such sub-phases are
+    named ``parent/child`` and overlap their parent's wall-clock time.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases: Dict[str, dict] = {}
+        self._started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        before = None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            entry = self.add(name, elapsed)
+            if before is not None:
+                self._record_memory(entry, before)
+
+    def add(self, name: str, seconds: float, **extra) -> dict:
+        entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+        entry.update(extra)
+        return entry
+
+    def _record_memory(self, entry: dict, before: tracemalloc.Snapshot):
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        top = after.filter_traces(own).compare_to(before.filter_traces(own), "lineno")[:TOP_ALLOCATIONS]
+        entry["memory_current_mb"] = round(current / 2**20, 2)
+        entry["memory_peak_mb"] = max(entry.get("memory_peak_mb", 0.0), round(peak / 2**20, 2))
+        entry["top_allocations"] = [
+            {"where": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1),
+             "count_diff": stat.count_diff}
+            for stat in top if stat.size_diff > 0
+        ]
+
+    def report(self, **meta) -> dict:
+        """JSON-serialisable summary: per-phase numbers, total time and run metadata."""
+        phases = {name: {**entry, "seconds": round(entry["seconds"], 4)} for name, entry in self.phases.items()}
+        return {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "argv": sys.argv,
+            **meta,
+            "total_seconds": round(time.perf_counter() - self._started, 4),
+            "phases": phases,
+        }
+
+    def print_summary(self, file=None):
+        file = file or sys.stdout
+        # Частка — від усього часу роботи; підфази "parent/child" можуть перекриватися з батьківською
+        total = (time.perf_counter() - self._started) or 1.0
+        memory = self.trace_memory
+        header = f"{'phase':<34} {'seconds':>10} {'share':>7}"
+        print("\n" + header + (f" {'peak MiB':>9} {'end MiB':>9}" if memory else ""), file=file)
+        for name, entry in self.phases.items():
+            line = f"{name:<34} {entry['seconds']:>10.3f} {entry['seconds'] / total:>7.1%}"
+            if memory and "memory_peak_mb" in entry:
+                line += f" {entry['memory_peak_mb']:>9.1f} {entry['memory_current_mb']:>9.1f}"
+            print(line, file=file)
+
+    def write_json(self, path: str, **meta) -> dict:
+        report = self.report(**meta)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+@contextmanager
+def profiled(path: Optional[str], top: int = 25, sort: str = "cumulative"):
+    """Run the block under cProfile if ``path`` is set. Dumps pstats there and prints the top ``top``."""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(top)
+        print(out.getvalue())
+        print(f"cProfile stats → {path} (python -m pstats {path})")
+
+
+def add_profiling_args(parser, name: str):
+    """Adds ``--profile``, ``--profile-top``, ``--trace-memory`` and ``--report`` to an argparse parser.
+
+    Default outputs are ``reports/<name>.prof`` and ``reports/<name>_timings.json``.
+    """
+    profile, report = f"reports/{name}.prof", f"reports/{name}_timings.json"
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", nargs="?", const=profile, metavar="PATH",
+                       help=f"Run under cProfile and dump the stats to PATH (default {profile})")
+    group.add_argument("--profile-top", type=int, default=25, help="How many functions to print from cProfile")
+    group.add_argument("--trace-memory", action="store_true",
+                       help="tracemalloc: peak and top allocations per phase (slows the run down)")
+    group.add_argument("--report", default=report, help=f"JSON report with phase timings (default {report})")
+    return group
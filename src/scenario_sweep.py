@@ -0,0 +1,164 @@
+"""Generate many drift/pricing scenarios of the synthetic dataset in one run.
+
+Every scenario is the base config plus a few overrides given as dotted keys
+(``drift.churn_base_decline``, ``pricing.fiber_base``, ...). The YAML is read
+once. Each scenario is compiled into a ``RuleProgram`` and generated by a worker
+process, and the summaries are written to ``<output-dir>/summary.csv``:
+
+    python -m src.scenario_sweep --samples 20000 --workers 4 \\
+        --grid drift.churn_base_decline=0.1,0.2,0.3 --grid pricing.fiber_base=70,82,95
+
+``--grid`` values form a Cartesian product. ``--scenarios`` reads a YAML list
+of ``{name: ..., overrides: {dotted.key: value}}`` instead. All scenarios use
+the same seed, so differences between them come from the rules, not from
+sampling noise. ``--write-data`` also saves every scenario's customer table.
+"""
+
+import argparse
+import copy
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import yaml
+
+from src.generate_dataset_ext import compile_program, load_config, run_scenario
+
+
+def apply_overrides(config: dict, overrides: Dict) -> dict:
+    """Copy of ``config`` with ``{"section.key": value}`` overrides applied."""
+    config = copy.deepcopy(config)
+    for dotted, value in overrides.items():
+        *parents, key = dotted.split(".")
+        node = config
+        for name in parents:
+            if node.get(name) is None:
+                node[name] = {}
+            node = node[name]
+            if not isinstance(node, dict):
+                raise ValueError(f"{dotted}: {name} is not a section")
+        node[key] = value
+    return config
+
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict]:
+    """Cartesian product of ``{"section.key": [values]}`` as a list of scenarios."""
+    keys = list(grid)
+    return [
+        {"name": f"scenario-{i:04d}", "overrides": dict(zip(keys, values))}
+        for i, values in enumerate(itertools.product(*(grid[key] for key in keys)))
+    ]
+
+
+def parse_grid(items: List[str]) -> Dict[str, List]:
+    grid = {}
+    for item in items:
+        key, sep, values = item.partition("=")
+        if not sep or not values:
+            raise ValueError(f"expected KEY=V1,V2,... got {item!r}")
+        grid[key.strip()] = [yaml.safe_load(value) for value in values.split(",")]
+    return grid
+
+
+def load_scenarios(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        scenarios = yaml.safe_load(f) or []
+    return [
+        {"name": scenario.get("name") or f"scenario-{i:04d}", "overrides": scenario.get("overrides") or {}}
+        for i, scenario in enumerate(scenarios)
+    ]
+
+
+def _run(config: dict, path: Optional[str], fmt: str, chunk_size: Optional[int]) -> Dict:
+    start = time.perf_counter()
+    summary = run_scenario(config, path, fmt=fmt, chunk_size=chunk_size)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def sweep(config: dict, scenarios: List[Dict], workers: int = 1, output_dir: Optional[str] = None,
+          fmt: str = "csv", write_data: bool = False, chunk_size: Optional[int] = None) -> pd.DataFrame:
+    """Run every scenario (up to ``workers`` at a time) and return one summary row per scenario."""
+    configs = [apply_overrides(config, scenario["overrides"]) for scenario in scenarios]
+    # Помилки в ключах/значеннях — до запуску процесів, а не посеред sweep
+    for scenario, scenario_config in zip(scenarios, configs):
+        try:
+            compile_program(scenario_config)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{scenario['name']}: {e}") from None
+
+    paths = [None] * len(scenarios)
+    if write_data:
+        if output_dir is None:
+            raise ValueError("write_data needs output_dir")
+        os.makedirs(output_dir, exist_ok=True)
+        suffix = "parquet" if fmt == "parquet" else "csv"
+        paths = [os.path.join(output_dir, f"{scenario['name']}.{suffix}") for scenario in scenarios]
+
+    args = (configs, paths, [fmt] * len(configs), [chunk_size] * len(configs))
+    if workers <= 1 or len(configs) == 1:
+        summaries = list(map(_run, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(configs))) as pool:
+            summaries = list(pool.map(_run, *args))
+
+    rows = [
+        {"scenario": scenario["name"], **scenario["overrides"], **summary}
+        for scenario, summary in zip(scenarios, summaries)
+    ]
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scenario sweep over drift/pricing/churn rules")
+    parser.add_argument("--config", default="config/config.yaml", help="Base config (read once)")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="section.key=V1,V2,... (repeatable; values are combined as a product)")
+    parser.add_argument("--scenarios", help="YAML list of {name, overrides: {section.key: value}}")
+    parser.add_argument("--samples", type=int, help="Customers per scenario (overrides generation.samples)")
+    parser.add_argument("--seed", type=int, help="Seed shared by all scenarios")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scenarios generated in parallel")
+    parser.add_argument("--chunk-size", type=int, help="Generate each scenario N rows at a time")
+    parser.add_argument("--write-data", action="store_true", help="Also save each scenario's customer table")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Format for --write-data")
+    parser.add_argument("--output-dir", default="data/scenarios", help="Where summary.csv (and data) go")
+    args = parser.parse_args()
+
+    if bool(args.grid) == bool(args.scenarios):
+        parser.error("pass either --grid or --scenarios")
+    try:
+        scenarios = load_scenarios(args.scenarios) if args.scenarios else expand_grid(parse_grid(args.grid))
+    except ValueError as e:
+        parser.error(str(e))
+
+    config = load_config(args.config)
+    generation = config.setdefault("generation", {})
+    if args.samples:
+        generation["samples"] = args.samples
+    if args.seed is not None:
+        generation["seed"] = args.seed
+
+    print(f"Sweep: {len(scenarios)} scenarios × {generation.get('samples', 50000):,} customers, "
+          f"{args.workers} workers")
+    start = time.perf_counter()
+    try:
+        summary = sweep(config, scenarios, workers=args.workers, output_dir=args.output_dir, fmt=args.format,
+                        write_data=args.write_data, chunk_size=args.chunk_size)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    summary_path = Path(args.output_dir) / "summary.csv"
+    summary.to_csv(summary_path, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(summary.round(4).to_string(index=False))
+    print(f"\n{len(summary)} scenarios in {elapsed:.1f}s → {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,9 @@ try:
     from src.api.models import CustomerFeatures, PredictionResponse
     print("   ✓ Models OK")
     
-    print("3. Importing predict module...")
+    print("3. Importing predict module and loading the model...")
     from src.api import predict as predict_module
+    predict_module.load_initial_model()
     print(f"   ✓ Predict OK (model: {predict_module.model_source or 'None (will fail at runtime)'})")
     
     print("4. Importing main app...")
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+SAMPLE_CUSTOMER = {
+    "tenure": 12,
+    "MonthlyCharges": 65.5,
+    "TotalCharges": 786.0,
+    "gender": "Male",
+    "SeniorCitizen": 0,
+    "Partner": "Yes",
+    "Dependents": "No",
+    "PhoneService": "Yes",
+    "MultipleLines": "No",
+    "InternetService": "Fiber optic",
+    "OnlineSecurity": "No",
+    "OnlineBackup": "No",
+    "DeviceProtection": "No",
+    "TechSupport": "No",
+    "StreamingTV": "No",
+    "StreamingMovies": "No",
+    "Contract": "Month-to-month",
+    "PaperlessBilling": "Yes",
+    "PaymentMethod": "Electronic check",
+}
+
+
+@pytest.fixture(scope="session")
+def customers_df():
+    """Невеликий синтетичний датасет з генератора."""
+    from src.generate_dataset_ext import generate_tabular_data
+
+    return generate_tabular_data({"generation": {"samples": 2000}})
+
+
+@pytest.fixture(scope="session")
+def trained_pipeline(customers_df):
+    """Pipeline, натренований так само, як у pipelines/train.py (але з меншим лісом)."""
+    from pipelines.train import build_pipeline
+
+    df = customers_df.drop(["customerID", "RecordDate"], axis=1)
+    X = df.drop("Churn", axis=1)
+    y = df["Churn"].map({"Yes": 1, "No": 0})
+    pipeline = build_pipeline(X)
+    pipeline.set_params(classifier__n_estimators=20)
+    return pipeline.fit(X, y)
+
+
+@pytest.fixture
+def loaded_model(monkeypatch, trained_pipeline):
+    """Підставляє натренований pipeline у модуль src.api.predict."""
+    from src.api import predict as predict_module
+
+    monkeypatch.setattr(predict_module, "_bundle", predict_module.current_bundle())
+    monkeypatch.setattr(predict_module, "load_state", predict_module.load_state)
+    predict_module.set_model(trained_pipeline, "test fixture")
+    return trained_pipeline
@@ -0,0 +1,322 @@
+# Тести для FastAPI сервісу
+import json
+
+from fastapi.testclient import TestClient
+
+from conftest import SAMPLE_CUSTOMER
+from src.api.main import app
+
+
+client = TestClient(app)
+
+
+def test_predict_echoes_customer_id(loaded_model):
+    resp = client.post("/predict", json={**SAMPLE_CUSTOMER, "customer_id": "1234-ABCDE"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["customer_id"] == "1234-ABCDE"
+    assert 0.0 <= body["churn_probability"] <= 1.0
+    assert "customer_id" not in body["features_used"]
+
+
+def test_predict_batch_matches_single_predictions(loaded_model):
+    records = [
+        {**SAMPLE_CUSTOMER, "customer_id": f"C{i}", "tenure": i, "TotalCharges": 65.5 * i}
+        for i in range(25)
+    ]
+    resp = client.post("/predict/batch", json=records)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total"] == body["succeeded"] == 25
+    assert [p["customer_id"] for p in body["predictions"]] == [r["customer_id"] for r in records]
+
+    for record, prediction in zip(records, body["predictions"]):
+        single = client.post("/predict", json=record).json()
+        assert single["churn_probability"] == prediction["churn_probability"]
+
+
+def test_predict_batch_reports_each_records_own_features(loaded_model):
+    dated = {**SAMPLE_CUSTOMER, "customer_id": "DATED", "RecordDate": "2024-03-01"}
+    undated = {**SAMPLE_CUSTOMER, "customer_id": "UNDATED", "tenure": 13}
+    for records in ([dated, undated], [undated, dated]):
+        for _ in range(2):  # другий прохід відповідає з кешу передбачень
+            predictions = client.post("/predict/batch", json=records).json()["predictions"]
+            used = {p["customer_id"]: p["features_used"] for p in predictions}
+            assert "RecordDate" in used["DATED"]
+            assert "RecordDate" not in used["UNDATED"]
+
+
+def test_predict_batch_ndjson_reports_per_record_errors(loaded_model):
+    bad = {**SAMPLE_CUSTOMER, "customer_id": "BAD", "tenure": "not-a-number"}
+    lines = [json.dumps({**SAMPLE_CUSTOMER, "customer_id": "OK"}), json.dumps(bad), "[1, 2]"]
+    resp = client.post(
+        "/predict/batch",
+        content="\n".join(lines),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["succeeded"], body["failed"]) == (1, 2)
+    assert [(e["index"], e["customer_id"]) for e in body["errors"]] == [(1, "BAD"), (2, None)]
+
+
+def test_predict_batch_rejects_oversized_batch(loaded_model, monkeypatch):
+    from src.api import main
+
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 2)
+    resp = client.post("/predict/batch", json=[SAMPLE_CUSTOMER] * 3)
+    assert resp.status_code == 413
+    # NDJSON зупиняється на першому зайвому рядку, навіть якщо далі йде сміття
+    ndjson = "\n".join([json.dumps(SAMPLE_CUSTOMER)] * 3 + ["not json"])
+    resp = client.post("/predict/batch", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert resp.status_code == 413
+
+    monkeypatch.setattr(main, "MAX_BATCH_BYTES", 100)
+    resp = client.post("/predict/batch", json=[SAMPLE_CUSTOMER])
+    assert resp.status_code == 413
+
+
+def test_predict_batch_rejects_undecodable_body(loaded_model):
+    for content_type in ("application/json", "application/x-ndjson"):
+        resp = client.post("/predict/batch", content=b"\xff\xfe[", headers={"Content-Type": content_type})
+        assert resp.status_code == 400
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    import asyncio
+
+    from src.api.batching import MicroBatcher
+
+    calls = []
+
+    def fake_predict_batch(records, use_cache=True):
+        calls.append(len(records))
+        return [{"churn_probability": r["tenure"] / 100} for r in records]
+
+    async def scenario():
+        batcher = MicroBatcher(fake_predict_batch, max_batch_size=8, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit({"tenure": i}) for i in range(20)))
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(scenario())
+    assert [r["churn_probability"] for r in results] == [i / 100 for i in range(20)]
+    assert calls == [8, 8, 4]
+
+
+def test_micro_batcher_keeps_each_callers_features_and_cache_choice(loaded_model, monkeypatch):
+    import asyncio
+
+    from src.api import predict as predict_module
+    from src.api.batching import MicroBatcher
+
+    calls = []
+
+    def predict_batch(records, use_cache=True):
+        calls.append((len(records), use_cache))
+        return predict_module.predict_churn_batch(records, use_cache)
+
+    dated = [{**SAMPLE_CUSTOMER, "tenure": i, "RecordDate": "2024-03-01"} for i in range(6)]
+    undated = [{**SAMPLE_CUSTOMER, "tenure": i} for i in range(6)]
+    requests = [(record, i % 3 != 0) for i, record in enumerate(x for pair in zip(dated, undated) for x in pair)]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, max_batch_size=64, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(record, use_cache) for record, use_cache in requests))
+        finally:
+            await batcher.stop()
+
+    hits = predict_module.prediction_cache.hits
+    results = asyncio.run(scenario())
+    assert sorted(calls, key=lambda call: call[1]) == [(4, False), (8, True)]  # один батч, дві групи
+    for (record, _), result in zip(requests, results):
+        assert result["features_used"] == list(record)
+        assert result == predict_module.predict_churn(record, use_cache=False)
+    assert predict_module.prediction_cache.hits == hits  # записи без кешу не читали кеш
+
+
+def test_prediction_cache_hits_bypass_and_model_change(loaded_model, monkeypatch, trained_pipeline):
+    from src.api import predict as predict_module
+    from src.api.cache import PredictionCache
+
+    cache = PredictionCache(maxsize=2, ttl=0)
+    monkeypatch.setattr(predict_module, "prediction_cache", cache)
+
+    first = client.post("/predict", json=SAMPLE_CUSTOMER).json()
+    # Той самий клієнт з іншим порядком ключів та int замість float — той самий ключ
+    reordered = dict(reversed(list({**SAMPLE_CUSTOMER, "TotalCharges": 786}.items())))
+    assert client.post("/predict", json=reordered).json() == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    client.post("/predict?use_cache=false", json=SAMPLE_CUSTOMER)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    for tenure in (1, 2, 3):
+        client.post("/predict/batch", json=[{**SAMPLE_CUSTOMER, "tenure": tenure}])
+    assert cache.evictions == 2 and len(cache) == 2
+
+    predict_module.set_model(trained_pipeline, "reloaded")
+    client.post("/predict", json=SAMPLE_CUSTOMER)
+    assert cache.invalidations == 1 and len(cache) == 1
+
+
+def test_prediction_cache_ttl_expires_entries():
+    from src.api.cache import PredictionCache
+
+    now = [0.0]
+    cache = PredictionCache(maxsize=10, ttl=5, clock=lambda: now[0])
+    cache.put("k", "v1", {"churn_probability": 0.5})
+    assert cache.get("k", "v1") == {"churn_probability": 0.5}
+    now[0] = 6.0
+    assert cache.get("k", "v1") is None
+    assert cache.expirations == 1
+
+
+def test_hot_reload_swaps_model_when_file_changes(monkeypatch, tmp_path, trained_pipeline):
+    import os
+
+    import joblib
+
+    from src.api import main
+    from src.api import predict as predict_module
+
+    model_path = tmp_path / "churn_model.pkl"
+    joblib.dump(trained_pipeline, model_path)
+    os.utime(model_path, (1_700_000_000, 1_700_000_000))
+    monkeypatch.setattr(predict_module, "MODEL_PATH", str(model_path))
+    monkeypatch.setattr(predict_module, "MLFLOW_TRACKING_URI", "")
+    monkeypatch.setattr(predict_module, "_bundle", None)
+    monkeypatch.setattr(predict_module, "load_state", "idle")
+
+    assert client.get("/health").json()["model_status"] == "loading"
+    assert predict_module.load_initial_model()["reloaded"] is True
+    old = predict_module.current_bundle()
+    size = model_path.stat().st_size
+    assert client.get("/health").json()["model_version"] == f"mtime-1700000000000000000-{size}"
+
+    # Без змін файлу watcher нічого не перезавантажує
+    assert predict_module.reload_if_changed()["reloaded"] is False
+
+    # Зміна в межах тієї ж секунди — теж нова версія
+    os.utime(model_path, ns=(1_700_000_000_500_000_000, 1_700_000_000_500_000_000))
+    assert predict_module.reload_if_changed()["reloaded"] is True
+    assert predict_module.current_bundle() is not old
+    # Запит, що вже захопив старий bundle, завершується на ньому
+    assert "error" not in predict_module.predict_churn(dict(SAMPLE_CUSTOMER), bundle=old)
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert client.post("/admin/reload", headers={"X-Admin-Token": ""}).status_code == 404
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload").status_code == 403
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "secre"}).status_code == 403
+    resp = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert resp.status_code == 200 and resp.json()["version"] == f"mtime-1700000000500000000-{size}"
+
+
+def test_metrics_endpoint_reports_routes_stages_and_model(loaded_model):
+    from src.api import predict as predict_module
+    from src.api.metrics import PREDICTIONS
+
+    bundle = predict_module.current_bundle()
+    labels = {"model_version": bundle.version, "model_source": bundle.source}
+    before = sum(PREDICTIONS.value(result=r, **labels) for r in ("churn", "no_churn"))
+
+    assert client.post("/predict", json=SAMPLE_CUSTOMER, params={"use_cache": "false"}).status_code == 200
+    assert client.post("/predict/batch", json=[SAMPLE_CUSTOMER] * 3).status_code == 200
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    assert 'http_requests_total{method="POST",route="/predict",status="200"}' in text
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/predict/batch",le="+Inf"}' in text
+    for stage in ("validate", "preprocess", "infer", "serialize"):
+        assert f'churn_predict_stage_seconds_count{{stage="{stage}"}}' in text
+    assert f'churn_model_info{{model_version="{bundle.version}",model_source="{bundle.source}"}} 1' in text
+
+    after = sum(PREDICTIONS.value(result=r, **labels) for r in ("churn", "no_churn"))
+    assert after - before == 4
+
+
+def test_request_log_writes_rotated_gzip_jsonl_and_counts_drops(tmp_path):
+    import gzip
+
+    from src.api.request_log import RequestLogger
+
+    log = RequestLogger(str(tmp_path), buffer_size=5, batch_size=2, flush_interval=60, max_bytes=1)
+    assert all(log.log({"i": i}) for i in range(5))
+    assert not log.log({"i": 5})  # буфер повний, а writer ще не запущений
+
+    log.start()
+    log.stop()
+    files = sorted(tmp_path.glob("requests-*.jsonl.gz"))
+    assert len(files) == 3 and not list(tmp_path.glob("*.tmp"))
+    lines = [json.loads(line) for path in files for line in gzip.open(path, "rt")]
+    assert [line["i"] for line in lines] == [0, 1, 2, 3, 4]
+    assert (log.written, log.dropped) == (5, 1)
+
+
+def test_request_log_marks_failed_file_corrupt_and_keeps_a_stuck_writer(tmp_path):
+    import threading
+
+    from src.api.request_log import RequestLogger
+
+    log = RequestLogger(str(tmp_path), batch_size=2, flush_interval=60)
+    open_file = log._open_file
+
+    def open_failing_file():
+        open_file()
+        write, writes = log._file.write, []
+
+        def fail_after_first(data):
+            writes.append(data)
+            if len(writes) > 1:
+                raise OSError(28, "No space left on device")
+            return write(data)
+        log._file.write = fail_after_first
+
+    log._open_file = open_failing_file
+    for i in range(4):
+        log.log({"i": i})
+    log.start()
+    log.stop()
+    assert not list(tmp_path.glob("requests-*.jsonl.gz")) and not list(tmp_path.glob("*.tmp"))
+    assert len(list(tmp_path.glob("requests-*.jsonl.gz.corrupt"))) == 1
+    assert (log.written, log.dropped, log.write_errors) == (2, 2, 1)
+
+    # stop() з вичерпаним timeout: потік ще живий, другий writer не запускається
+    release = threading.Event()
+    log._flush_batch = lambda: release.wait() and False
+    log.start()
+    log.stop(timeout=0.05)
+    writer = log._thread
+    assert writer.is_alive()
+    log.start()
+    assert log._thread is writer
+    release.set()
+    log.stop()
+    assert log._thread is None and not log.running
+
+
+def test_predict_endpoints_log_scored_requests(loaded_model, monkeypatch, tmp_path):
+    import gzip
+
+    from src.api import main
+    from src.api.request_log import RequestLogger
+
+    log = RequestLogger(str(tmp_path), flush_interval=60)
+    monkeypatch.setattr(main, "request_logger", log)
+    client.post("/predict", json={**SAMPLE_CUSTOMER, "customer_id": "A"})
+    client.post("/predict/batch", json=[{**SAMPLE_CUSTOMER, "customer_id": "B"}, {"tenure": "x"}])
+    log.start()
+    log.stop()
+
+    lines = [json.loads(line) for path in tmp_path.glob("*.jsonl.gz") for line in gzip.open(path, "rt")]
+    assert [(line["endpoint"], line["customer_id"]) for line in lines] == [("/predict", "A"), ("/predict/batch", "B")]
+    assert lines[0]["features"]["Contract"] == SAMPLE_CUSTOMER["Contract"]
+    assert lines[0]["model_version"] == main.predict_module.current_bundle().version
+    assert 0.0 <= lines[0]["churn_probability"] <= 1.0
@@ -1,4 +1,366 @@
-import pytest
 # Тести для генерації даних
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.generate_dataset_ext import generate_tabular_data
+
+
 def test_generate_dataset():
     assert True  # Placeholder
+
+
+def _reference_loop(n_samples, seed=0, start_date="2023-01-01", end_date="2024-12-31"):
+    """Попередній построковий генератор (дефолтний drift), еталон для перевірки розподілів."""
+    rnd = random.Random(seed)
+    nprnd = np.random.RandomState(seed)
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    total_days = (datetime.strptime(end_date, "%Y-%m-%d") - start).days
+
+    data = []
+    for _ in range(n_samples):
+        record_date = start + timedelta(days=rnd.randint(0, total_days))
+        progress = (record_date - start).days / total_days
+
+        fiber_prob = 0.40 + 0.25 * progress
+        dsl_prob = 0.40 - 0.20 * progress
+        no_inet_prob = 0.20 - 0.05 * progress
+        echeck_prob = max(0.15, 0.40 - 0.25 * progress)
+        m2m_prob = max(0.30, 0.55 - 0.25 * progress)
+        streaming_boost = 0.3 * progress
+        senior_prob = max(0.08, 0.18 - 0.12 * progress)
+
+        gender = rnd.choice(["Male", "Female"])
+        senior_citizen = 1 if rnd.random() < senior_prob else 0
+        has_partner = rnd.choices(["Yes", "No"], weights=[52 + 10*progress, 48 - 10*progress])[0]
+        has_dependents = "Yes" if rnd.random() < (0.3 - 0.1*progress) else "No"
+        tenure = max(0, min(int(nprnd.beta(2 + progress, 3 - 0.5*progress) * 72), 72))
+        phone_service = "Yes" if rnd.random() < 0.92 else "No"
+        internet_service = rnd.choices(["DSL", "Fiber optic", "No"], weights=[dsl_prob, fiber_prob, no_inet_prob])[0]
+
+        if internet_service == "No":
+            services = ["No internet service"] * 6
+        else:
+            base_yes = 0.5 + streaming_boost
+            services = ["Yes" if rnd.random() < p else "No" for p in
+                        (base_yes * 0.7, base_yes * 0.8, base_yes * 0.75, base_yes * 0.6, base_yes + 0.1, base_yes + 0.1)]
+
+        multiple_lines = "No phone service" if phone_service == "No" else (
+            "Yes" if rnd.random() < 0.45 + 0.1*progress else "No")
+        contract = rnd.choices(["Month-to-month", "One year", "Two year"],
+                               weights=[m2m_prob, (1-m2m_prob)*0.6, (1-m2m_prob)*0.4])[0]
+        paperless_billing = "Yes" if rnd.random() < 0.59 + 0.15*progress else "No"
+        payment_method = rnd.choices(
+            ["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"],
+            weights=[echeck_prob, 0.25, 0.25 + 0.1*progress, 0.25 + 0.15*progress])[0]
+
+        base = 20.0
+        if phone_service == "Yes":
+            base += 25
+            if multiple_lines == "Yes":
+                base += 18
+        if internet_service == "DSL":
+            base += 50
+        elif internet_service == "Fiber optic":
+            base += 82 + 10*progress
+        base += sum(s == "Yes" for s in services) * (8 + 3*progress)
+        if contract == "One year":
+            base *= 0.94
+        elif contract == "Two year":
+            base *= 0.88 - 0.03*progress
+        monthly_charges = round(max(18.5, base + nprnd.normal(0, 6)), 2)
+        total_charges = round(monthly_charges * tenure * rnd.uniform(0.97, 1.03), 2)
+
+        churn_base = 0.45
+        if contract == "Month-to-month": churn_base += 0.35
+        if payment_method == "Electronic check": churn_base += 0.18
+        if internet_service == "Fiber optic": churn_base += 0.08
+        if tenure < 12: churn_base += 0.25 - tenure*0.02
+        churn_base -= 0.20 * progress
+
+        data.append({
+            "SeniorCitizen": senior_citizen, "Partner": has_partner, "Dependents": has_dependents,
+            "gender": gender, "tenure": tenure, "PhoneService": phone_service, "MultipleLines": multiple_lines,
+            "InternetService": internet_service, "OnlineSecurity": services[0], "StreamingTV": services[4],
+            "Contract": contract, "PaperlessBilling": paperless_billing, "PaymentMethod": payment_method,
+            "MonthlyCharges": monthly_charges, "TotalCharges": total_charges,
+            "Churn": "Yes" if rnd.random() < churn_base else "No",
+            "RecordDate": record_date.strftime("%Y-%m-%d"),
+        })
+    return pd.DataFrame(data)
+
+
+def test_generated_dataset_schema_and_order():
+    df = generate_tabular_data({"generation": {"samples": 1000, "seed": 7}})
+    assert len(df) == 1000
+    assert list(df.columns[:2]) == ["customerID", "gender"] and df.columns[-1] == "RecordDate"
+    assert df["RecordDate"].is_monotonic_increasing
+    assert df["RecordDate"].between("2023-01-01", "2024-12-31").all()
+    assert df["customerID"].str.fullmatch(r"\d{4}-[A-Z]{5}").all()
+    assert df["tenure"].between(0, 72).all() and (df["MonthlyCharges"] >= 18.5).all()
+    no_internet = df["InternetService"] == "No"
+    assert (df.loc[no_internet, "StreamingTV"] == "No internet service").all()
+
+    again = generate_tabular_data({"generation": {"samples": 1000, "seed": 7}})
+    pd.testing.assert_frame_equal(df, again)
+
+
+def test_vectorized_generator_matches_reference_distributions():
+    n = 40_000
+    fast = generate_tabular_data({"generation": {"samples": n}})
+    slow = _reference_loop(n)
+    for df in (fast, slow):
+        df["Year"] = df["RecordDate"].str[:4]
+
+    # Маргінальні частки категорій
+    for column in ("gender", "SeniorCitizen", "Partner", "Dependents", "PhoneService", "MultipleLines",
+                   "InternetService", "OnlineSecurity", "StreamingTV", "Contract", "PaperlessBilling",
+                   "PaymentMethod", "Churn"):
+        fast_share = fast[column].value_counts(normalize=True)
+        slow_share = slow[column].value_counts(normalize=True)
+        assert set(fast_share.index) == set(slow_share.index), column
+        assert (fast_share - slow_share).abs().max() < 0.015, column
+
+    # Числові розподіли
+    for column, tolerance in (("tenure", 0.5), ("MonthlyCharges", 1.2), ("TotalCharges", 75.0)):
+        for q in (0.1, 0.5, 0.9):
+            assert fast[column].quantile(q) == pytest.approx(slow[column].quantile(q), abs=3 * tolerance), column
+        assert fast[column].mean() == pytest.approx(slow[column].mean(), abs=tolerance), column
+
+    # Drift по роках: churn падає, частка fiber росте
+    for column, value in (("Churn", "Yes"), ("InternetService", "Fiber optic"), ("Contract", "Month-to-month")):
+        fast_by_year = fast.groupby("Year")[column].apply(lambda s: (s == value).mean())
+        slow_by_year = slow.groupby("Year")[column].apply(lambda s: (s == value).mean())
+        assert (fast_by_year - slow_by_year).abs().max() < 0.02, column
+
+
+def test_sharded_generation_is_reproducible_across_worker_counts(tmp_path):
+    from src.generate_dataset_ext import write_customers
+
+    config = {"generation": {"samples": 3001, "seed": 11}}
+    serial = generate_tabular_data(config, workers=1, shards=4)
+    parallel = generate_tabular_data(config, workers=3, shards=4)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial.index.equals(pd.RangeIndex(3001))
+    assert serial["RecordDate"].is_monotonic_increasing
+
+    path = tmp_path / "customers.csv"
+    rows, churn_by_year, sample = write_customers(config, path, workers=2, shards=4, sample_size=50)
+    assert rows == 3001 and churn_by_year.to_numpy().sum() == 3001
+    assert path.read_text() == serial.to_csv(index=False)
+    assert not list(tmp_path.glob("*.part-*"))
+    pd.testing.assert_frame_equal(sample, serial.loc[sample.index, sample.columns])
+    assert len(sample) == 50
+
+
+def test_streaming_writer_matches_chunked_generation(tmp_path):
+    from src.generate_dataset_ext import write_customers
+
+    config = {"generation": {"samples": 2500, "seed": 3}}
+    expected = generate_tabular_data(config, shards=2, chunk_size=400)
+    assert expected["RecordDate"].is_monotonic_increasing
+
+    path = tmp_path / "customers.csv"
+    timings = {}
+    rows, churn_by_year, sample = write_customers(config, path, shards=2, chunk_size=400, sample_size=30,
+                                                  timings=timings)
+    assert rows == 2500
+    assert path.read_text() == expected.to_csv(index=False)
+    assert set(timings) == {"tabular_generation", "churn_stats", "conversation_sample", "write"}
+    assert all(seconds > 0 for seconds in timings.values())
+    pd.testing.assert_frame_equal(churn_by_year, pd.crosstab(
+        expected["RecordDate"].str[:4].astype(int).rename("Year"), expected["Churn"]))
+    pd.testing.assert_frame_equal(sample, expected.loc[sample.index, sample.columns])
+
+
+def test_csv_has_one_header_when_there_are_more_shards_than_rows(tmp_path):
+    from src.generate_dataset_ext import plan_shards, write_customers
+
+    config = {"generation": {"samples": 3, "seed": 5}}
+    _, specs = plan_shards(config, 8)
+    assert specs[0].start_row == specs[0].stop_row  # шард 0 порожній
+
+    path = tmp_path / "customers.csv"
+    rows, _, _ = write_customers(config, path, shards=8, chunk_size=2)
+    assert rows == 3
+    expected = generate_tabular_data(config, shards=8, chunk_size=2)
+    assert path.read_text() == expected.to_csv(index=False)
+
+
+def test_parquet_output_is_dictionary_encoded_and_grouped_by_month(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from pipelines.train import load_data
+    from src.generate_dataset_ext import write_customers
+
+    config = {"generation": {"samples": 3000, "seed": 5}}
+    path = tmp_path / "customers.parquet"
+    rows, _, _ = write_customers(config, path, fmt="parquet", shards=2, chunk_size=700)
+    assert rows == 3000
+
+    parts = sorted(path.glob("part-*.parquet"))
+    assert len(parts) == 2
+    for part in parts:
+        metadata = pq.ParquetFile(part).metadata
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(metadata.schema.names.index("RecordDate")).statistics
+            assert stats.min[:7] == stats.max[:7]  # один місяць на row group
+
+    df = load_data(str(path))
+    expected = generate_tabular_data(config, shards=2, chunk_size=700).drop(columns="customerID")
+    assert "customerID" not in df.columns
+    assert df["PaymentMethod"].dtype == "category" and df["RecordDate"].dtype == "category"
+    pd.testing.assert_frame_equal(df.astype({c: object for c in df.select_dtypes("category")}),
+                                  expected.reset_index(drop=True))
+
+
+def test_batched_conversations_are_deterministic_and_fill_every_slot():
+    from src.generate_dataset_ext import ISSUE_TYPES, generate_conversation, generate_conversations
+
+    customers = generate_tabular_data({"generation": {"samples": 500, "seed": 2}})
+    reference = datetime(2025, 1, 1)
+    first = generate_conversations(customers, n=2000, rng=np.random.default_rng(1), reference_date=reference)
+    again = generate_conversations(customers, n=2000, rng=np.random.default_rng(1), reference_date=reference)
+    pd.testing.assert_frame_equal(first, again)
+
+    assert len(first) == 2000
+    assert set(first["issue_type"]) == set(ISSUE_TYPES)
+    assert first["customerID"].isin(customers["customerID"]).all()
+    for column in ("complaint", "resolution"):
+        assert not first[column].str.contains(r"[{}]").any(), column
+    # Дати в текстах відраховуються від reference_date, а не від datetime.now()
+    dates = first["resolution"].str.extract(r"visit for (\w+ \d{2})")[0].dropna()
+    assert len(dates) and dates.isin(["January 0" + str(d) for d in range(2, 9)]).all()
+
+    single = generate_conversation(customers.iloc[0].to_dict(), rng=np.random.default_rng(3))
+    assert single["customerID"] == customers["customerID"].iloc[0]
+    assert single["issue_type"] in ISSUE_TYPES
+
+
+def test_incremental_windows_continue_the_dataset(tmp_path):
+    pytest.importorskip("pyarrow")
+    from pipelines.train import load_data
+    from src.generate_dataset_ext import append_window, read_manifest
+
+    config = {"generation": {"samples": 7310, "seed": 4}}
+    path = tmp_path / "customers.parquet"
+    rows, _, partition = append_window(config, path, datetime(2025, 1, 10))
+    assert partition["first_date"] == "2025-01-01" and rows == 100
+
+    # Повторний запуск того ж дня нічого не дописує
+    rows, _, partition = append_window(config, path, datetime(2025, 1, 10))
+    assert rows == 0 and partition is None
+    rows, _, partition = append_window(config, path, datetime(2025, 3, 31))
+    assert partition["path"] == "window-20250111-20250331" and rows == 800
+
+    manifest = read_manifest(path)
+    assert [p["rows"] for p in manifest["partitions"]] == [7310, 100, 800]
+    assert manifest["start_date"] == "2023-01-01" and manifest["end_date"] == "2024-12-31"
+
+    df = load_data(str(path))
+    dates = df["RecordDate"].astype(str)
+    assert len(df) == 8210 and dates.max() <= "2025-03-31"
+    assert (dates > "2024-12-31").sum() == 900
+    # Drift продовжується: частка fiber у новому вікні не менша, ніж наприкінці історії
+    fiber = df["InternetService"].astype(str) == "Fiber optic"
+    assert fiber[dates > "2024-12-31"].mean() > fiber[dates < "2023-07-01"].mean()
+
+    # Вікно відтворюване: той самий seed і дні → ті самі рядки
+    again = tmp_path / "again.parquet"
+    append_window(config, again, datetime(2025, 1, 10))
+    first = pd.read_parquet(path / "window-20250101-20250110")
+    pd.testing.assert_frame_equal(first, pd.read_parquet(again / "window-20250101-20250110"))
+
+
+def test_pricing_and_churn_rules_come_from_config():
+    from src.generate_dataset_ext import DEFAULT_PRICING, compile_program
+
+    base = {"generation": {"samples": 4000, "seed": 8}}
+    default = generate_tabular_data(base)
+    explicit = generate_tabular_data({**base, "pricing": dict(DEFAULT_PRICING)})
+    pd.testing.assert_frame_equal(default, explicit)
+
+    cheaper = generate_tabular_data({**base, "pricing": {"base_charge": 10.0}, "churn": {"month_to_month": 0.0}})
+    # Ті ж випадкові числа: змінюються лише ціни та churn
+    pd.testing.assert_frame_equal(default.drop(columns=["MonthlyCharges", "TotalCharges", "Churn"]),
+                                  cheaper.drop(columns=["MonthlyCharges", "TotalCharges", "Churn"]))
+    assert cheaper["MonthlyCharges"].mean() < default["MonthlyCharges"].mean() - 5
+    assert (cheaper["Churn"] == "Yes").mean() < (default["Churn"] == "Yes").mean()
+
+    with pytest.raises(ValueError, match="fibre_base"):
+        compile_program({"pricing": {"fibre_base": 80}})
+
+
+def test_category_mix_rules_come_from_drift_config():
+    from src.generate_dataset_ext import DEFAULT_DRIFT
+
+    base = {"generation": {"samples": 4000, "seed": 8}}
+    default = generate_tabular_data(base)
+    pd.testing.assert_frame_equal(default, generate_tabular_data({**base, "drift": dict(DEFAULT_DRIFT)}))
+
+    shifted = generate_tabular_data({**base, "drift": {
+        "no_internet_share": 0.0, "no_internet_decline": 0.0,
+        "echeck_share": 0.0, "echeck_floor": 0.0, "echeck_decline_rate": 0.0,
+        "m2m_share": 0.9, "m2m_floor": 0.9, "senior_share": 0.0, "senior_floor": 0.0,
+        "paperless_share": 1.0, "paperless_growth_rate": 0.0,
+        "mailed_check_share": 0.0, "bank_transfer_share": 0.0, "bank_transfer_growth_rate": 0.0,
+    }})
+    assert not (shifted["InternetService"] == "No").any()
+    assert set(shifted["PaymentMethod"]) == {"Credit card (automatic)"}
+    assert (shifted["SeniorCitizen"] == 0).all() and (shifted["PaperlessBilling"] == "Yes").all()
+    assert (shifted["Contract"] == "Month-to-month").mean() > 0.85
+
+
+def test_scenario_sweep_runs_grid_in_parallel(tmp_path):
+    from src.scenario_sweep import expand_grid, sweep
+
+    config = {"generation": {"samples": 2000, "seed": 1}}
+    scenarios = expand_grid({"drift.churn_base_decline": [0.0, 0.4], "pricing.fiber_base": [82.0]})
+    serial = sweep(config, scenarios, workers=1)
+    parallel = sweep(config, scenarios, workers=2, output_dir=str(tmp_path), write_data=True)
+
+    columns = ["scenario", "drift.churn_base_decline", "rows", "churn_rate", "mean_monthly_charges"]
+    pd.testing.assert_frame_equal(serial[columns], parallel[columns])
+    assert list(serial["rows"]) == [2000, 2000]
+    assert serial["churn_rate"].iloc[1] < serial["churn_rate"].iloc[0]
+
+    written = pd.read_csv(tmp_path / "scenario-0001.csv")
+    assert len(written) == 2000
+    assert (written["Churn"] == "Yes").mean() == pytest.approx(parallel["churn_rate"].iloc[1])
+
+
+def test_customer_ids_are_unique_across_shards_and_windows(tmp_path):
+    pytest.importorskip("pyarrow")
+    from src.generate_dataset_ext import (ID_SPACE, append_window, decode_ids, encode_ids, id_key,
+                                          verify_unique_ids)
+
+    key = id_key(42)
+    counters = np.array([0, 1, 2, 10**9, ID_SPACE - 1])
+    ids = encode_ids(counters, key)
+    assert pd.Series(ids).str.fullmatch(r"\d{4}-[A-Z]{5}").all()
+    np.testing.assert_array_equal(decode_ids(ids, key), counters)
+    assert len(set(encode_ids(np.arange(200_000), key))) == 200_000
+    with pytest.raises(ValueError):
+        encode_ids(np.array([ID_SPACE]), key)
+
+    config = {"generation": {"samples": 7310, "seed": 9}}
+    path = tmp_path / "customers.parquet"
+    append_window(config, path, datetime(2025, 1, 31))
+    append_window(config, path, datetime(2025, 2, 28))
+    assert verify_unique_ids(path, seed=9) == {"rows": 7310 + 310 + 280, "duplicates": 0, "foreign": 0}
+
+    # Дублікат у CSV знаходиться
+    df = generate_tabular_data(config, shards=3)
+    pd.concat([df, df.iloc[[5, 700]]]).to_csv(tmp_path / "dup.csv", index=False)
+    assert verify_unique_ids(tmp_path / "dup.csv", seed=9, chunk_size=1000)["duplicates"] == 2
+
+    # ID з лічильником поза виданими рядками — "сторонній", бітмапа не росте до 2^34 біт
+    foreign = pd.concat([df, pd.DataFrame({"customerID": encode_ids(np.array([ID_SPACE - 1, 10**10]), id_key(9))})])
+    foreign.to_csv(tmp_path / "foreign.csv", index=False)
+    assert verify_unique_ids(tmp_path / "foreign.csv", seed=9) == {"rows": 7312, "duplicates": 0, "foreign": 2}
+
+    # Без шардів (rng) ID теж видаються під ключем generation.seed
+    single = generate_tabular_data({"generation": {"samples": 500, "seed": 9}}, rng=np.random.default_rng(0))
+    np.testing.assert_array_equal(decode_ids(single["customerID"].to_numpy(), id_key(9)), np.arange(500))
@@ -1,3 +1,385 @@
 # Тести для ML-моделей
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ROOT, SAMPLE_CUSTOMER
+
+
 def test_train():
     pass
+
+
+def _records(customers_df, n=300):
+    columns = list(SAMPLE_CUSTOMER)
+    records = customers_df[columns].head(n).to_dict(orient="records")
+    # Невідома категорія та нечислове значення, які pipeline обробляє по-своєму
+    records.append({**SAMPLE_CUSTOMER, "PaymentMethod": "Crypto", "TotalCharges": " "})
+    return records
+
+
+def test_compiled_encoder_matches_pipeline(trained_pipeline, customers_df):
+    from src.api.encoder import CompiledEncoder
+    from src.api.predict import preprocess_batch
+
+    records = _records(customers_df)
+    encoder = CompiledEncoder.from_pipeline(trained_pipeline)
+
+    expected = trained_pipeline.named_steps["preprocessor"].transform(preprocess_batch(records))
+    np.testing.assert_array_equal(encoder.transform(records), expected)
+    np.testing.assert_array_equal(
+        encoder.predict_proba(records),
+        trained_pipeline.predict_proba(preprocess_batch(records)),
+    )
+
+
+def test_compiled_encoder_rejects_unsupported_pipeline(trained_pipeline):
+    from sklearn.pipeline import Pipeline
+
+    from src.api.encoder import CompiledEncoder, UnsupportedPipelineError
+
+    with pytest.raises(UnsupportedPipelineError):
+        CompiledEncoder.from_pipeline(Pipeline([("classifier", trained_pipeline.named_steps["classifier"])]))
+
+
+def test_flat_forest_matches_predict_proba(trained_pipeline, customers_df, tmp_path):
+    from src.api.forest import FlatForest
+    from src.api.predict import preprocess_batch
+
+    forest = trained_pipeline.named_steps["classifier"]
+    X = trained_pipeline.named_steps["preprocessor"].transform(preprocess_batch(_records(customers_df)))
+
+    flat = FlatForest.from_sklearn(forest)
+    np.testing.assert_array_equal(flat.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X), forest.predict(X))
+
+    flat.save(tmp_path / "forest")
+    loaded = FlatForest.load(tmp_path / "forest", mmap_mode="r")
+    np.testing.assert_array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+
+    # Обмеження глибини дає валідні (хоч і наближені) ймовірності
+    shallow = flat.predict_proba(X, max_depth=3)
+    np.testing.assert_allclose(shallow.sum(axis=1), 1.0)
+
+
+def test_numpy_tree_engine_serves_same_probabilities(monkeypatch, trained_pipeline, customers_df):
+    from src.api import predict as predict_module
+
+    records = _records(customers_df, n=50)
+    monkeypatch.setattr(predict_module, "_bundle", predict_module.current_bundle())
+
+    predict_module.set_model(trained_pipeline, "test")
+    expected = predict_module.predict_churn_batch(records)
+
+    monkeypatch.setattr(predict_module, "TREE_ENGINE", "numpy")
+    for fast_encoder in (True, False):
+        monkeypatch.setattr(predict_module, "FAST_ENCODER", fast_encoder)
+        predict_module.set_model(trained_pipeline, "test")
+        assert predict_module.tree_evaluator is not None
+        assert predict_module.predict_churn_batch(records) == expected
+
+
+def test_mmap_export_serves_identical_predictions(monkeypatch, tmp_path, trained_pipeline, customers_df):
+    from src.api import predict as predict_module
+    from src.api.forest import export_serving_model
+
+    records = _records(customers_df, n=50)
+    monkeypatch.setattr(predict_module, "_bundle", predict_module.current_bundle())
+    monkeypatch.setattr(predict_module, "prediction_cache", None)
+    predict_module.set_model(trained_pipeline, "test")
+    expected = predict_module.predict_churn_batch(records)
+
+    export_dir = tmp_path / "churn_forest"
+    export_serving_model(trained_pipeline, str(export_dir))
+    export_serving_model(trained_pipeline, str(export_dir))  # повторний експорт замінює каталог
+    monkeypatch.setattr(predict_module, "MODEL_MMAP_DIR", str(export_dir))
+    monkeypatch.setattr(predict_module, "MLFLOW_TRACKING_URI", "")
+    assert predict_module.reload_model()["reloaded"] is True
+
+    bundle = predict_module.current_bundle()
+    assert bundle.source.startswith("mmap export")
+    assert isinstance(bundle.forest.value, np.memmap)
+    assert predict_module.predict_churn_batch(records) == expected
+
+
+def test_bulk_scoring_resumes_and_matches_pipeline(monkeypatch, tmp_path, trained_pipeline, customers_df):
+    import joblib
+    import pandas as pd
+
+    from pipelines import predict as bulk
+
+    model_path, input_path = tmp_path / "model.pkl", tmp_path / "customers.csv"
+    output_path = tmp_path / "predictions.csv"
+    joblib.dump(trained_pipeline, model_path)
+    customers_df.head(450).to_csv(input_path, index=False)
+
+    score_chunk = bulk.score_chunk
+
+    def failing_score_chunk(index, *args, **kwargs):
+        if index == 3:
+            raise RuntimeError("interrupted")
+        return score_chunk(index, *args, **kwargs)
+
+    monkeypatch.setattr(bulk, "score_chunk", failing_score_chunk)
+    with pytest.raises(RuntimeError):
+        bulk.score_file(str(input_path), str(output_path), str(model_path), workers=1, chunk_size=100)
+    monkeypatch.setattr(bulk, "score_chunk", score_chunk)
+
+    summary = bulk.score_file(str(input_path), str(output_path), str(model_path), workers=1, chunk_size=100)
+    assert (summary["rows"], summary["chunks"], summary["scored_chunks"]) == (450, 5, 2)
+
+    expected = trained_pipeline.predict_proba(customers_df.head(450))[:, 1]
+    scored = pd.read_csv(output_path)
+    assert list(scored["customerID"]) == list(customers_df["customerID"].head(450))
+    np.testing.assert_allclose(scored["churn_probability"], expected)
+
+    # Пул процесів дає той самий результат
+    parallel_path = tmp_path / "parallel.csv"
+    bulk.score_file(str(input_path), str(parallel_path), str(model_path), workers=2, chunk_size=100)
+    pd.testing.assert_frame_equal(pd.read_csv(parallel_path), scored)
+
+    # Модель, перезаписана в ту саму секунду, — інший запуск, а не продовження
+    key = bulk._run_key(str(input_path), str(model_path), 100)
+    os.utime(model_path, ns=(key["model_mtime_ns"] + 1000,) * 2)
+    assert bulk._run_key(str(input_path), str(model_path), 100) != key
+
+
+def test_bulk_scorer_does_not_import_the_serving_module():
+    import subprocess
+    import sys
+
+    # Воркери пулу імпортують pipelines.predict: без метрик, кешу і глобалів моделі з src.api
+    code = "import sys, pipelines.predict; print(sorted(m for m in sys.modules if m.startswith('src.api')))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert out.stdout.strip() == "[]"
+
+
+def test_train_cli_writes_phase_report(monkeypatch, tmp_path, customers_df):
+    import json
+
+    from pipelines import train
+
+    data_path, model_path = tmp_path / "customers.csv", tmp_path / "model.pkl"
+    customers_df.head(600).to_csv(data_path, index=False)
+    monkeypatch.setattr(train, "DATA_PATH", str(data_path))
+    monkeypatch.setattr(train, "MODEL_PATH", str(model_path))
+    monkeypatch.setattr(train, "MLFLOW_AVAILABLE", False)
+    monkeypatch.setattr(train, "FEATURE_CACHE_DIR", str(tmp_path / "cache"))
+
+    report_path, profile_path = tmp_path / "timings.json", tmp_path / "train.prof"
+    train.main(["--report", str(report_path), "--profile", str(profile_path), "--profile-top", "3",
+                "--trace-memory"])
+
+    report = json.loads(report_path.read_text())
+    assert list(report["phases"]) == ["load", "prepare", "encode", "fit", "eval", "dump"]
+    assert all(phase["calls"] == 1 for phase in report["phases"].values())
+    assert all(phase["seconds"] > 0 and "memory_peak_mb" in phase for phase in report["phases"].values())
+    assert model_path.exists() and profile_path.stat().st_size > 0
+    assert not list(tmp_path.glob("model.pkl.tmp-*"))  # модель записано атомарно
+
+
+def test_parallel_training_matches_chunked_and_reports_every_tree(customers_df):
+    from pipelines.train import build_pipeline, train_and_evaluate
+
+    df = customers_df.drop(["customerID", "RecordDate"], axis=1)
+    X, y = df.drop("Churn", axis=1), df["Churn"].map({"Yes": 1, "No": 0})
+    X_train, X_test, y_train, y_test = X.iloc[:1500], X.iloc[1500:], y.iloc[:1500], y.iloc[1500:]
+
+    def fit(mode, **kwargs):
+        model = build_pipeline(X).set_params(classifier__n_estimators=12)
+        return train_and_evaluate(model, X_train, X_test, y_train, y_test, show_progress=False, mode=mode,
+                                  **kwargs)[1]
+
+    finished = []
+    parallel = fit("parallel", n_jobs=2, on_tree=lambda done, total: finished.append((done, total)))
+    chunked = fit("chunked")
+
+    assert finished == [(i, 12) for i in range(1, 13)]
+    assert parallel.named_steps["classifier"].n_jobs is None  # збережена модель передбачає в один потік
+    np.testing.assert_array_equal(parallel.predict_proba(X_test), chunked.predict_proba(X_test))
+    with pytest.raises(ValueError):
+        fit("threads")
+
+
+def test_tree_progress_hook_works_or_training_falls_back(monkeypatch, capsys, customers_df):
+    from pipelines import train
+
+    # Прогрес по деревах спирається на приватний хук joblib: оновлення joblib має ламати цей тест
+    assert train.TREE_PROGRESS_AVAILABLE, "joblib ThreadingBackend.batch_completed is gone, see requirements-ml.txt"
+
+    df = customers_df.drop(["customerID", "RecordDate"], axis=1)
+    X, y = df.drop("Churn", axis=1), df["Churn"].map({"Yes": 1, "No": 0})
+
+    def fit():
+        finished = []
+        classifier = train.build_pipeline(X).set_params(classifier__n_estimators=6).named_steps["classifier"]
+        X_t = train.build_pipeline(X).named_steps["preprocessor"].fit_transform(X)
+        train._fit_parallel(classifier, X_t, y, False, 2, lambda done, total: finished.append(done))
+        return finished, classifier.predict_proba(X_t)
+
+    reported, expected = fit()
+    assert reported == [1, 2, 3, 4, 5, 6]
+
+    monkeypatch.setattr(train, "TREE_PROGRESS_AVAILABLE", False)
+    reported, proba = fit()
+    assert reported == [6]  # без хука прогрес завершується лише наприкінці
+    assert "no per-tree progress hook" in capsys.readouterr().err
+    np.testing.assert_array_equal(proba, expected)
+
+
+def test_record_date_becomes_numeric_features_and_is_optional_when_serving(monkeypatch, customers_df):
+    from pipelines.train import build_pipeline
+    from src.api import predict as predict_module
+    from src.api.encoder import CompiledEncoder
+    from src.api.predict import preprocess_batch
+
+    df = customers_df.drop(["customerID"], axis=1)
+    X, y = df.drop("Churn", axis=1), df["Churn"].map({"Yes": 1, "No": 0})
+    # max_categories=3 робить частину PaymentMethod/ InternetService "infrequent"
+    pipeline = build_pipeline(X, date_features=True, max_categories=3)
+    pipeline.set_params(classifier__n_estimators=10).fit(X, y)
+
+    names = list(pipeline[:-1].get_feature_names_out())
+    assert "date__RecordDate_year" in names and "date__RecordDate_month" in names
+    assert not any(name.startswith("cat__RecordDate") for name in names)
+    assert len(names) < 50
+    assert any(name.endswith("_infrequent_sklearn") for name in names)
+
+    records = _records(customers_df)
+    records[0] = {**records[0], "RecordDate": "2031-07-01", "PaymentMethod": "Crypto"}
+    records[1] = {**records[1], "RecordDate": str(customers_df["RecordDate"].iloc[1])}
+    encoder = CompiledEncoder.from_pipeline(pipeline)
+    np.testing.assert_array_equal(encoder.transform(records),
+                                  pipeline[:-1].transform(preprocess_batch(records)))
+
+    monkeypatch.setattr(predict_module, "_bundle", predict_module.current_bundle())
+    predict_module.set_model(pipeline, "test")
+    assert "RecordDate" not in predict_module.current_bundle().required_columns
+    assert "error" not in predict_module.predict_churn(records[5], use_cache=False)
+
+
+@pytest.mark.parametrize("encoding", ["dense-onehot", "sparse-onehot", "ordinal"])
+def test_every_encoding_is_float32_and_served_like_the_pipeline(monkeypatch, customers_df, encoding):
+    from pipelines.train import build_pipeline
+    from src.api import predict as predict_module
+    from src.api.encoder import CompiledEncoder
+    from src.api.predict import preprocess_batch
+
+    df = customers_df.drop(["customerID"], axis=1)
+    X, y = df.drop("Churn", axis=1), df["Churn"].map({"Yes": 1, "No": 0})
+    pipeline = build_pipeline(X, encoding=encoding).set_params(classifier__n_estimators=10).fit(X, y)
+
+    records = _records(customers_df, n=50)
+    expected = pipeline[:-1].transform(preprocess_batch(records))
+    assert expected.dtype == np.float32
+    assert hasattr(expected, "indptr") == (encoding == "sparse-onehot")
+    dense = expected.toarray() if hasattr(expected, "toarray") else expected
+    np.testing.assert_array_equal(CompiledEncoder.from_pipeline(pipeline).transform(records), dense)
+
+    monkeypatch.setattr(predict_module, "_bundle", predict_module.current_bundle())
+    predict_module.set_model(pipeline, "test")
+    served = [result["churn_probability"] for result in predict_module.predict_churn_batch(records, use_cache=False)]
+    np.testing.assert_allclose(served, pipeline.predict_proba(preprocess_batch(records))[:, 1].round(4))
+
+
+def test_ordinal_encoding_marks_native_categorical_features(customers_df):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    from pipelines.train import build_pipeline
+
+    X = customers_df.drop(["customerID", "Churn"], axis=1)
+    pipeline = build_pipeline(X, encoding="ordinal", classifier=HistGradientBoostingClassifier())
+    n_numeric = len(X.select_dtypes(include=["int64", "float64"]).columns)
+    n_categorical = len(X.select_dtypes(include=["object"]).columns) - 1  # без RecordDate
+    assert pipeline.named_steps["classifier"].categorical_features == list(
+        range(n_numeric, n_numeric + n_categorical))
+
+
+def test_model_backend_follows_config_and_falls_back_without_xgboost(monkeypatch):
+    from pipelines import backends
+
+    backend = backends.make_backend({"type": "hist_gradient_boosting",
+                                     "params": {"n_estimators": 50, "max_depth": 3, "n_jobs": 4},
+                                     "early_stopping": {"validation_fraction": 0.2, "rounds": 5}})
+    params = backend.classifier.get_params()
+    assert (params["max_iter"], params["max_depth"], params["early_stopping"]) == (50, 3, True)
+    assert (params["validation_fraction"], params["n_iter_no_change"]) == (0.2, 5)
+    assert backend.encoding == "ordinal" and "n_jobs" not in backend.params
+
+    monkeypatch.setattr(backends, "XGBOOST_AVAILABLE", False)
+    assert backends.make_backend({"type": "xgboost"}).name == "hist_gradient_boosting"
+    assert backends.make_backend({"type": "xgboost", "fallback": "random_forest"}).name == "random_forest"
+    with pytest.raises(ValueError):
+        backends.make_backend({"type": "lightgbm"})
+
+
+def test_boosted_model_from_config_trains_and_exports(monkeypatch, tmp_path, customers_df):
+    import joblib
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    from pipelines import train
+    from src.api.forest import export_serving_model, load_serving_model
+
+    data_path, model_path, config_path = tmp_path / "customers.csv", tmp_path / "model.pkl", tmp_path / "train.yaml"
+    customers_df.to_csv(data_path, index=False)
+    config_path.write_text("model:\n  type: random_forest\n  params: {n_estimators: 40, learning_rate: 0.2}\n"
+                           "  early_stopping: {validation_fraction: 0.2, rounds: 3}\n")
+    monkeypatch.setattr(train, "DATA_PATH", str(data_path))
+    monkeypatch.setattr(train, "MODEL_PATH", str(model_path))
+    monkeypatch.setattr(train, "MLFLOW_AVAILABLE", False)
+    monkeypatch.setattr(train, "FEATURE_CACHE_DIR", str(tmp_path / "cache"))
+
+    train.main(["--config", str(config_path), "--model-type", "hist_gradient_boosting",
+                "--report", str(tmp_path / "timings.json")])
+
+    model = joblib.load(model_path)
+    classifier = model.named_steps["classifier"]
+    assert isinstance(classifier, HistGradientBoostingClassifier)
+    assert classifier.learning_rate == 0.2 and classifier.n_iter_ <= 40
+    assert classifier.categorical_features is not None  # ordinal-коди як нативні категорії
+
+    export_serving_model(model, str(tmp_path / "export"))
+    X = customers_df.drop(["customerID", "Churn"], axis=1).head(50)
+    np.testing.assert_array_equal(load_serving_model(str(tmp_path / "export")).predict_proba(X),
+                                  model.predict_proba(X))
+
+
+def test_training_rerun_reuses_cached_features(monkeypatch, tmp_path, customers_df):
+    import json
+
+    import joblib
+
+    from pipelines import train
+    from pipelines.feature_cache import FeatureCache
+
+    data_path, model_path, cache_dir = tmp_path / "customers.csv", tmp_path / "model.pkl", tmp_path / "cache"
+    customers_df.head(800).to_csv(data_path, index=False)
+    monkeypatch.setattr(train, "DATA_PATH", str(data_path))
+    monkeypatch.setattr(train, "MODEL_PATH", str(model_path))
+    monkeypatch.setattr(train, "MLFLOW_AVAILABLE", False)
+    monkeypatch.setattr(train, "FEATURE_CACHE_DIR", str(cache_dir))
+    X = customers_df.drop(["customerID", "Churn"], axis=1).head(100)
+
+    def run(*args):
+        report_path = tmp_path / "timings.json"
+        train.main(["--model-type", "random_forest", "--report", str(report_path), *args])
+        return list(json.loads(report_path.read_text())["phases"]), joblib.load(model_path).predict_proba(X)
+
+    cold_phases, cold = run()
+    warm_phases, warm = run()
+    assert cold_phases == ["load", "prepare", "encode", "fit", "eval", "dump"]
+    assert warm_phases == ["load", "fit", "eval", "dump"]  # без читання CSV і fit енкодера
+    np.testing.assert_array_equal(warm, cold)
+    assert len(FeatureCache(str(cache_dir)).entries()) == 1
+
+    # Інше кодування і змінені дані — нові ключі
+    assert run("--encoding", "ordinal")[0][1] == "prepare"
+    customers_df.head(700).to_csv(data_path, index=False)
+    assert run()[0][1] == "prepare"
+    assert len(FeatureCache(str(cache_dir)).entries()) == 3
+
+    # Обмеження розміру: лишається тільки щойно записаний запис
+    cache = FeatureCache(str(cache_dir), max_mb=0)
+    newest = max(cache.entries().items(), key=lambda item: item[1][0])[0]
+    assert len(cache.evict(keep=newest)) == 2 and list(cache.entries()) == [newest]